@@ -0,0 +1,221 @@
+"""
+Utilidades compartidas por los scripts de benchmarks/.
+
+Los benchmarks nunca tocan la base real: `configurar_django` apunta Django
+a una SQLite temporal (o a CV_BENCH_DATABASE_URL si se quiere medir sobre
+PostgreSQL) y a un directorio de cache propio antes de inicializarlo.
+"""
+import io
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def configurar_django():
+    """Inicializa Django sobre una base temporal y la migra. Devuelve el directorio temporal."""
+    directorio = tempfile.mkdtemp(prefix='cv-bench-')
+    os.environ['DATABASE_URL'] = os.environ.get(
+        'CV_BENCH_DATABASE_URL', f"sqlite:///{directorio}/bench.sqlite3"
+    )
+    os.environ['CV_CACHE_DIR'] = os.path.join(directorio, 'cache')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    sys.path.insert(0, str(RAIZ))
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    settings.CV_CERTIFICADOS_CACHE_DIR = os.path.join(directorio, 'certificados')
+    settings.CV_CERTIFICADOS_PAQUETES_DIR = os.path.join(directorio, 'paquetes')
+    call_command('migrate', verbosity=0)
+    return directorio
+
+
+def _repartir(filas, perfiles_ids):
+    """Reparte `filas` índices entre los perfiles en forma circular."""
+    for i in range(filas):
+        yield i, perfiles_ids[i % len(perfiles_ids)]
+
+
+def sembrar(perfiles=1000, filas=100_000, visibles=0.8, con_certificado=0.3, lote=5000):
+    """
+    Crea `perfiles` DatosPersonales (solo el primero activo) y `filas` filas
+    en cada tabla del CV repartidas entre ellos. Usa bulk_create, así que no
+    se disparan señales: quien necesite snapshots los reconstruye después.
+    Devuelve el id del perfil activo.
+    """
+    from cv.models import (
+        DatosPersonales,
+        ExperienciaLaboral,
+        CursoRealizado,
+        Reconocimiento,
+        ProductoAcademico,
+        ProductoLaboral,
+        VentaGarage
+    )
+
+    hoy = date.today()
+
+    def visible(i):
+        return (i % 100) < visibles * 100
+
+    def certificado(carpeta, i):
+        # Otro módulo que en visible() para no correlacionar ambos filtros
+        if (i // 100) % 100 < con_certificado * 100:
+            return f'certificados/{carpeta}/bench_{i}.jpg'
+        return ''
+
+    DatosPersonales.objects.bulk_create(
+        (
+            DatosPersonales(
+                descripcionperfil='Perfil de prueba',
+                perfilactivo=(i == 0),
+                apellidos=f'Apellido {i}',
+                nombres=f'Nombre {i}',
+                nacionalidad='Ecuatoriana',
+                lugarnacimiento='Manta',
+                fechanacimiento=date(1990, 1, 1),
+                numerocedula=f'{i:010d}',
+                slug=f'perfil-{i}',
+                sexo='H',
+                estadocivil='Soltero',
+                licenciaconducir='Tipo B',
+                telefonoconvencional='052000000',
+                telefonofijo='0990000000',
+                direcciontrabajo='Centro',
+                direcciondomiciliaria='Barrio',
+            )
+            for i in range(perfiles)
+        ),
+        batch_size=lote,
+    )
+    perfiles_ids = list(DatosPersonales.objects.order_by('pk').values_list('pk', flat=True))
+
+    fabricas = {
+        ExperienciaLaboral: lambda i, p: ExperienciaLaboral(
+            perfil_id=p, cargodesempenado=f'Cargo {i}', nombrempresa='Empresa',
+            lugarempresa='Manta', emailempresa='rrhh@empresa.com',
+            sitiowebempresa='https://empresa.com', nombrecontactoempresarial='Contacto',
+            telefonocontactoempresarial='0990000000', fechainiciogestion=date(2020, 1, 1),
+            fechafingestion=date(2021, 1, 1), descripcionfunciones='Funciones',
+            activarparaqueseveaenfront=visible(i), certificado=certificado('experiencia', i),
+        ),
+        CursoRealizado: lambda i, p: CursoRealizado(
+            perfil_id=p, nombrecurso=f'Curso {i}', fechainicio=date(2020, 1, 1),
+            fechafin=date(2020, 2, 1), totalhoras=40, descripcioncurso='Curso',
+            entidadpatrocinadora='Entidad', nombrecontactoauspicia='Contacto',
+            telefonocontactoauspicia='0990000000', emailempresapatrocinadora='info@entidad.com',
+            activarparaqueseveaenfront=visible(i), certificado=certificado('cursos', i),
+        ),
+        Reconocimiento: lambda i, p: Reconocimiento(
+            perfil_id=p, tiporeconocimiento='Académico', fechareconocimiento=date(2021, 6, 1),
+            descripcionreconocimiento=f'Reconocimiento {i}', entidadpatrocinadora='Entidad',
+            nombrecontactoauspicia='Contacto', telefonocontactoauspicia='0990000000',
+            activarparaqueseveaenfront=visible(i), certificado=certificado('reconocimientos', i),
+        ),
+        ProductoAcademico: lambda i, p: ProductoAcademico(
+            perfil_id=p, nombrerecurso=f'Recurso {i}', clasificador='Artículo',
+            descripcion='Descripción', activarparaqueseveaenfront=visible(i),
+        ),
+        ProductoLaboral: lambda i, p: ProductoLaboral(
+            perfil_id=p, nombreproducto=f'Producto {i}', fechaproducto=date(2022, 3, 1),
+            descripcion='Descripción', activarparaqueseveaenfront=visible(i),
+        ),
+        VentaGarage: lambda i, p: VentaGarage(
+            perfil_id=p, nombreproducto=f'Artículo {i}',
+            estadoproducto='Bueno' if i % 2 else 'Regular', descripcion='Descripción',
+            valordelbien=Decimal(i % 5000) + Decimal('0.99'),
+            fechapublicacion=hoy - timedelta(days=i % 365),
+            activarparaqueseveaenfront=visible(i),
+        ),
+    }
+
+    for modelo, fabrica in fabricas.items():
+        # Por lotes para no tener 100k instancias en memoria a la vez
+        pendientes = (fabrica(i, p) for i, p in _repartir(filas, perfiles_ids))
+        while True:
+            objetos = list(islice(pendientes, lote))
+            if not objetos:
+                break
+            modelo.objects.bulk_create(objetos)
+    return perfiles_ids[0]
+
+
+def medir(funcion, repeticiones, preparar=None):
+    """
+    Ejecuta `funcion` `repeticiones` veces (llamando antes a `preparar`, si
+    se pasa, fuera de la medición) y devuelve tiempo de pared, número de
+    consultas SQL y pico de memoria de Python (tracemalloc).
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    tiempos, consultas, picos = [], [], []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        picos.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        consultas.append(len(capturadas))
+    return {
+        'mediana_ms': round(statistics.median(tiempos) * 1000, 3),
+        'min_ms': round(min(tiempos) * 1000, 3),
+        'max_ms': round(max(tiempos) * 1000, 3),
+        'consultas': max(consultas),
+        'pico_memoria_kb': round(max(picos) / 1024, 1),
+    }
+
+
+@contextmanager
+def servidor_imagenes(ancho=1600, alto=1200, latencia_ms=0):
+    """
+    Servidor HTTP local que reemplaza a Cloudinary: responde a cualquier
+    ruta con el mismo JPEG. Devuelve la URL base (http://127.0.0.1:puerto).
+    """
+    from PIL import Image
+
+    # Ruido para que el JPEG pese como una foto real y no como un color plano
+    imagen = Image.frombytes('RGB', (ancho, alto), os.urandom(ancho * alto * 3))
+    salida = io.BytesIO()
+    imagen.save(salida, 'JPEG', quality=85)
+    contenido = salida.getvalue()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if latencia_ms:
+                time.sleep(latencia_ms / 1000)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/jpeg')
+            self.send_header('Content-Length', str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{servidor.server_port}"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
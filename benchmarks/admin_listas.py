@@ -0,0 +1,105 @@
+"""
+Latencia de las páginas del admin sobre tablas grandes, con y sin los
+ajustes de SeccionCVAdmin (autocompletado del perfil, list_select_related
+y show_full_result_count=False), más el costo de las acciones masivas.
+
+    python benchmarks/admin_listas.py [--perfiles 1000] [--filas 100000] [--json salida.json]
+
+Siembra una base temporal y pide como superusuario, para cada modelo, la
+lista, la lista filtrada, una búsqueda y el formulario de alta. "sin
+ajustes" vuelve a poner los valores por defecto de ModelAdmin. Las
+acciones se miden solo con los ajustes: ocultan y vuelven a publicar una
+página de filas.
+"""
+import argparse
+import json
+import sys
+from unittest import mock
+
+from _comun import configurar_django, medir, sembrar
+
+# Valores por defecto de ModelAdmin, es decir, el admin antes de SeccionCVAdmin
+SIN_AJUSTES = {'autocomplete_fields': (), 'list_select_related': False, 'show_full_result_count': True}
+
+POR_PAGINA = 100
+
+
+def escenarios(modelo, cliente):
+    from django.urls import reverse
+
+    info = (modelo._meta.app_label, modelo._meta.model_name)
+    lista = reverse('admin:%s_%s_changelist' % info)
+
+    def pedir(url):
+        def funcion():
+            response = cliente.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        return funcion
+
+    return {
+        'lista': pedir(lista),
+        'lista filtrada': pedir(f'{lista}?activarparaqueseveaenfront__exact=1'),
+        'búsqueda': pedir(f'{lista}?q=99'),
+        'formulario de alta': pedir(reverse('admin:%s_%s_add' % info)),
+    }
+
+
+def accion_masiva(modelo, cliente):
+    from django.urls import reverse
+
+    url = reverse('admin:%s_%s_changelist' % (modelo._meta.app_label, modelo._meta.model_name))
+    seleccion = list(modelo.objects.order_by('-pk').values_list('pk', flat=True)[:POR_PAGINA])
+
+    def funcion():
+        for accion in ('ocultar', 'publicar'):
+            response = cliente.post(url, {'action': accion, '_selected_action': seleccion, 'index': 0})
+            assert response.status_code == 302, (accion, response.status_code)
+    return funcion
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfiles', type=int, default=1000)
+    parser.add_argument('--filas', type=int, default=100_000, help="Filas por tabla")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--json', help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    from cv.models import ExperienciaLaboral, VentaGarage
+
+    print(f"Sembrando {args.filas} filas por tabla en {args.perfiles} perfiles...", file=sys.stderr)
+    sembrar(perfiles=args.perfiles, filas=args.filas)
+    cliente = Client()
+    cliente.force_login(User.objects.create_superuser('bench', 'bench@example.com', 'bench'))
+
+    resultados = {}
+    for modelo in (ExperienciaLaboral, VentaGarage):
+        modelo_admin = admin.site._registry[modelo]
+        nombre_modelo = modelo.__name__
+        for nombre, funcion in escenarios(modelo, cliente).items():
+            print(f"Midiendo {nombre_modelo}: {nombre}...", file=sys.stderr)
+            with mock.patch.multiple(modelo_admin, **SIN_AJUSTES):
+                sin_ajustes = medir(funcion, args.repeticiones)
+            resultados[f'{nombre_modelo}: {nombre}'] = {
+                'sin_ajustes': sin_ajustes,
+                'con_ajustes': medir(funcion, args.repeticiones),
+            }
+        print(f"Midiendo {nombre_modelo}: acciones...", file=sys.stderr)
+        resultados[f'{nombre_modelo}: ocultar y publicar {POR_PAGINA} filas'] = {
+            'con_ajustes': medir(accion_masiva(modelo, cliente), args.repeticiones),
+        }
+
+    texto = json.dumps({'parametros': vars(args), 'resultados': resultados}, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, 'w') as archivo:
+            archivo.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Planes de ejecución y tiempos de las consultas de lectura con y sin los
+índices de visibilidad, certificados y del catálogo de garage.
+
+    python benchmarks/planes_indices.py [--perfiles 10] [--filas 100000] [--json salida.json]
+
+Siembra una base temporal, borra los índices, mide, los vuelve a crear y
+mide otra vez. Con CV_BENCH_DATABASE_URL se puede apuntar a PostgreSQL.
+"""
+import argparse
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from _comun import configurar_django, sembrar
+
+# Índices de 0013_indices_visibilidad_certificados y, para el garage, de
+# los filtros por estado y precio: se quitan todos para la línea de base
+INDICES = {
+    'ExperienciaLaboral': ['exp_perfil_visible_idx', 'exp_con_certificado_idx'],
+    'Reconocimiento': ['rec_perfil_visible_idx', 'rec_con_certificado_idx'],
+    'CursoRealizado': ['cur_perfil_visible_idx', 'cur_con_certificado_idx'],
+    'ProductoAcademico': ['pacad_perfil_visible_idx'],
+    'ProductoLaboral': ['plab_perfil_visible_idx'],
+    'VentaGarage': ['venta_perfil_visible_idx', 'venta_listado_idx', 'venta_estado_idx', 'venta_precio_idx'],
+}
+
+
+def consultas(perfil_id):
+    from cv.models import CON_CERTIFICADO
+    from cv.snapshot import SECCIONES
+    from cv.views import _consulta_garage
+
+    resultado = {
+        f'{nombre} visibles': modelo.objects.filter(perfil_id=perfil_id, activarparaqueseveaenfront=True)
+        for nombre, modelo in SECCIONES.items()
+    }
+    # La misma consulta que la vista: filtros, orden (fecha, id) y LIMIT
+    sin_filtros = {'estado': None, 'precio_min': None, 'precio_max': None, 'cursor': None}
+    for nombre, filtros in (
+        ('venta_garage listado', {}),
+        ('venta_garage por estado', {'estado': 'Bueno'}),
+        ('venta_garage por precio', {'precio_min': Decimal('10'), 'precio_max': Decimal('50')}),
+    ):
+        resultado[nombre] = _consulta_garage(perfil_id, dict(sin_filtros, **filtros))
+    for nombre in ('experiencias', 'cursos', 'reconocimientos'):
+        resultado[f'{nombre} con certificado'] = SECCIONES[nombre].objects.filter(
+            CON_CERTIFICADO, perfil_id=perfil_id
+        )
+    return resultado
+
+
+def medir(perfil_id, repeticiones):
+    medidas = {}
+    for nombre, queryset in consultas(perfil_id).items():
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            list(queryset.all())
+            tiempos.append(time.perf_counter() - inicio)
+        medidas[nombre] = {
+            'plan': queryset.explain(),
+            'mediana_ms': round(statistics.median(tiempos) * 1000, 3),
+        }
+    return medidas
+
+
+def cambiar_indices(crear):
+    from django.apps import apps
+    from django.db import connection
+
+    with connection.schema_editor() as editor:
+        for nombre_modelo, nombres in INDICES.items():
+            modelo = apps.get_model('cv', nombre_modelo)
+            for indice in modelo._meta.indexes:
+                if indice.name in nombres:
+                    (editor.add_index if crear else editor.remove_index)(modelo, indice)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfiles', type=int, default=10)
+    parser.add_argument('--filas', type=int, default=100_000, help="Filas por tabla")
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--json', help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    configurar_django()
+    print(f"Sembrando {args.filas} filas por tabla en {args.perfiles} perfiles...")
+    perfil_id = sembrar(perfiles=args.perfiles, filas=args.filas)
+
+    cambiar_indices(crear=False)
+    antes = medir(perfil_id, args.repeticiones)
+    cambiar_indices(crear=True)
+    despues = medir(perfil_id, args.repeticiones)
+
+    for nombre in antes:
+        print(f"\n== {nombre}")
+        print(f"  sin índices ({antes[nombre]['mediana_ms']} ms): {antes[nombre]['plan']}")
+        print(f"  con índices ({despues[nombre]['mediana_ms']} ms): {despues[nombre]['plan']}")
+
+    if args.json:
+        with open(args.json, 'w') as archivo:
+            json.dump({'antes': antes, 'despues': despues, 'parametros': vars(args)}, archivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
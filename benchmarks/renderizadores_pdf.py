@@ -0,0 +1,64 @@
+"""
+Los dos renderizadores del PDF lado a lado: 'html' (cv_pdf.html con
+xhtml2pdf) y 'reportlab' (cv/pdf_reportlab.py), en tiempo de render,
+memoria, tamaño del archivo y páginas.
+
+    python benchmarks/renderizadores_pdf.py [--filas 10 50 200] [--json salida.json]
+
+Siembra un solo perfil con el máximo de --filas por tabla y, para cada
+valor, renderiza con el contexto del snapshot recortado a esa cantidad de
+filas por sección. Mide solo el render: sin caches de Django ni vistas.
+"""
+import argparse
+import io
+import json
+import sys
+
+from _comun import configurar_django, medir, sembrar
+
+
+def recortar(contexto, filas):
+    from cv.snapshot import SECCIONES
+
+    return dict(contexto, **{nombre: contexto[nombre][:filas] for nombre in SECCIONES})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filas', type=int, nargs='+', default=[10, 50, 200], help="Filas por sección")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--json', help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    configurar_django()
+    from pypdf import PdfReader
+
+    from cv.pdf import RENDERIZADORES, renderizar_pdf
+    from cv.snapshot import contexto_snapshot, reconstruir_snapshot
+
+    print(f"Sembrando {max(args.filas)} filas por tabla en un perfil...", file=sys.stderr)
+    perfil_id = sembrar(perfiles=1, filas=max(args.filas), visibles=1, con_certificado=0)
+    # bulk_create no dispara señales: el snapshot se arma a mano
+    reconstruir_snapshot(perfil_id)
+    contexto = contexto_snapshot(perfil_id)
+
+    resultados = {}
+    for filas in args.filas:
+        recortado = recortar(contexto, filas)
+        for nombre in RENDERIZADORES:
+            print(f"Midiendo {nombre} con {filas} filas...", file=sys.stderr)
+            medicion = medir(lambda: renderizar_pdf(recortado, nombre), args.repeticiones)
+            contenido = renderizar_pdf(recortado, nombre)
+            medicion['tamano_kb'] = round(len(contenido) / 1024, 1)
+            medicion['paginas'] = len(PdfReader(io.BytesIO(contenido)).pages)
+            resultados[f'{filas} filas: {nombre}'] = medicion
+
+    texto = json.dumps({'parametros': vars(args), 'resultados': resultados}, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, 'w') as archivo:
+            archivo.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Tiempo de pared, consultas SQL y pico de memoria de las vistas públicas:
+welcome, home, venta_garage, descargar_cv_pdf y el POST de
+seleccionar_certificados.
+
+    python benchmarks/vistas.py [--perfiles 10] [--filas 2000] [--json salida.json]
+
+Siembra una base temporal con todos los modelos del CV y mide cada vista
+en frío (caches de Django, de certificados y de ZIPs armados vacías antes
+de cada repetición) y en caliente. Los certificados se bajan de un servidor local
+que reemplaza a Cloudinary, así que no hace falta red ni credenciales.
+El JSON incluye el commit actual para comparar corridas entre ramas.
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+from unittest import mock
+
+from _comun import RAIZ, configurar_django, medir, sembrar, servidor_imagenes
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def escenarios(perfil_id, max_certificados):
+    from django.test import Client
+    from django.urls import reverse
+
+    from cv.certificados import MODELOS_POR_PREFIJO
+    from cv.models import CON_CERTIFICADO
+
+    cliente = Client()
+    seleccion = []
+    for prefijo, modelo in MODELOS_POR_PREFIJO.items():
+        ids = modelo.objects.filter(CON_CERTIFICADO, perfil_id=perfil_id).values_list('pk', flat=True)
+        seleccion += [f"{prefijo}_{pk}" for pk in ids[:max_certificados]]
+
+    def pedir(metodo, url, datos=None):
+        def funcion():
+            response = getattr(cliente, metodo)(url, datos) if datos else getattr(cliente, metodo)(url)
+            assert response.status_code == 200, (url, response.status_code)
+            # Consumir el cuerpo entra en la medición (ZIP en streaming), sin
+            # acumularlo para no sumar el cuerpo al pico de memoria
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        return funcion
+
+    return {
+        'welcome': pedir('get', reverse('welcome')),
+        'home': pedir('get', reverse('home')),
+        'venta_garage': pedir('get', reverse('venta_garage')),
+        'descargar_cv_pdf': pedir('get', reverse('cv_pdf')),
+        f'seleccionar_certificados ({len(seleccion)})': pedir(
+            'post', reverse('seleccionar_certificados'), {'certificados': seleccion}
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfiles', type=int, default=10)
+    parser.add_argument('--filas', type=int, default=2000, help="Filas por tabla (repartidas entre los perfiles)")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--certificados', type=int, default=20, help="Máximo de certificados por modelo en el POST")
+    parser.add_argument('--latencia-ms', type=int, default=0, help="Latencia simulada del servidor de imágenes")
+    parser.add_argument('--json', help="Guarda los resultados en este archivo")
+    args = parser.parse_args()
+
+    configurar_django()
+    from django.conf import settings
+    from django.core.cache import cache
+
+    from cv.snapshot import reconstruir_snapshot
+
+    print(f"Sembrando {args.filas} filas por tabla en {args.perfiles} perfiles...", file=sys.stderr)
+    perfil_id = sembrar(perfiles=args.perfiles, filas=args.filas)
+
+    def vaciar_caches():
+        cache.clear()
+        shutil.rmtree(settings.CV_CERTIFICADOS_CACHE_DIR, ignore_errors=True)
+        shutil.rmtree(settings.CV_CERTIFICADOS_PAQUETES_DIR, ignore_errors=True)
+        # bulk_create no dispara señales: el snapshot se arma a mano
+        reconstruir_snapshot(perfil_id)
+
+    resultados = {}
+    with servidor_imagenes(latencia_ms=args.latencia_ms) as base_url, \
+            mock.patch('cv.certificados.url_certificado', lambda objeto: f"{base_url}/{objeto.certificado.name}"):
+        for nombre, funcion in escenarios(perfil_id, args.certificados).items():
+            print(f"Midiendo {nombre}...", file=sys.stderr)
+            resultados[nombre] = {
+                'frio': medir(funcion, args.repeticiones, preparar=vaciar_caches),
+                'caliente': medir(funcion, args.repeticiones),
+            }
+
+    from django import get_version
+    from django.db import connection
+    informe = {
+        'commit': _commit_actual(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': get_version(),
+        'base_de_datos': connection.vendor,
+        'parametros': vars(args),
+        'resultados': resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.json:
+        with open(args.json, 'w') as archivo:
+            archivo.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
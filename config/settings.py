@@ -45,12 +45,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que el total de Server-Timing incluya a los demás
+    'cv.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Perfilado a pedido (?perfilar= o X-CV-Perfilar), solo para staff
+    'cv.perfilado.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,15 +63,24 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (cv/metricas.py)
+        'BACKEND': 'cv.metricas.DjangoTemplatesMedidas',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Cargador con cache explícito (también con DEBUG): las plantillas
+            # se compilan una vez por proceso y home.html solo reensambla los
+            # fragmentos {% cache %} de cada sección.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -87,6 +100,74 @@ DATABASES = {
 }
 
 
+# Cache
+# Usamos cache en disco para que todos los workers de gunicorn compartan
+# las versiones de contenido y los PDFs ya generados.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CV_CACHE_DIR', os.path.join(BASE_DIR, '.cache', 'django')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    }
+}
+
+# Tiempo (segundos) que se conserva un PDF generado para una versión del CV
+CV_PDF_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Cómo se genera el PDF (ver cv/pdf.py): 'html' (cv_pdf.html con xhtml2pdf)
+# o 'reportlab' (la misma hoja armada directo con platypus, sin parsear HTML).
+# Las secciones y el espaciado son los mismos, pero no la paginación: la hoja
+# de cv_pdf.html es una sola fila de tabla de alto fijo y xhtml2pdf la achica
+# hasta que entra en una página A4 (con muchas filas el texto queda diminuto);
+# 'reportlab' conserva los tamaños de la plantilla y sigue en más páginas,
+# sin cortar un item ni dejar un título de sección solo al pie.
+CV_PDF_RENDERIZADOR = os.environ.get('CV_PDF_RENDERIZADOR', 'html')
+
+# Se suma al ETag de las páginas públicas: cambiarlo en cada despliegue
+# (p. ej. con el commit) hace que los clientes bajen las plantillas nuevas
+CV_VERSION_DESPLIEGUE = os.environ.get('CV_VERSION_DESPLIEGUE', '')
+
+# Artículos por página en el catálogo de venta de garage
+CV_VENTA_GARAGE_POR_PAGINA = 24
+
+# Descarga de certificados para el ZIP (ver cv/certificados.py)
+CV_CERTIFICADOS_MAX_HILOS = 6
+CV_CERTIFICADOS_TIMEOUT_ARCHIVO = 15  # segundos por certificado
+CV_CERTIFICADOS_TIMEOUT_TOTAL = 45  # segundos para todo el lote
+CV_CERTIFICADOS_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'certificados')
+CV_CERTIFICADOS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# ZIPs de certificados ya armados, por selección (ver cv/certificados.py)
+CV_CERTIFICADOS_PAQUETES_DIR = os.path.join(BASE_DIR, '.cache', 'paquetes')
+CV_CERTIFICADOS_PAQUETES_MAX_BYTES = 500 * 1024 * 1024
+# Lado mayor de los certificados al subirlos (A4 a 300 ppp de ancho)
+CV_CERTIFICADOS_LADO_MAXIMO = 2480
+
+# Vistas públicas async (cv/vistas_async.py). Lo activa config/asgi.py;
+# con WSGI se usan las síncronas de cv/views.py.
+CV_VISTAS_ASYNC = os.environ.get('CV_VISTAS_ASYNC') == '1'
+# Hilos para renderizar PDFs desde las vistas async
+CV_PDF_HILOS = 2
+
+# Cabecera Server-Timing para todos (por defecto solo para staff)
+CV_SERVER_TIMING = os.environ.get('CV_SERVER_TIMING') == '1'
+
+# Token opcional para que Prometheus lea /metricas/ sin sesión de staff
+# (cabecera "Authorization: Bearer <token>")
+CV_METRICAS_TOKEN = os.environ.get('CV_METRICAS_TOKEN')
+
+# Perfiles de rendimiento capturados a pedido (ver cv/perfilado.py)
+CV_PERFILADO_DIR = os.path.join(BASE_DIR, '.cache', 'perfiles')
+CV_PERFILADO_MAX_ARCHIVOS = 50
+CV_PERFILADO_MAX_DIAS = 7
+CV_PERFILADO_INTERVALO_MS = 5
+
+# Imágenes del PDF ya reducidas a resolución de impresión (ver cv/pdf.py)
+CV_PDF_IMAGENES_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'pdf')
+CV_PDF_IMAGENES_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -1,5 +1,9 @@
-from django.contrib import admin
-from django.utils.html import mark_safe
+from django.contrib import admin, messages
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, mark_safe
 from .models import (
     DatosPersonales,
     ExperienciaLaboral,
@@ -7,8 +11,12 @@ from .models import (
     CursoRealizado,
     ProductoAcademico,
     ProductoLaboral,
-    VentaGarage
+    VentaGarage,
+    TrabajoGeneracion,
+    PerfilEjecucion
 )
+from .perfilado import ruta_archivo
+from .signals import invalidar_perfiles
 
 @admin.register(DatosPersonales)
 class DatosPersonalesAdmin(admin.ModelAdmin):
@@ -17,17 +25,55 @@ class DatosPersonalesAdmin(admin.ModelAdmin):
         'apellidos',
         'nombres',
         'numerocedula',
+        'slug',
         'perfilactivo'
     )
-    search_fields = ('apellidos', 'nombres', 'numerocedula')
+    search_fields = ('apellidos', 'nombres', 'numerocedula', 'slug')
     list_filter = ('perfilactivo', 'sexo')
     ordering = ('apellidos',)
 
 
+class SeccionCVAdmin(admin.ModelAdmin):
+    """
+    Base de los admins de secciones del CV. Pensada para tablas grandes:
+    el perfil se elige con autocompletado en vez de un <select> con todos
+    los DatosPersonales, la lista trae el perfil con un JOIN y, al filtrar,
+    no se cuenta además la tabla completa.
+    """
+    autocomplete_fields = ('perfil',)
+    list_select_related = ('perfil',)
+    show_full_result_count = False
+    actions = ('publicar', 'ocultar')
+
+    def _cambiar_visibilidad(self, request, queryset, visible):
+        # Un solo UPDATE; como no hay señales, se invalida a mano cada perfil afectado
+        pendientes = queryset.exclude(activarparaqueseveaenfront=visible)
+        with transaction.atomic():
+            perfil_ids = set(pendientes.order_by().values_list('perfil_id', flat=True).distinct())
+            cambiadas = pendientes.update(activarparaqueseveaenfront=visible)
+        # Ya confirmado: ningún request puede cachear las filas viejas bajo
+        # las versiones nuevas de todo el lote
+        invalidar_perfiles(self.model, perfil_ids)
+        self.message_user(
+            request,
+            f"{cambiadas} filas {'publicadas' if visible else 'ocultadas'} ({len(perfil_ids)} perfiles actualizados).",
+            messages.SUCCESS
+        )
+
+    @admin.action(description="Publicar en el sitio", permissions=('change',))
+    def publicar(self, request, queryset):
+        self._cambiar_visibilidad(request, queryset, True)
+
+    @admin.action(description="Ocultar del sitio", permissions=('change',))
+    def ocultar(self, request, queryset):
+        self._cambiar_visibilidad(request, queryset, False)
+
+
 @admin.register(ExperienciaLaboral)
-class ExperienciaLaboralAdmin(admin.ModelAdmin):
+class ExperienciaLaboralAdmin(SeccionCVAdmin):
     list_display = (
         'cargodesempenado',
+        'perfil',
         'nombrempresa',
         'fechainiciogestion',
         'fechafingestion',
@@ -39,9 +85,10 @@ class ExperienciaLaboralAdmin(admin.ModelAdmin):
 
 
 @admin.register(Reconocimiento)
-class ReconocimientoAdmin(admin.ModelAdmin):
+class ReconocimientoAdmin(SeccionCVAdmin):
     list_display = (
         'descripcionreconocimiento',
+        'perfil',
         'tiporeconocimiento',
         'fechareconocimiento',
         'activarparaqueseveaenfront'
@@ -52,9 +99,10 @@ class ReconocimientoAdmin(admin.ModelAdmin):
 
 
 @admin.register(CursoRealizado)
-class CursoRealizadoAdmin(admin.ModelAdmin):
+class CursoRealizadoAdmin(SeccionCVAdmin):
     list_display = (
         'nombrecurso',
+        'perfil',
         'fechainicio',
         'fechafin',
         'totalhoras',
@@ -66,9 +114,10 @@ class CursoRealizadoAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductoAcademico)
-class ProductoAcademicoAdmin(admin.ModelAdmin):
+class ProductoAcademicoAdmin(SeccionCVAdmin):
     list_display = (
         'nombrerecurso',
+        'perfil',
         'clasificador',
         'activarparaqueseveaenfront'
     )
@@ -77,9 +126,10 @@ class ProductoAcademicoAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProductoLaboral)
-class ProductoLaboralAdmin(admin.ModelAdmin):
+class ProductoLaboralAdmin(SeccionCVAdmin):
     list_display = (
         'nombreproducto',
+        'perfil',
         'fechaproducto',
         'activarparaqueseveaenfront'
     )
@@ -89,12 +139,86 @@ class ProductoLaboralAdmin(admin.ModelAdmin):
 
 
 @admin.register(VentaGarage)
-class VentaGarageAdmin(admin.ModelAdmin):
+class VentaGarageAdmin(SeccionCVAdmin):
     list_display = (
         'nombreproducto',
+        'perfil',
         'estadoproducto',
         'valordelbien',
         'activarparaqueseveaenfront'
     )
     list_filter = ('estadoproducto', 'activarparaqueseveaenfront')
-    search_fields = ('nombreproducto',)
\ No newline at end of file
+    search_fields = ('nombreproducto',)
+
+@admin.register(TrabajoGeneracion)
+class TrabajoGeneracionAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'perfil',
+        'tipo',
+        'estado',
+        'fechacreacion',
+        'fechaactualizacion'
+    )
+    list_filter = ('tipo', 'estado')
+    list_select_related = ('perfil',)
+    show_full_result_count = False
+    exclude = ('resultado',)
+    readonly_fields = ('perfil', 'tipo', 'version', 'estado', 'error')
+
+
+@admin.register(PerfilEjecucion)
+class PerfilEjecucionAdmin(admin.ModelAdmin):
+    list_display = (
+        'fechacreacion',
+        'metodo',
+        'ruta',
+        'tipo',
+        'duracionms',
+        'usuario',
+        'descargas'
+    )
+    list_filter = ('tipo', 'vista')
+    search_fields = ('ruta',)
+    list_select_related = ('usuario',)
+
+    def has_add_permission(self, request):
+        # Se crean solos al perfilar un request (?perfilar=cprofile)
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Descargar')
+    def descargas(self, obj):
+        enlaces = [format_html(
+            '<a href="{}">{}</a>',
+            reverse('admin:cv_perfilejecucion_descargar', args=[obj.pk, 'perfil']), obj.archivo
+        )]
+        if obj.tipo == PerfilEjecucion.CPROFILE:
+            enlaces.append(format_html(
+                '<a href="{}">informe.txt</a>',
+                reverse('admin:cv_perfilejecucion_descargar', args=[obj.pk, 'informe'])
+            ))
+        return mark_safe(' | '.join(enlaces))
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/descargar/<str:que>/',
+                self.admin_site.admin_view(self.descargar),
+                name='cv_perfilejecucion_descargar'
+            ),
+        ] + super().get_urls()
+
+    def descargar(self, request, pk, que):
+        perfil = get_object_or_404(PerfilEjecucion, pk=pk)
+        if not self.has_view_permission(request, perfil):
+            raise Http404
+        ruta = ruta_archivo(perfil)
+        nombre = perfil.archivo
+        if que == 'informe':
+            ruta, nombre = ruta.with_name(f"{ruta.name}.txt"), f"{nombre}.txt"
+        if not ruta.exists():
+            raise Http404("El archivo del perfil ya no existe")
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CvConfig(AppConfig):
     name = 'cv'
+
+    def ready(self):
+        # Registra los receptores que invalidan la cache al editar el CV
+        from . import signals  # noqa: F401
@@ -0,0 +1,246 @@
+"""
+Utilidades de cache del CV.
+
+Cada perfil tiene un contador de versión de contenido que se incrementa
+cuando se confirma un cambio, después de regenerar el snapshot (ver
+snapshot.programar_reconstruccion). Los artefactos
+cacheados (PDF, etc.) incluyen esa versión en su clave, así que al editar
+algo en el admin las claves viejas simplemente dejan de usarse.
+
+Además cada sección del CV (experiencias, cursos, ...) tiene su propio
+contador, que usan los fragmentos {% cache %} de home.html: editar un curso
+solo vuelve a renderizar la sección de cursos.
+
+CacheDisco guarda en disco los bytes de archivos remotos (certificados ya
+transformados por Cloudinary) para no volver a descargarlos, y también los
+ZIP de certificados ya armados (ver certificados.cache_paquetes).
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.cache import cache
+
+
+def _clave_version(perfil_id):
+    return f"cv:version:{perfil_id}"
+
+
+def _clave_version_seccion(perfil_id, seccion):
+    return f"cv:version:{perfil_id}:{seccion}"
+
+
+def _version_inicial():
+    # Usamos milisegundos en vez de 1 para que, si el backend de cache
+    # descarta el contador, nunca volvamos a una versión ya usada.
+    return int(time.time() * 1000)
+
+
+def obtener_version(perfil_id):
+    """Devuelve la versión de contenido actual del perfil."""
+    return cache.get_or_set(_clave_version(perfil_id), _version_inicial, timeout=None)
+
+
+async def aobtener_version(perfil_id):
+    return await cache.aget_or_set(_clave_version(perfil_id), _version_inicial, timeout=None)
+
+
+def incrementar_version(perfil_id):
+    """Invalida todo lo cacheado para el perfil pasando a una nueva versión."""
+    return _incrementar(_clave_version(perfil_id))
+
+
+def versiones_secciones(perfil_id, secciones):
+    """Devuelve {sección: versión} leyendo todos los contadores de una vez."""
+    claves = {_clave_version_seccion(perfil_id, seccion): seccion for seccion in secciones}
+    versiones = cache.get_many(claves)
+    faltantes = {clave: _version_inicial() for clave in claves if clave not in versiones}
+    if faltantes:
+        cache.set_many(faltantes, timeout=None)
+        versiones.update(faltantes)
+    return {claves[clave]: version for clave, version in versiones.items()}
+
+
+def incrementar_version_seccion(perfil_id, seccion):
+    """Invalida los fragmentos cacheados de una sola sección del perfil."""
+    return _incrementar(_clave_version_seccion(perfil_id, seccion))
+
+
+def _incrementar(clave):
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave no existía (o fue descartada por el backend)
+        version = _version_inicial()
+        cache.set(clave, version, timeout=None)
+        return version
+
+
+# Recorrer todo el directorio en cada escritura es O(n): solo se recorta
+# cuando lo estimado supera max_bytes o cada RECORTAR_CADA escrituras (lo
+# que escriben otros procesos no entra en la estimación de este).
+RECORTAR_CADA = 100
+
+# Un .tmp más viejo que esto quedó de una escritura interrumpida
+EDAD_TEMPORAL_HUERFANO = 3600
+
+# Las instancias se crean en cada uso: la estimación es por directorio.
+# directorio -> [bytes estimados o None, escrituras desde el último recorte]
+_estimaciones = {}
+_lock_estimaciones = threading.Lock()
+
+
+class CacheDisco:
+    """
+    Cache en disco direccionada por contenido, con expulsión LRU por tamaño.
+
+    Los bytes se guardan una sola vez en `objetos/` con su sha256 como
+    nombre; `claves/` solo guarda a qué objeto apunta cada clave. La fecha
+    de modificación de cada objeto se actualiza en cada lectura y se usa
+    para expulsar los menos usados cuando se supera `max_bytes`.
+    """
+
+    def __init__(self, directorio, max_bytes):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self._objetos = self.directorio / 'objetos'
+        self._claves = self.directorio / 'claves'
+
+    def _ruta_clave(self, clave):
+        return self._claves / hashlib.sha256(clave.encode()).hexdigest()
+
+    def _ruta_objeto(self, digest):
+        return self._objetos / digest[:2] / digest
+
+    @staticmethod
+    def _escribir(ruta, contenido):
+        # Escritura atómica: nunca se lee un archivo a medio escribir
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp')
+        with os.fdopen(fd, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def obtener(self, clave):
+        """Devuelve los bytes guardados para la clave o None."""
+        try:
+            digest = self._ruta_clave(clave).read_text()
+            ruta = self._ruta_objeto(digest)
+            contenido = ruta.read_bytes()
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(ruta)
+        return contenido
+
+    def ruta(self, clave):
+        """Ruta del archivo guardado para la clave (o None), para quien necesite un path."""
+        try:
+            ruta = self._ruta_objeto(self._ruta_clave(clave).read_text())
+            os.utime(ruta)
+        except (FileNotFoundError, ValueError):
+            return None
+        return ruta
+
+    def guardar(self, clave, contenido):
+        digest = hashlib.sha256(contenido).hexdigest()
+        ruta = self._ruta_objeto(digest)
+        if ruta.exists():
+            os.utime(ruta)
+        else:
+            self._escribir(ruta, contenido)
+        self._escribir(self._ruta_clave(clave), digest.encode())
+        self._anotar_escritura(len(contenido))
+
+    def temporal(self):
+        """Archivo temporal en el mismo disco que la cache, para guardar_archivo."""
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.directorio, prefix='.tmp', delete=False)
+
+    def guardar_archivo(self, clave, ruta):
+        """
+        Como guardar() pero mueve a la cache un archivo ya escrito (de
+        temporal()), sin cargarlo en memoria.
+        """
+        resumen = hashlib.sha256()
+        with open(ruta, 'rb') as archivo:
+            for bloque in iter(lambda: archivo.read(1024 * 1024), b''):
+                resumen.update(bloque)
+        digest = resumen.hexdigest()
+        destino = self._ruta_objeto(digest)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tamano = os.path.getsize(ruta)
+        os.replace(ruta, destino)
+        self._escribir(self._ruta_clave(clave), digest.encode())
+        self._anotar_escritura(tamano)
+
+    def borrar(self, clave):
+        # El objeto queda huérfano y lo terminará expulsando recortar()
+        try:
+            self._ruta_clave(clave).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _anotar_escritura(self, tamano):
+        """Suma lo escrito a la estimación y recorta si hace falta."""
+        with _lock_estimaciones:
+            estimacion = _estimaciones.setdefault(str(self.directorio), [None, 0])
+            if estimacion[0] is not None:
+                estimacion[0] += tamano
+            estimacion[1] += 1
+            # Sin estimación todavía (primera escritura del proceso) se recorre
+            hace_falta = (
+                estimacion[0] is None or estimacion[0] > self.max_bytes or estimacion[1] >= RECORTAR_CADA
+            )
+        if hace_falta:
+            self.recortar()
+
+    def recortar(self):
+        """
+        Expulsa los objetos menos usados hasta quedar bajo max_bytes y borra
+        los .tmp huérfanos.
+        """
+        limite_temporales = time.time() - EDAD_TEMPORAL_HUERFANO
+        objetos = []
+        total = 0
+        for ruta in self._objetos.glob('*/*'):
+            try:
+                estado = ruta.stat()
+            except FileNotFoundError:
+                continue
+            if ruta.name.startswith('.tmp'):
+                # Los recientes son escrituras en curso de _escribir
+                if estado.st_mtime < limite_temporales:
+                    self._borrar_archivo(ruta)
+                continue
+            objetos.append((estado.st_mtime, estado.st_size, ruta))
+            total += estado.st_size
+        self._barrer_temporales(limite_temporales)
+
+        objetos.sort()
+        for _, tamano, ruta in objetos:
+            if total <= self.max_bytes:
+                break
+            self._borrar_archivo(ruta)
+            total -= tamano
+
+        with _lock_estimaciones:
+            _estimaciones[str(self.directorio)] = [total, 0]
+
+    def _barrer_temporales(self, limite):
+        # De temporal() (en la raíz) y de _escribir en claves/
+        for ruta in [*self.directorio.glob('.tmp*'), *self._claves.glob('.tmp*')]:
+            try:
+                if ruta.stat().st_mtime < limite:
+                    ruta.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _borrar_archivo(ruta):
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,527 @@
+"""
+Descarga de certificados desde Cloudinary para armar el ZIP.
+
+Las descargas se hacen en paralelo con un pool de hilos acotado, con un
+límite de tiempo por archivo y otro para el lote completo. Los resultados
+conservan el orden de la selección para que el ZIP sea determinista, y el
+ZIP se va enviando al cliente a medida que llegan. Los JPG ya descargados
+se guardan en una cache local en disco y no se vuelven a pedir.
+
+Los ZIP completos también se guardan (cache_paquetes), con una clave que
+depende solo del conjunto de certificados elegidos y de su contenido: una
+selección repetida se sirve leyendo un archivo. El paquete con todos los
+certificados del perfil se arma apenas cambia uno (construir_paquete, desde
+la cola de cv/trabajos.py).
+
+Las funciones con prefijo `a` (aresolver_seleccion, aiterar_certificados,
+azip_en_streaming) son las equivalentes async que usa cv/vistas_async.py:
+en lugar de hilos usan tareas de asyncio y httpx.
+"""
+import asyncio
+import contextvars
+import hashlib
+import io
+import logging
+import os
+import time
+import zipfile
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import cloudinary
+import cloudinary.utils
+import httpx
+import requests
+from django.conf import settings
+
+from .cache import CacheDisco
+from .metricas import medir
+from .models import CON_CERTIFICADO, ExperienciaLaboral, CursoRealizado, Reconocimiento
+
+logger = logging.getLogger(__name__)
+
+HEADERS_DESCARGA = {'User-Agent': 'Mozilla/5.0'}
+
+# Sube este número si cambia la transformación de url_certificado
+VERSION_TRANSFORMACION = 'jpg-1'
+
+# Prefijo usado en los checkbox del formulario ("exp_12") -> modelo
+MODELOS_POR_PREFIJO = {
+    'exp': ExperienciaLaboral,
+    'cur': CursoRealizado,
+    'rec': Reconocimiento,
+}
+
+
+def _config(nombre, defecto):
+    return getattr(settings, nombre, defecto)
+
+
+def configurar_cloudinary():
+    # Inyectamos credenciales por seguridad
+    cloudinary.config(
+        cloud_name=settings.CLOUDINARY_STORAGE['CLOUD_NAME'],
+        api_key=settings.CLOUDINARY_STORAGE['API_KEY'],
+        api_secret=settings.CLOUDINARY_STORAGE['API_SECRET']
+    )
+
+
+def _leer_seleccion(seleccionados):
+    """("exp_12", ...) -> ([(tipo, id), ...] en orden, {tipo: [ids]})"""
+    seleccion = []
+    ids_por_prefijo = {}
+    for item in dict.fromkeys(seleccionados):
+        tipo, _, id_obj = item.partition('_')
+        if tipo not in MODELOS_POR_PREFIJO or not id_obj.isdigit():
+            logger.warning("Selección de certificado inválida: %r", item)
+            continue
+        seleccion.append((tipo, int(id_obj)))
+        ids_por_prefijo.setdefault(tipo, []).append(int(id_obj))
+    return seleccion, ids_por_prefijo
+
+
+def _nombre_en_zip(tipo, id_obj):
+    return f"certificado_{tipo}_{id_obj}.jpg"
+
+
+def _pendientes(seleccion, objetos):
+    pendientes = []
+    for tipo, id_obj in seleccion:
+        objeto = objetos[tipo].get(id_obj)
+        if objeto and objeto.certificado:
+            pendientes.append((_nombre_en_zip(tipo, id_obj), objeto))
+    return pendientes
+
+
+def resolver_seleccion(perfil, seleccionados):
+    """
+    Convierte los valores del formulario ("exp_12", "cur_3"...) en una lista
+    de (nombre_en_zip, objeto) en el orden en que llegaron.
+
+
+    Se hace una sola consulta in_bulk por modelo, limitada al perfil, así
+    que el número de consultas no depende de cuántos se seleccionen. Los
+    valores inválidos, repetidos, de otro perfil o sin certificado se ignoran.
+    """
+    seleccion, ids_por_prefijo = _leer_seleccion(seleccionados)
+    objetos = {
+        tipo: MODELOS_POR_PREFIJO[tipo].objects.filter(perfil=perfil).in_bulk(ids)
+        for tipo, ids in ids_por_prefijo.items()
+    }
+    return _pendientes(seleccion, objetos)
+
+
+async def aresolver_seleccion(perfil, seleccionados):
+    """Versión async de resolver_seleccion (ain_bulk)."""
+    seleccion, ids_por_prefijo = _leer_seleccion(seleccionados)
+    objetos = {
+        tipo: await MODELOS_POR_PREFIJO[tipo].objects.filter(perfil=perfil).ain_bulk(ids)
+        for tipo, ids in ids_por_prefijo.items()
+    }
+    return _pendientes(seleccion, objetos)
+
+
+def todos_los_pendientes(perfil_id):
+    """Todos los certificados del perfil, como si se hubieran elegido todos."""
+    return [
+        (_nombre_en_zip(tipo, objeto.pk), objeto)
+        for tipo, modelo in MODELOS_POR_PREFIJO.items()
+        for objeto in modelo.objects.filter(CON_CERTIFICADO, perfil_id=perfil_id).order_by('pk')
+    ]
+
+
+def cache_certificados():
+    """Cache local de los certificados ya convertidos a JPG."""
+    return CacheDisco(
+        _config('CV_CERTIFICADOS_CACHE_DIR', os.path.join(settings.BASE_DIR, '.cache', 'certificados')),
+        _config('CV_CERTIFICADOS_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+    )
+
+
+def cache_paquetes():
+    """ZIPs ya armados, por selección."""
+    return CacheDisco(
+        _config('CV_CERTIFICADOS_PAQUETES_DIR', os.path.join(settings.BASE_DIR, '.cache', 'paquetes')),
+        _config('CV_CERTIFICADOS_PAQUETES_MAX_BYTES', 500 * 1024 * 1024)
+    )
+
+
+def clave_paquete(pendientes):
+    """
+    Clave del ZIP de una selección: los certificados elegidos, sin
+    importar el orden, con la versión de su contenido (la huella o, en los
+    subidos antes de normalizar, el nombre en el storage, que cambia al
+    reemplazar el archivo).
+    """
+    partes = sorted(
+        f"{nombre}={objeto.certificadohuella or objeto.certificado.name}" for nombre, objeto in pendientes
+    )
+    return hashlib.sha256('\n'.join([VERSION_TRANSFORMACION, *partes]).encode()).hexdigest()
+
+
+def abrir_paquete(clave):
+    """Archivo abierto del ZIP ya armado para la clave, o None."""
+    ruta = cache_paquetes().ruta(clave)
+    try:
+        return open(ruta, 'rb') if ruta else None
+    except FileNotFoundError:
+        # Lo expulsó recortar() entre medio
+        return None
+
+
+def construir_paquete(pendientes):
+    """
+    Arma y guarda el ZIP de `pendientes` si no estaba ya. Devuelve False si
+    ya estaba; lanza IOError si no se pudieron descargar todos (un paquete
+    incompleto no se guarda).
+    """
+    clave = clave_paquete(pendientes)
+    if not pendientes or cache_paquetes().ruta(clave):
+        return False
+    for _ in zip_en_streaming(iterar_certificados(pendientes), paquete=clave):
+        pass
+    if cache_paquetes().ruta(clave) is None:
+        raise IOError("No se pudieron descargar todos los certificados")
+    return True
+
+
+def certificado_por_huella(huella):
+    """Nombre en el storage de un certificado ya subido con esa huella, o None."""
+    for modelo in MODELOS_POR_PREFIJO.values():
+        nombre = modelo.objects.filter(CON_CERTIFICADO, certificadohuella=huella).values_list(
+            'certificado', flat=True
+        ).first()
+        if nombre:
+            return nombre
+    return None
+
+
+def clave_certificado(public_id):
+    """
+    Clave de cache de un certificado. Al subir un archivo nuevo el
+    public_id cambia; VERSION_TRANSFORMACION invalida todo si alguna vez
+    cambiamos la transformación que pedimos a Cloudinary.
+    """
+    return f"{public_id}@{VERSION_TRANSFORMACION}"
+
+
+def url_certificado(objeto):
+    """URL firmada que entrega el certificado convertido a JPG."""
+    if objeto.certificadohuella:
+        # Normalizado al subirlo: ya es el JPEG final, sin transformación
+        return objeto.certificado.url
+    # Quitamos la extensión (.pdf, .png) del public_id y pedimos un JPG:
+    # así Cloudinary convierte PDFs a imagen y normaliza todo.
+    public_id_clean = os.path.splitext(objeto.certificado.name)[0]
+    file_url, options = cloudinary.utils.cloudinary_url(
+        public_id_clean,
+        resource_type="image",
+        format="jpg",
+        sign_url=True,
+        secure=True
+    )
+    return file_url
+
+
+def descargar(url, timeout):
+    """
+    Descarga la URL completa respetando un tiempo máximo total (no solo
+    entre paquetes, como hace el timeout de requests).
+    """
+    limite = time.monotonic() + timeout
+    with medir('http'), requests.get(url, headers=HEADERS_DESCARGA, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            raise IOError(f"HTTP {response.status_code}")
+        partes = []
+        for parte in response.iter_content(chunk_size=64 * 1024):
+            if time.monotonic() > limite:
+                raise TimeoutError(f"Más de {timeout}s descargando")
+            partes.append(parte)
+        return b"".join(partes)
+
+
+async def adescargar(cliente, url, timeout):
+    """Como descargar() pero con un httpx.AsyncClient: no ocupa un hilo mientras espera."""
+    with medir('http'):
+        try:
+            async with asyncio.timeout(timeout):
+                async with cliente.stream('GET', url, headers=HEADERS_DESCARGA) as response:
+                    if response.status_code != 200:
+                        raise IOError(f"HTTP {response.status_code}")
+                    return await response.aread()
+        except TimeoutError:
+            raise TimeoutError(f"Más de {timeout}s descargando") from None
+
+
+def _descargar_y_cachear(cache_local, objeto, timeout):
+    contenido = descargar(url_certificado(objeto), timeout)
+    cache_local.guardar(clave_certificado(objeto.certificado.name), contenido)
+    return contenido
+
+
+class Resultado(namedtuple('Resultado', 'nombre contenido error')):
+    """Resultado de un certificado: `contenido` es None si falló."""
+
+    @property
+    def ok(self):
+        return self.contenido is not None
+
+
+def iterar_certificados(pendientes):
+    """
+    Descarga en paralelo los certificados de `pendientes`, una lista de
+    (nombre_en_zip, objeto), y va entregando un Resultado por cada uno en
+    el mismo orden de entrada.
+
+    Solo hay `max_hilos` descargas en vuelo a la vez: la siguiente se lanza
+    cuando se consume un resultado, así la memoria no depende de cuántos
+    certificados se pidan.
+    """
+    timeout_archivo = _config('CV_CERTIFICADOS_TIMEOUT_ARCHIVO', 15)
+    timeout_total = _config('CV_CERTIFICADOS_TIMEOUT_TOTAL', 45)
+    max_hilos = _config('CV_CERTIFICADOS_MAX_HILOS', 6)
+
+    if not pendientes:
+        return
+
+    configurar_cloudinary()
+    cache_local = cache_certificados()
+    limite = time.monotonic() + timeout_total
+    fallidos = []
+    en_vuelo = deque()
+    cola = iter(pendientes)
+
+    pool = ThreadPoolExecutor(max_workers=min(max_hilos, len(pendientes)))
+    try:
+        def lanzar_siguiente():
+            for nombre, objeto in cola:
+                contenido = cache_local.obtener(clave_certificado(objeto.certificado.name))
+                if contenido is not None:
+                    # Ya lo tenemos en disco: no hace falta ir a la red
+                    futuro = Future()
+                    futuro.set_result(contenido)
+                else:
+                    # Con el contexto del request, para que las métricas lleguen a su Medicion
+                    futuro = pool.submit(
+                        contextvars.copy_context().run, _descargar_y_cachear, cache_local, objeto, timeout_archivo
+                    )
+                en_vuelo.append((nombre, futuro))
+                return
+
+        for _ in range(max_hilos):
+            lanzar_siguiente()
+
+        while en_vuelo:
+            nombre, futuro = en_vuelo.popleft()
+            try:
+                resultado = Resultado(nombre, futuro.result(timeout=max(0, limite - time.monotonic())), None)
+            except FuturesTimeout as e:
+                # Es el TimeoutError de siempre: si la descarga ya terminó,
+                # es su propio límite por archivo y no el del lote
+                if futuro.done():
+                    resultado = Resultado(nombre, None, str(e))
+                else:
+                    futuro.cancel()
+                    resultado = Resultado(nombre, None, "tiempo total agotado")
+            except Exception as e:
+                resultado = Resultado(nombre, None, str(e))
+
+            if not resultado.ok:
+                fallidos.append(resultado)
+            lanzar_siguiente()
+            yield resultado
+    finally:
+        # No esperamos a las descargas que quedaron colgadas
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if fallidos:
+        logger.warning(
+            "Fallaron %d de %d certificados: %s",
+            len(fallidos), len(pendientes),
+            ", ".join(f"{r.nombre} ({r.error})" for r in fallidos)
+        )
+
+
+async def aiterar_certificados(pendientes):
+    """
+    Versión async de iterar_certificados: las descargas son tareas de
+    asyncio sobre un solo httpx.AsyncClient, con la misma ventana de
+    CV_CERTIFICADOS_MAX_HILOS descargas en vuelo, los mismos límites de
+    tiempo y la misma cache en disco.
+    """
+    timeout_archivo = _config('CV_CERTIFICADOS_TIMEOUT_ARCHIVO', 15)
+    timeout_total = _config('CV_CERTIFICADOS_TIMEOUT_TOTAL', 45)
+    max_en_vuelo = _config('CV_CERTIFICADOS_MAX_HILOS', 6)
+
+    if not pendientes:
+        return
+
+    configurar_cloudinary()
+    cache_local = cache_certificados()
+    limite = time.monotonic() + timeout_total
+    fallidos = []
+    en_vuelo = deque()
+    cola = iter(pendientes)
+
+    async def descargar_y_cachear(cliente, objeto):
+        contenido = await adescargar(cliente, url_certificado(objeto), timeout_archivo)
+        await asyncio.to_thread(cache_local.guardar, clave_certificado(objeto.certificado.name), contenido)
+        return contenido
+
+    async with httpx.AsyncClient(follow_redirects=True) as cliente:
+        async def lanzar_siguiente():
+            for nombre, objeto in cola:
+                contenido = await asyncio.to_thread(cache_local.obtener, clave_certificado(objeto.certificado.name))
+                if contenido is not None:
+                    futuro = asyncio.get_running_loop().create_future()
+                    futuro.set_result(contenido)
+                else:
+                    futuro = asyncio.create_task(descargar_y_cachear(cliente, objeto))
+                en_vuelo.append((nombre, futuro))
+                return
+
+        try:
+            for _ in range(max_en_vuelo):
+                await lanzar_siguiente()
+
+            while en_vuelo:
+                nombre, futuro = en_vuelo.popleft()
+                try:
+                    contenido = await asyncio.wait_for(futuro, max(0, limite - time.monotonic()))
+                    resultado = Resultado(nombre, contenido, None)
+                except TimeoutError as e:
+                    # wait_for cancela la tarea al vencer el lote; si no, la
+                    # descarga agotó su propio límite por archivo
+                    motivo = "tiempo total agotado" if futuro.cancelled() else str(e)
+                    resultado = Resultado(nombre, None, motivo)
+                except Exception as e:
+                    resultado = Resultado(nombre, None, str(e))
+
+                if not resultado.ok:
+                    fallidos.append(resultado)
+                await lanzar_siguiente()
+                yield resultado
+        finally:
+            for _, futuro in en_vuelo:
+                futuro.cancel()
+
+    if fallidos:
+        logger.warning(
+            "Fallaron %d de %d certificados: %s",
+            len(fallidos), len(pendientes),
+            ", ".join(f"{r.nombre} ({r.error})" for r in fallidos)
+        )
+
+
+class _SalidaZip(io.RawIOBase):
+    """
+    Destino no 'seekable' para ZipFile: acumula lo escrito hasta que
+    zip_en_streaming lo entrega al cliente.
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+class _EscritorZip:
+    """
+    Arma el ZIP entrada por entrada y devuelve en cada paso los bytes
+    nuevos. Lo comparten zip_en_streaming y su versión async.
+
+    Los JPG se guardan sin comprimir (ZIP_STORED): deflate casi no los
+    reduce y cuesta CPU. Al final se agrega un .txt con los que fallaron.
+
+    Con `paquete` (una clave_paquete) los bytes se copian además a un
+    archivo que, si no faltó ningún certificado, queda en cache_paquetes.
+    """
+
+    def __init__(self, paquete=None):
+        self._salida = _SalidaZip()
+        self._zip = zipfile.ZipFile(self._salida, "w", zipfile.ZIP_STORED)
+        self._fallidos = []
+        self._paquete = paquete
+        self._copia = cache_paquetes().temporal() if paquete else None
+
+    def _entregar(self):
+        datos = self._salida.vaciar()
+        if self._copia:
+            self._copia.write(datos)
+        return datos
+
+    def agregar(self, resultado):
+        if not resultado.ok:
+            self._fallidos.append((resultado.nombre, resultado.error))
+            return b""
+        self._zip.writestr(resultado.nombre, resultado.contenido)
+        return self._entregar()
+
+    def cerrar(self):
+        if self._fallidos:
+            self._zip.writestr(
+                "certificados_no_incluidos.txt",
+                resumen_fallidos(self._fallidos),
+                compress_type=zipfile.ZIP_DEFLATED
+            )
+        # Directorio central del ZIP
+        self._zip.close()
+        datos = self._entregar()
+        if self._copia:
+            self._copia.close()
+            if not self._fallidos:
+                cache_paquetes().guardar_archivo(self._paquete, self._copia.name)
+        return datos
+
+    def descartar(self):
+        """Borra la copia si el ZIP no llegó a guardarse (cliente que corta, fallos)."""
+        if self._copia:
+            self._copia.close()
+            try:
+                os.unlink(self._copia.name)
+            except FileNotFoundError:
+                pass
+
+
+def zip_en_streaming(resultados, paquete=None):
+    """Genera el ZIP por partes a medida que llegan los certificados."""
+    escritor = _EscritorZip(paquete)
+    try:
+        for resultado in resultados:
+            parte = escritor.agregar(resultado)
+            if parte:
+                yield parte
+        yield escritor.cerrar()
+    finally:
+        escritor.descartar()
+
+
+async def azip_en_streaming(resultados, paquete=None):
+    """zip_en_streaming para un iterador async de resultados."""
+    escritor = _EscritorZip(paquete)
+    try:
+        async for resultado in resultados:
+            parte = escritor.agregar(resultado)
+            if parte:
+                yield parte
+        # Guardar el paquete recorre el archivo entero: fuera del event loop
+        yield await asyncio.to_thread(escritor.cerrar)
+    finally:
+        escritor.descartar()
+
+
+def resumen_fallidos(fallidos):
+    """Texto que se agrega al ZIP para que el usuario sepa qué faltó."""
+    lineas = ["No se pudieron incluir los siguientes certificados:", ""]
+    lineas += [f"- {nombre}: {motivo}" for nombre, motivo in fallidos]
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,167 @@
+"""
+Derivados responsivos de las imágenes subidas (foto de perfil y artículos
+de venta de garage).
+
+Al guardar una imagen nueva se generan versiones de 160/320/640/1280 px
+de ancho en WebP y JPEG en el mismo storage del campo (Cloudinary o disco
+local). Las URLs se guardan en un JSONField del modelo y la etiqueta
+{% imagen_responsive %} arma el <picture> con srcset y sizes.
+
+Los certificados, en cambio, se normalizan antes de subirlos (ver
+normalizar_certificado): se guarda un único JPEG de tamaño razonable.
+"""
+import hashlib
+import io
+import logging
+import os
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+ANCHOS = (160, 320, 640, 1280)
+
+FORMATOS = {
+    # nombre: (formato de Pillow, extensión, opciones)
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'progressive': True, 'optimize': True}),
+}
+
+
+def _anchos_para(ancho_original):
+    # No agrandamos: si la original es más chica que el mayor ancho, ella
+    # misma (re-codificada) es el último tamaño
+    configurados = getattr(settings, 'CV_IMAGENES_ANCHOS', ANCHOS)
+    anchos = [ancho for ancho in configurados if ancho < ancho_original]
+    if len(anchos) < len(configurados):
+        anchos.append(ancho_original)
+    return anchos
+
+
+def generar_derivados(campo):
+    """
+    Genera los derivados del ImageField/FieldFile `campo` y los sube a su
+    storage. Devuelve el dict que se guarda en el JSONField del modelo:
+    {'origen': nombre, 'webp': [[ancho, nombre, url], ...], 'jpeg': [...]}
+    """
+    storage = campo.storage
+    with campo.open('rb') as archivo:
+        original = Image.open(archivo)
+        original.load()
+    original = ImageOps.exif_transpose(original).convert('RGB')
+
+    base, _ = os.path.splitext(campo.name)
+    carpeta = f"derivados/{base}"
+    derivados = {'origen': campo.name}
+    for nombre_formato in FORMATOS:
+        derivados[nombre_formato] = []
+
+    for ancho in _anchos_para(original.width):
+        alto = max(1, round(original.height * ancho / original.width))
+        reducida = original.resize((ancho, alto), Image.LANCZOS) if ancho != original.width else original
+        for nombre_formato, (formato, extension, opciones) in FORMATOS.items():
+            contenido = io.BytesIO()
+            reducida.save(contenido, formato, **opciones)
+            nombre = storage.save(f"{carpeta}/{ancho}.{extension}", ContentFile(contenido.getvalue()))
+            derivados[nombre_formato].append([ancho, nombre, storage.url(nombre)])
+    return derivados
+
+
+def reducir_para_impresion(contenido, lado_maximo):
+    """
+    Reduce una imagen (bytes) para que su lado mayor no pase de
+    `lado_maximo` píxeles y la devuelve como JPEG (PNG si tiene
+    transparencia). Si ya es pequeña solo se recodifica.
+    """
+    imagen = Image.open(io.BytesIO(contenido))
+    imagen = ImageOps.exif_transpose(imagen)
+    imagen.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+    salida = io.BytesIO()
+    if imagen.mode in ('RGBA', 'LA') or 'transparency' in imagen.info:
+        imagen.save(salida, 'PNG', optimize=True)
+    else:
+        imagen.convert('RGB').save(salida, 'JPEG', quality=85, optimize=True, progressive=True)
+    return salida.getvalue()
+
+
+class ImagenInvalida(ValueError):
+    pass
+
+
+CertificadoNormalizado = namedtuple('CertificadoNormalizado', 'contenido huella ancho alto')
+
+
+def _normalizar(archivo, lado_maximo):
+    archivo.seek(0)
+    try:
+        imagen = Image.open(archivo)
+        imagen.load()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        raise ImagenInvalida("El archivo no es una imagen válida o está dañado.")
+    finally:
+        archivo.seek(0)
+
+    imagen = ImageOps.exif_transpose(imagen)
+    imagen.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+    if imagen.mode in ('RGBA', 'LA') or 'transparency' in imagen.info:
+        # JPEG no tiene transparencia: fondo blanco, como se imprime
+        con_alfa = imagen.convert('RGBA')
+        imagen = Image.new('RGB', imagen.size, 'white')
+        imagen.paste(con_alfa, mask=con_alfa.getchannel('A'))
+    salida = io.BytesIO()
+    imagen.convert('RGB').save(salida, 'JPEG', quality=85, optimize=True, progressive=True)
+    contenido = salida.getvalue()
+    return CertificadoNormalizado(contenido, hashlib.sha256(contenido).hexdigest(), imagen.width, imagen.height)
+
+
+def normalizar_certificado(campo):
+    """
+    Decodifica el certificado recién subido (FieldFile sin guardar),
+    lo reduce a CV_CERTIFICADOS_LADO_MAXIMO y lo recodifica como JPEG.
+    Lanza ImagenInvalida si no es una imagen. El resultado queda en el
+    FieldFile: el validador del modelo y la señal de guardado decodifican
+    una sola vez.
+    """
+    if getattr(campo, '_cv_normalizado', None) is None:
+        lado_maximo = getattr(settings, 'CV_CERTIFICADOS_LADO_MAXIMO', 2480)
+        campo._cv_normalizado = _normalizar(campo.file, lado_maximo)
+    return campo._cv_normalizado
+
+
+def borrar_derivados(storage, derivados):
+    """Borra del storage los archivos de un dict de derivados (si puede)."""
+    for nombre_formato in FORMATOS:
+        for _, nombre, _ in derivados.get(nombre_formato, []):
+            try:
+                storage.delete(nombre)
+            except Exception:
+                logger.warning("No se pudo borrar el derivado %s", nombre)
+
+
+def actualizar_derivados(instance, campo_imagen, campo_derivados):
+    """
+    Regenera los derivados si la imagen cambió desde la última vez. Se
+    guarda con update() para no volver a disparar las señales de guardado.
+    """
+    campo = getattr(instance, campo_imagen)
+    anteriores = getattr(instance, campo_derivados) or {}
+    nombre = campo.name if campo else None
+    if anteriores.get('origen') == nombre:
+        return
+
+    nuevos = {}
+    if campo:
+        try:
+            nuevos = generar_derivados(campo)
+        except Exception:
+            # Si falla, las plantillas usan la imagen original
+            logger.exception("No se pudieron generar derivados de %s", nombre)
+            return
+
+    borrar_derivados(campo.storage, anteriores)
+    type(instance).objects.filter(pk=instance.pk).update(**{campo_derivados: nuevos})
+    setattr(instance, campo_derivados, nuevos)
+    return nuevos
@@ -0,0 +1,56 @@
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from cv.models import DatosPersonales
+from cv.snapshot import SECCIONES
+
+# Filas por consulta al recorrer cada tabla: la memoria no depende del tamaño del CV
+TAMANO_LOTE = 2000
+
+
+class _SalidaComando:
+    """El stdout del comando como `stream` de los serializadores: escribe tal cual, sin agregar saltos de línea."""
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+    def write(self, texto):
+        self.stdout.write(texto, ending='')
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta un perfil y todas sus secciones (visibles u ocultas) como "
+        "JSON Lines, una fila por línea, en el formato de serialización de "
+        "Django. Los archivos se exportan por nombre, sin su contenido. "
+        "Se vuelve a cargar con cv_import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'perfil', nargs='?',
+            help="Slug o número de cédula del perfil (por defecto, el perfil activo)."
+        )
+        parser.add_argument('-o', '--salida', help="Archivo de salida (por defecto, la salida estándar).")
+
+    def handle(self, *args, **options):
+        identificador = options['perfil']
+        if identificador:
+            perfil = DatosPersonales.objects.filter(Q(slug=identificador) | Q(numerocedula=identificador)).first()
+        else:
+            perfil = DatosPersonales.objects.filter(perfilactivo=True).first()
+        if perfil is None:
+            raise CommandError("No existe ese perfil." if identificador else "No hay un perfil activo para exportar.")
+
+        # Igual que dumpdata: se escribe directo al archivo o a stdout, sin acumular
+        salida = open(options['salida'], 'w', encoding='utf-8') if options['salida'] else None
+        try:
+            destino = salida or _SalidaComando(self.stdout)
+            serializers.serialize('jsonl', [perfil], stream=destino)
+            for modelo in SECCIONES.values():
+                filas = modelo.objects.filter(perfil=perfil).order_by('pk').iterator(chunk_size=TAMANO_LOTE)
+                serializers.serialize('jsonl', filas, stream=destino)
+        finally:
+            if salida:
+                salida.close()
@@ -0,0 +1,135 @@
+import sys
+
+from django.core import serializers
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import transaction
+
+from cv.models import DatosPersonales
+from cv.signals import invalidar_perfiles
+from cv.snapshot import SECCIONES
+
+MAX_ERRORES = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa un perfil exportado con cv_export. Lee el archivo línea "
+        "por línea y guarda las secciones con bulk_create por lotes, todo en "
+        "una sola transacción: si alguna fila no pasa la validación de su "
+        "modelo (clean() y validadores de campos) no se guarda nada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Archivo JSON Lines ('-' para la entrada estándar).")
+        parser.add_argument('--lote', type=int, default=1000, help="Filas por INSERT (por defecto 1000).")
+        parser.add_argument(
+            '--reemplazar', action='store_true',
+            help="Si ya existe un perfil con la misma cédula, lo actualiza y reemplaza todas sus secciones."
+        )
+
+    def handle(self, *args, **options):
+        self.lote = options['lote']
+        self.errores = []
+        entrada = sys.stdin if options['archivo'] == '-' else open(options['archivo'], encoding='utf-8')
+        try:
+            with transaction.atomic():
+                perfil, totales = self._importar(entrada, options['reemplazar'])
+        except DeserializationError as e:
+            raise CommandError(f"Archivo inválido: {e}")
+        finally:
+            if entrada is not sys.stdin:
+                entrada.close()
+
+        resumen = ', '.join(f"{total} {nombre}" for nombre, total in totales.items() if total)
+        self.stdout.write(self.style.SUCCESS(f"Perfil {perfil.slug} importado ({resumen or 'sin secciones'})"))
+
+    def _importar(self, entrada, reemplazar):
+        objetos = serializers.deserialize('jsonl', entrada, ignorenonexistent=True)
+        primero = next(objetos, None)
+        if primero is None or not isinstance(primero.object, DatosPersonales):
+            raise CommandError("La primera línea debe ser el perfil (cv.datospersonales).")
+        perfil = self._guardar_perfil(primero.object, reemplazar)
+
+        nombres = {modelo: nombre for nombre, modelo in SECCIONES.items()}
+        pendientes = {modelo: [] for modelo in nombres}
+        totales = dict.fromkeys(SECCIONES, 0)
+        for linea, deserializado in enumerate(objetos, start=2):
+            objeto = deserializado.object
+            modelo = type(objeto)
+            if modelo not in pendientes:
+                self._error(linea, f"modelo no admitido: {objeto._meta.label}")
+                continue
+            objeto.pk = None
+            objeto.perfil_id = perfil.pk
+            pendientes[modelo].append((linea, objeto))
+            totales[nombres[modelo]] += 1
+            if len(pendientes[modelo]) >= self.lote:
+                self._guardar_lote(modelo, pendientes[modelo])
+                pendientes[modelo] = []
+
+        for modelo, filas in pendientes.items():
+            self._guardar_lote(modelo, filas)
+
+        if self.errores:
+            raise CommandError("No se importó nada:\n" + '\n'.join(self.errores))
+
+        # bulk_create no dispara señales: invalidamos y reconstruimos el snapshot a mano
+        for modelo, nombre in nombres.items():
+            if totales[nombre]:
+                invalidar_perfiles(modelo, [perfil.pk])
+        return perfil, totales
+
+    def _guardar_perfil(self, perfil, reemplazar):
+        existente = DatosPersonales.objects.filter(numerocedula=perfil.numerocedula).first()
+        if existente and not reemplazar:
+            raise CommandError(
+                f"Ya existe un perfil con la cédula {perfil.numerocedula}; usa --reemplazar para sobrescribirlo."
+            )
+
+        # El deserializador arma instancias "nuevas"; adding decide si
+        # full_clean compara la unicidad contra la propia fila
+        perfil._state.adding = existente is None
+        if existente:
+            perfil.pk = existente.pk
+            perfil.perfilactivo = existente.perfilactivo
+            self._borrar_secciones(existente)
+        else:
+            perfil.pk = None
+            # Solo puede haber un perfil activo: el importado queda visible en /cv/<slug>/
+            perfil.perfilactivo = not DatosPersonales.objects.filter(perfilactivo=True).exists()
+        if DatosPersonales.objects.filter(slug=perfil.slug).exclude(pk=perfil.pk).exists():
+            perfil.slug = ''
+
+        try:
+            perfil.full_clean(exclude=['slug'])
+        except ValidationError as e:
+            raise CommandError(f"línea 1: {'; '.join(e.messages)}")
+        perfil.save()
+        return perfil
+
+    def _borrar_secciones(self, perfil):
+        # Por lotes: delete() carga las filas en memoria para mandar las señales
+        for modelo in SECCIONES.values():
+            while True:
+                ids = list(modelo.objects.filter(perfil=perfil).values_list('pk', flat=True)[:self.lote])
+                if not ids:
+                    break
+                modelo.objects.filter(pk__in=ids).delete()
+
+    def _guardar_lote(self, modelo, filas):
+        for linea, objeto in filas:
+            try:
+                # Sin 'perfil' ni unicidad: serían una consulta por fila
+                objeto.full_clean(exclude=['perfil'], validate_unique=False, validate_constraints=False)
+            except ValidationError as e:
+                self._error(linea, '; '.join(e.messages))
+        # Con errores se sigue validando para informarlos todos, pero ya no se inserta
+        if filas and not self.errores:
+            modelo.objects.bulk_create([objeto for _, objeto in filas], batch_size=self.lote)
+
+    def _error(self, linea, mensaje):
+        self.errores.append(f"línea {linea}: {mensaje}")
+        if len(self.errores) >= MAX_ERRORES:
+            raise CommandError("No se importó nada:\n" + '\n'.join(self.errores + ["(hay más errores)"]))
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from cv.certificados import MODELOS_POR_PREFIJO
+from cv.models import CON_CERTIFICADO, SnapshotPerfil
+from cv.pdf import nombre_renderizador
+from cv.perfiles import obtener_perfil_activo
+from cv.snapshot import contexto_snapshot
+
+# Al lado del directorio exportado, no dentro: no se publica
+SUFIJO_MANIFIESTO = '.export.json'
+# Lo que en la app es una vista y en el sitio estático un archivo
+ARCHIVO_PDF = 'cv/pdf/CV.pdf'
+ARCHIVO_ZIP = 'certificados/todos.zip'
+PLANTILLAS = Path(__file__).resolve().parents[2] / 'templates' / 'cv'
+
+
+def _sha256(*partes):
+    resumen = hashlib.sha256()
+    for parte in partes:
+        resumen.update(parte if isinstance(parte, bytes) else str(parte).encode())
+    return resumen.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta las páginas públicas, el PDF y un ZIP con todos los "
+        "certificados a un directorio estático. Solo reescribe los archivos "
+        "cuyos datos de entrada cambiaron desde la última exportación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--destino', default=os.path.join(settings.BASE_DIR, 'export'),
+            help="Directorio de salida (por defecto ./export)."
+        )
+        parser.add_argument(
+            '--forzar', action='store_true',
+            help="Regenera todo aunque las entradas no hayan cambiado."
+        )
+        parser.add_argument(
+            '--sin-certificados', action='store_true',
+            help="No genera el ZIP de certificados (evita ir a Cloudinary)."
+        )
+
+    def handle(self, *args, **options):
+        perfil = obtener_perfil_activo()
+        if perfil is None:
+            raise CommandError("No hay un perfil activo para exportar.")
+
+        self.destino = Path(options['destino']).resolve()
+        self.destino.mkdir(parents=True, exist_ok=True)
+        ruta_manifiesto = self.destino.with_name(self.destino.name + SUFIJO_MANIFIESTO)
+        self.manifiesto = json.loads(ruta_manifiesto.read_text()) if ruta_manifiesto.exists() else {}
+        # Las exportaciones anteriores lo dejaban dentro del sitio publicado
+        (self.destino / SUFIJO_MANIFIESTO).unlink(missing_ok=True)
+        self.forzar = options['forzar']
+        self.cliente = Client()
+
+        # Todo lo visible del CV está en el snapshot: si no cambió (ni las
+        # plantillas), las páginas y el PDF tampoco.
+        contexto_snapshot(perfil.pk)  # lo genera si todavía no existe
+        snapshot = SnapshotPerfil.objects.get(pk=perfil.pk)
+        huella_cv = _sha256(
+            json.dumps(snapshot.datos, sort_keys=True),
+            *(ruta.read_bytes() for ruta in sorted(PLANTILLAS.glob('*.html')))
+        )
+
+        # En el sitio estático los enlaces van a los archivos exportados (o
+        # se quitan). La selección de certificados es un formulario (POST):
+        # se enlaza directamente el ZIP con todos, si lo hay.
+        url_seleccion = reverse('seleccionar_certificados')
+        enlaces = {url_seleccion: None}
+        if not options['sin_certificados']:
+            seleccion = []
+            for prefijo, modelo in MODELOS_POR_PREFIJO.items():
+                filas = modelo.objects.filter(CON_CERTIFICADO, perfil=perfil).order_by('pk')
+                seleccion += [f"{prefijo}_{pk}:{nombre}" for pk, nombre in filas.values_list('pk', 'certificado')]
+            if seleccion and self.exportar(
+                '/' + ARCHIVO_ZIP, ARCHIVO_ZIP, _sha256(*seleccion),
+                lambda: self.cliente.post(url_seleccion, {'certificados': [item.split(':')[0] for item in seleccion]})
+            ):
+                enlaces[url_seleccion] = '/' + ARCHIVO_ZIP
+
+        url_pdf = reverse('cv_pdf')
+        enlaces[url_pdf] = None
+        # Cambiar de renderizador cambia el PDF aunque el CV sea el mismo
+        if self.exportar(url_pdf, ARCHIVO_PDF, _sha256(huella_cv, nombre_renderizador()),
+                         lambda: self.cliente.get(url_pdf)):
+            enlaces[url_pdf] = '/' + ARCHIVO_PDF
+
+        # Las páginas cambian también si cambia a qué archivo enlazan
+        huella_paginas = _sha256(huella_cv, json.dumps(enlaces, sort_keys=True))
+        # En el sitio estático no hay endpoint de páginas: todo el catálogo va junto
+        with override_settings(CV_VENTA_GARAGE_POR_PAGINA=10 ** 9):
+            for nombre_url in ('welcome', 'home', 'venta_garage'):
+                url = reverse(nombre_url)
+                self.exportar(
+                    url, self._archivo_para(url), huella_paginas,
+                    lambda url=url: self.cliente.get(url),
+                    transformar=lambda contenido: _reescribir_enlaces(contenido, enlaces)
+                )
+
+        ruta_manifiesto.write_text(json.dumps(self.manifiesto, indent=2, sort_keys=True))
+
+    def _archivo_para(self, url):
+        """'/hoja-de-vida/' -> hoja-de-vida/index.html"""
+        relativa = url.lstrip('/')
+        if not relativa or relativa.endswith('/'):
+            relativa += 'index.html'
+        return relativa
+
+    def exportar(self, url, archivo, huella, obtener, transformar=None):
+        """Exporta `url` a `archivo` si cambió. Devuelve si el archivo quedó en el sitio."""
+        anterior = self.manifiesto.get(url)
+        if anterior and anterior['huella'] == huella and anterior['archivo'] == archivo \
+                and not self.forzar and (self.destino / archivo).exists():
+            self.stdout.write(f"  sin cambios  {url}")
+            return True
+
+        response = obtener()
+        if response.status_code != 200:
+            self.stderr.write(f"  error {response.status_code}  {url}")
+            return False
+        contenido = b''.join(response.streaming_content) if response.streaming else response.content
+        if url.endswith('.zip') and not response.get('Content-Type', '').startswith('application/zip'):
+            self.stderr.write(f"  error (no es un ZIP)  {url}")
+            return False
+        if transformar:
+            contenido = transformar(contenido)
+
+        sha = _sha256(contenido)
+        ruta = self.destino / archivo
+        if anterior and anterior['sha256'] == sha and ruta.exists():
+            self.stdout.write(f"  idéntico     {url}")
+        else:
+            # Escritura atómica para que el servidor nunca sirva un archivo a medias
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            fd, temporal = tempfile.mkstemp(dir=ruta.parent, prefix='.tmp')
+            with os.fdopen(fd, 'wb') as salida:
+                salida.write(contenido)
+            os.replace(temporal, ruta)
+            self.stdout.write(self.style.SUCCESS(f"  exportado    {url} -> {archivo}"))
+
+        if anterior and anterior['archivo'] != archivo:
+            (self.destino / anterior['archivo']).unlink(missing_ok=True)
+        self.manifiesto[url] = {'huella': huella, 'sha256': sha, 'archivo': archivo}
+        return True
+
+
+def _reescribir_enlaces(contenido, enlaces):
+    """Apunta los enlaces a los archivos exportados; quita los que no tienen uno."""
+    html = contenido.decode()
+    for url, archivo in enlaces.items():
+        if archivo:
+            html = html.replace(f'href="{url}"', f'href="{archivo}"')
+        else:
+            html = re.sub(rf'<a href="{re.escape(url)}"[^>]*>.*?</a>', '', html, flags=re.S)
+    return html.encode()
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cv.trabajos import procesar_siguiente, reencolar_atascados
+from cv.views import get_contexto_perfil
+
+
+class Command(BaseCommand):
+    help = "Worker local que genera los PDFs y ZIPs de certificados encolados."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0,
+            help="Segundos de espera cuando la cola está vacía."
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help="Procesa lo que haya en la cola y termina."
+        )
+        parser.add_argument(
+            '--atascados-min', type=int, default=10,
+            help="Reencola trabajos en proceso hace más de estos minutos."
+        )
+
+    def handle(self, *args, **options):
+        reencolados = reencolar_atascados(options['atascados_min'])
+        if reencolados:
+            self.stdout.write(f"Reencolados {reencolados} trabajos atascados")
+
+        try:
+            while True:
+                trabajo = procesar_siguiente(get_contexto_perfil)
+                if trabajo is not None:
+                    self.stdout.write(f"{trabajo} procesado")
+                    continue
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido")
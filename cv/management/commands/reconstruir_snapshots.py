@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from cv.models import DatosPersonales
+from cv.snapshot import reconstruir_snapshot
+
+
+class Command(BaseCommand):
+    help = "Regenera el snapshot JSON de todos los perfiles."
+
+    def handle(self, *args, **options):
+        total = 0
+        for perfil_id in DatosPersonales.objects.values_list('pk', flat=True).iterator():
+            reconstruir_snapshot(perfil_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} snapshots reconstruidos"))
@@ -0,0 +1,241 @@
+"""
+Métricas de rendimiento por request.
+
+MetricasMiddleware abre una Medicion para cada request; mientras dura, el
+tiempo de SQL (un execute_wrapper en cada conexión), de plantillas (backend
+DjangoTemplatesMedidas), de generación de PDF y de descargas HTTP
+(`medir('pdf')` / `medir('http')` en cv/pdf.py y cv/certificados.py) se
+acumula en ella. Al terminar se suma a histogramas en memoria que la vista
+`metricas` expone en formato de texto de Prometheus, y se manda como
+cabecera Server-Timing solo a staff (o a todos con CV_SERVER_TIMING): los
+tiempos de SQL y de descargas dicen demasiado del servidor para publicarlos.
+
+Los histogramas son por proceso: con varios workers cada uno publica los
+suyos y Prometheus los agrega (sum by le) al calcular el p95.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+# (nombre en Server-Timing, descripción)
+COMPONENTES = {
+    'sql': "SQL",
+    'plantilla': "Plantillas",
+    'pdf': "Generación de PDF",
+    'http': "Descargas HTTP (suma de los hilos)",
+}
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_medicion_actual = contextvars.ContextVar('cv_medicion', default=None)
+
+
+class Medicion:
+    """Tiempos acumulados de un request. Se puede sumar desde varios hilos."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.tiempos = dict.fromkeys(COMPONENTES, 0.0)
+        self.consultas = 0
+        self._lock = threading.Lock()
+
+    def sumar(self, componente, segundos):
+        with self._lock:
+            self.tiempos[componente] += segundos
+            if componente == 'sql':
+                self.consultas += 1
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def server_timing(self):
+        partes = [
+            f'{nombre};dur={self.tiempos[nombre] * 1000:.1f};desc="{descripcion}"'
+            for nombre, descripcion in COMPONENTES.items() if self.tiempos[nombre]
+        ]
+        partes.append(f'total;dur={self.total() * 1000:.1f}')
+        return ', '.join(partes)
+
+
+@contextmanager
+def medir(componente):
+    """Suma la duración del bloque al componente del request actual (si hay uno)."""
+    medicion = _medicion_actual.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if medicion is not None:
+            medicion.sumar(componente, time.perf_counter() - inicio)
+
+
+def _medir_sql(execute, sql, params, many, context):
+    with medir('sql'):
+        return execute(sql, params, many, context)
+
+
+def instalar_medicion_sql(sender, connection, **kwargs):
+    """
+    Receptor de connection_created (ver cv/signals.py). El wrapper queda
+    instalado en la conexión para siempre y solo mide si hay una Medicion
+    en el contexto; así también cubre las consultas del ORM async, que
+    corren en otro hilo con una copia del contexto.
+    """
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+# --- Histogramas ---
+
+class Histograma:
+    """Histograma acumulativo al estilo Prometheus, con una serie por vista."""
+
+    def __init__(self, nombre, ayuda, limites):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = limites
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, vista, valor):
+        with self._lock:
+            serie = self._series.setdefault(vista, {'cubetas': [0] * len(self.limites), 'suma': 0.0, 'cuenta': 0})
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie['cubetas'][i] += 1
+            serie['suma'] += valor
+            serie['cuenta'] += 1
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for vista, serie in sorted(self._series.items()):
+                for limite, cuenta in zip(self.limites, serie['cubetas']):
+                    lineas.append(f'{self.nombre}_bucket{{vista="{vista}",le="{limite}"}} {cuenta}')
+                lineas.append(f'{self.nombre}_bucket{{vista="{vista}",le="+Inf"}} {serie["cuenta"]}')
+                lineas.append(f'{self.nombre}_sum{{vista="{vista}"}} {serie["suma"]}')
+                lineas.append(f'{self.nombre}_count{{vista="{vista}"}} {serie["cuenta"]}')
+        return lineas
+
+
+HISTOGRAMAS = {
+    'total': Histograma('cv_request_duration_seconds', "Duración total del request.", LIMITES_SEGUNDOS),
+    'consultas': Histograma('cv_sql_queries', "Consultas SQL por request.", LIMITES_CONSULTAS),
+    'sql': Histograma('cv_sql_duration_seconds', "Tiempo en SQL por request.", LIMITES_SEGUNDOS),
+    'plantilla': Histograma('cv_template_duration_seconds', "Tiempo renderizando plantillas por request.", LIMITES_SEGUNDOS),
+    'pdf': Histograma('cv_pdf_duration_seconds', "Tiempo generando PDF por request.", LIMITES_SEGUNDOS),
+    'http': Histograma('cv_http_duration_seconds', "Tiempo en descargas HTTP por request.", LIMITES_SEGUNDOS),
+}
+
+
+def registrar(vista, medicion):
+    HISTOGRAMAS['total'].observar(vista, medicion.total())
+    HISTOGRAMAS['consultas'].observar(vista, medicion.consultas)
+    for componente in COMPONENTES:
+        HISTOGRAMAS[componente].observar(vista, medicion.tiempos[componente])
+
+
+def exponer():
+    """Todos los histogramas en formato de texto de Prometheus."""
+    lineas = []
+    for histograma in HISTOGRAMAS.values():
+        lineas += histograma.exponer()
+    return '\n'.join(lineas) + '\n'
+
+
+# --- Middleware y backend de plantillas ---
+
+def _mostrar_tiempos(user):
+    if getattr(settings, 'CV_SERVER_TIMING', False):
+        return True
+    return user is not None and user.is_staff
+
+
+class MetricasMiddleware:
+    """Sirve para WSGI y ASGI; con vistas async no obliga a pasar por un hilo."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        user = getattr(request, 'user', None)
+        return self._terminar(request, response, medicion, _mostrar_tiempos(user))
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        user = await request.auser() if hasattr(request, 'auser') else None
+        return self._terminar(request, response, medicion, _mostrar_tiempos(user))
+
+    def _terminar(self, request, response, medicion, mostrar_tiempos):
+        if mostrar_tiempos:
+            response['Server-Timing'] = medicion.server_timing()
+        vista = getattr(request.resolver_match, 'url_name', None) or 'sin_ruta'
+        if not response.streaming:
+            registrar(vista, medicion)
+        # El ZIP se sigue generando después de enviar las cabeceras: los
+        # histogramas se actualizan cuando termina el streaming.
+        elif response.is_async:
+            response.streaming_content = self._al_terminar_async(response.streaming_content, medicion, vista)
+        else:
+            response.streaming_content = self._al_terminar(response.streaming_content, medicion, vista)
+        return response
+
+    @staticmethod
+    def _al_terminar(contenido, medicion, vista):
+        # Un generador no puede usar reset(token): puede reanudarse en otro contexto
+        _medicion_actual.set(medicion)
+        try:
+            yield from contenido
+        finally:
+            _medicion_actual.set(None)
+            registrar(vista, medicion)
+
+    @staticmethod
+    async def _al_terminar_async(contenido, medicion, vista):
+        _medicion_actual.set(medicion)
+        try:
+            async for parte in contenido:
+                yield parte
+        finally:
+            _medicion_actual.set(None)
+            registrar(vista, medicion)
+
+
+class PlantillaMedida(Template):
+
+    def render(self, context=None, request=None):
+        with medir('plantilla'):
+            return super().render(context, request)
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """Backend DjangoTemplates que mide el tiempo de render de cada plantilla."""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name).template, self)
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0009_alter_cursorealizado_certificado_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoGeneracion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('pdf', 'PDF de la hoja de vida')], default='pdf', max_length=10)),
+                ('version', models.BigIntegerField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=10)),
+                ('resultado', models.BinaryField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('fechacreacion', models.DateTimeField(auto_now_add=True)),
+                ('fechaactualizacion', models.DateTimeField(auto_now=True)),
+                ('perfil', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='cv.datospersonales')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'fechacreacion'], name='cv_trabajog_estado_0a859c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('perfil', 'tipo', 'version'), name='trabajo_unico_por_version')],
+            },
+        ),
+    ]
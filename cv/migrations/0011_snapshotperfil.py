@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0010_trabajogeneracion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotPerfil',
+            fields=[
+                ('perfil', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='cv.datospersonales')),
+                ('datos', models.JSONField()),
+                ('fechaactualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0012_fechaactualizacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cursorealizado',
+            index=models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='cur_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cursorealizado',
+            index=models.Index(condition=models.Q(('certificado__gt', '')), fields=['perfil'], name='cur_con_certificado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experiencialaboral',
+            index=models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='exp_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experiencialaboral',
+            index=models.Index(condition=models.Q(('certificado__gt', '')), fields=['perfil'], name='exp_con_certificado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoacademico',
+            index=models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='pacad_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productolaboral',
+            index=models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='plab_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reconocimiento',
+            index=models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='rec_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reconocimiento',
+            index=models.Index(condition=models.Q(('certificado__gt', '')), fields=['perfil'], name='rec_con_certificado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='venta_perfil_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fechapublicacion'], name='venta_listado_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:48
+
+from django.db import migrations, models
+
+
+def dejar_un_solo_perfil_activo(apps, schema_editor):
+    # Antes de la restricción la vista tomaba el primero por id: conservamos ese
+    DatosPersonales = apps.get_model('cv', 'DatosPersonales')
+    activo = DatosPersonales.objects.filter(perfilactivo=True).order_by('pk').first()
+    if activo is not None:
+        DatosPersonales.objects.filter(perfilactivo=True).exclude(pk=activo.pk).update(perfilactivo=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0013_indices_visibilidad_certificados'),
+    ]
+
+    operations = [
+        migrations.RunPython(dejar_un_solo_perfil_activo, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='datospersonales',
+            constraint=models.UniqueConstraint(condition=models.Q(('perfilactivo', True)), fields=('perfilactivo',), name='unico_perfil_activo', violation_error_message='Ya existe otro perfil activo. Desactívalo antes de activar este.'),
+        ),
+    ]
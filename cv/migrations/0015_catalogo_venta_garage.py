@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0014_unico_perfil_activo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ventagarage',
+            name='venta_listado_idx',
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', '-fechapublicacion', '-id'], name='venta_listado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', 'estadoproducto', '-fechapublicacion', '-id'], name='venta_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ventagarage',
+            index=models.Index(condition=models.Q(('activarparaqueseveaenfront', True)), fields=['perfil', 'valordelbien'], name='venta_precio_idx'),
+        ),
+    ]
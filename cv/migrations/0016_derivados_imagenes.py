@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0015_catalogo_venta_garage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datospersonales',
+            name='fotoperfilderivados',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ventagarage',
+            name='imagenderivados',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
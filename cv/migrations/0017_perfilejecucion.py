@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-17 21:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0016_derivados_imagenes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilEjecucion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ruta', models.CharField(max_length=500)),
+                ('vista', models.CharField(blank=True, max_length=100)),
+                ('metodo', models.CharField(max_length=10)),
+                ('tipo', models.CharField(choices=[('cprofile', 'Árbol de llamadas (cProfile)'), ('muestreo', 'Pilas por muestreo (flame graph)')], max_length=10)),
+                ('duracionms', models.FloatField()),
+                ('archivo', models.CharField(max_length=255)),
+                ('tamano', models.PositiveIntegerField(default=0)),
+                ('fechacreacion', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-fechacreacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:10
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def generar_slugs(apps, schema_editor):
+    # Misma regla que DatosPersonales.generar_slug (el modelo histórico no tiene el método)
+    DatosPersonales = apps.get_model('cv', 'DatosPersonales')
+    usados = {'pdf'}
+    for perfil in DatosPersonales.objects.order_by('pk').iterator():
+        base = slugify(f"{perfil.nombres} {perfil.apellidos}")[:70] or 'perfil'
+        candidato, n = base, 1
+        while candidato in usados or candidato.isdigit():
+            n += 1
+            candidato = f"{base}-{n}"
+        usados.add(candidato)
+        DatosPersonales.objects.filter(pk=perfil.pk).update(slug=candidato)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0017_perfilejecucion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datospersonales',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=80, null=True),
+        ),
+        migrations.RunPython(generar_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='datospersonales',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=80, unique=True),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 6.0.1 on 2026-10-17 21:18
+
+import cv.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0018_datospersonales_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cursorealizado',
+            name='certificadoalto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cursorealizado',
+            name='certificadoancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cursorealizado',
+            name='certificadohuella',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='cursorealizado',
+            name='certificadotamano',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificadoalto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificadoancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificadohuella',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='experiencialaboral',
+            name='certificadotamano',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimiento',
+            name='certificadoalto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimiento',
+            name='certificadoancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='reconocimiento',
+            name='certificadohuella',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='reconocimiento',
+            name='certificadotamano',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cursorealizado',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/cursos/', validators=[cv.models.validar_extension_imagen, cv.models.validar_imagen_certificado]),
+        ),
+        migrations.AlterField(
+            model_name='experiencialaboral',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/experiencia/', validators=[cv.models.validar_extension_imagen, cv.models.validar_imagen_certificado]),
+        ),
+        migrations.AlterField(
+            model_name='reconocimiento',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/reconocimientos/', validators=[cv.models.validar_extension_imagen, cv.models.validar_imagen_certificado]),
+        ),
+        migrations.AddIndex(
+            model_name='cursorealizado',
+            index=models.Index(condition=models.Q(('certificadohuella__gt', '')), fields=['certificadohuella'], name='cur_cert_huella_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='experiencialaboral',
+            index=models.Index(condition=models.Q(('certificadohuella__gt', '')), fields=['certificadohuella'], name='exp_cert_huella_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reconocimiento',
+            index=models.Index(condition=models.Q(('certificadohuella__gt', '')), fields=['certificadohuella'], name='rec_cert_huella_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 21:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0019_certificado_normalizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajogeneracion',
+            name='tipo',
+            field=models.CharField(choices=[('pdf', 'PDF de la hoja de vida'), ('certificados', 'ZIP con todos los certificados')], default='pdf', max_length=12),
+        ),
+    ]
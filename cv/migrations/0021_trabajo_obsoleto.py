@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0020_trabajo_certificados'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajogeneracion',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error'), ('obsoleto', 'Obsoleto')], default='pendiente', max_length=10),
+        ),
+    ]
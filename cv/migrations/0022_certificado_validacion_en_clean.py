@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:40
+
+import cv.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0021_trabajo_obsoleto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cursorealizado',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/cursos/', validators=[cv.models.validar_extension_imagen]),
+        ),
+        migrations.AlterField(
+            model_name='experiencialaboral',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/experiencia/', validators=[cv.models.validar_extension_imagen]),
+        ),
+        migrations.AlterField(
+            model_name='reconocimiento',
+            name='certificado',
+            field=models.FileField(blank=True, null=True, upload_to='certificados/reconocimientos/', validators=[cv.models.validar_extension_imagen]),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv', '0022_certificado_validacion_en_clean'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='cursorealizado',
+            name='fechaactualizacion',
+        ),
+        migrations.RemoveField(
+            model_name='datospersonales',
+            name='fechaactualizacion',
+        ),
+        migrations.RemoveField(
+            model_name='experiencialaboral',
+            name='fechaactualizacion',
+        ),
+        migrations.RemoveField(
+            model_name='productoacademico',
+            name='fechaactualizacion',
+        ),
+        migrations.RemoveField(
+            model_name='productolaboral',
+            name='fechaactualizacion',
+        ),
+        migrations.RemoveField(
+            model_name='reconocimiento',
+            name='fechaactualizacion',
+        ),
+        migrations.RemoveField(
+            model_name='ventagarage',
+            name='fechaactualizacion',
+        ),
+    ]
@@ -1,10 +1,22 @@
 import os
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from django.utils.text import slugify
 from django.utils.timezone import now
 from datetime import timedelta
 
+from .imagenes import ImagenInvalida, normalizar_certificado
+
+# Slugs que chocan con rutas fijas bajo /cv/ (cv/urls.py)
+SLUGS_RESERVADOS = {'pdf'}
+
+# Filas con un certificado cargado. Se usa igual en las consultas y en la
+# condición de los índices parciales para que el planificador los aproveche.
+CON_CERTIFICADO = models.Q(certificado__gt='')
+
+
 # --- VALIDADOR PERSONALIZADO ---
 def validar_extension_imagen(value):
     """
@@ -18,6 +30,37 @@ def validar_extension_imagen(value):
         raise ValidationError("No se acepta formatos pdf, Solo se aceptan imagenes en formato PNG Y JPG")
 
 
+def validar_imagen_certificado(value):
+    """
+    Para archivos recién subidos: comprueba que realmente sean una imagen
+    (la extensión no alcanza). La señal ingerir_certificado reutiliza la
+    imagen ya decodificada.
+    """
+    if getattr(value, '_committed', True):
+        return
+    try:
+        normalizar_certificado(value)
+    except ImagenInvalida as e:
+        raise ValidationError(str(e))
+
+
+class ConCertificado:
+    """
+    Para los modelos con certificado: clean() valida el archivo recién
+    subido y lo deja normalizado. La señal ingerir_certificado no valida
+    (un save() sin full_clean() no debe fallar con ValidationError), solo
+    guarda los bytes normalizados.
+    """
+
+    def clean(self):
+        super().clean()
+        if self.certificado:
+            try:
+                validar_imagen_certificado(self.certificado)
+            except ValidationError as e:
+                raise ValidationError({'certificado': e.messages})
+
+
 class DatosPersonales(models.Model):
     descripcionperfil = models.CharField(max_length=50)
     perfilactivo = models.BooleanField(default=True)
@@ -27,6 +70,8 @@ class DatosPersonales(models.Model):
     lugarnacimiento = models.CharField(max_length=60)
     fechanacimiento = models.DateField()
     numerocedula = models.CharField(max_length=10, unique=True)
+    # Identificador público en las URLs /cv/<slug>/ (se genera al guardar)
+    slug = models.SlugField(max_length=80, unique=True, blank=True)
 
     sexo = models.CharField(
         max_length=1,
@@ -38,6 +83,8 @@ class DatosPersonales(models.Model):
         blank=True,
         null=True
     )
+    # Versiones reducidas de fotoperfil (ver cv/imagenes.py)
+    fotoperfilderivados = models.JSONField(default=dict, blank=True, editable=False)
 
     estadocivil = models.CharField(max_length=50)
     licenciaconducir = models.CharField(
@@ -54,9 +101,36 @@ class DatosPersonales(models.Model):
     direcciondomiciliaria = models.CharField(max_length=50)
     sitioweb = models.URLField(max_length=100, blank=True)
 
+    class Meta:
+        constraints = [
+            # Las vistas públicas muestran "el" perfil activo: solo puede haber uno
+            models.UniqueConstraint(
+                fields=['perfilactivo'],
+                condition=models.Q(perfilactivo=True),
+                name='unico_perfil_activo',
+                violation_error_message="Ya existe otro perfil activo. Desactívalo antes de activar este."
+            ),
+        ]
+
     def __str__(self):
         return f"{self.apellidos} {self.nombres}"
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = self.generar_slug()
+        super().save(*args, **kwargs)
+
+    def generar_slug(self):
+        """nombres-apellidos, con sufijo numérico si ya está tomado."""
+        base = slugify(f"{self.nombres} {self.apellidos}")[:70] or 'perfil'
+        candidato, n = base, 1
+        otros = DatosPersonales.objects.exclude(pk=self.pk)
+        # Un slug de solo dígitos se confundiría con una cédula en /cv/<slug>/
+        while candidato in SLUGS_RESERVADOS or candidato.isdigit() or otros.filter(slug=candidato).exists():
+            n += 1
+            candidato = f"{base}-{n}"
+        return candidato
+
     def clean(self):
         if self.fechanacimiento > now().date():
             raise ValidationError(
@@ -64,7 +138,7 @@ class DatosPersonales(models.Model):
             )
 
 
-class ExperienciaLaboral(models.Model):
+class ExperienciaLaboral(ConCertificado, models.Model):
     perfil = models.ForeignKey(DatosPersonales, on_delete=models.CASCADE)
     cargodesempenado = models.CharField(max_length=100)
     nombrempresa = models.CharField(max_length=50)
@@ -82,10 +156,34 @@ class ExperienciaLaboral(models.Model):
         upload_to='certificados/experiencia/',
         blank=True,
         null=True,
-        validators=[validar_extension_imagen] 
+        validators=[validar_extension_imagen]
     )
+    # Certificado normalizado al subirlo (ver signals.ingerir_certificado).
+    # La huella (sha256 del JPEG) evita guardar dos veces el mismo archivo.
+    certificadohuella = models.CharField(max_length=64, blank=True, editable=False)
+    certificadotamano = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    certificadoancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    certificadoalto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Todas las lecturas públicas filtran por perfil + visibles
+            models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='exp_perfil_visible_idx'),
+            # Solo filas con certificado (seleccionar_certificados)
+            models.Index(
+                fields=['perfil'],
+                condition=CON_CERTIFICADO,
+                name='exp_con_certificado_idx'
+            ),
+            models.Index(
+                fields=['certificadohuella'],
+                condition=models.Q(certificadohuella__gt=''),
+                name='exp_cert_huella_idx'
+            ),
+        ]
 
     def clean(self):
+        super().clean()
         if self.fechafingestion < self.fechainiciogestion:
             raise ValidationError("La fecha fin no puede ser menor que la fecha inicio")
 
@@ -96,7 +194,7 @@ class ExperienciaLaboral(models.Model):
             raise ValidationError("La fecha de fin no puede estar en el futuro (no puedes certificar experiencia que aún no ocurre).")
 
 
-class Reconocimiento(models.Model):
+class Reconocimiento(ConCertificado, models.Model):
     perfil = models.ForeignKey(DatosPersonales, on_delete=models.CASCADE)
     tiporeconocimiento = models.CharField(
         max_length=100,
@@ -119,16 +217,40 @@ class Reconocimiento(models.Model):
         null=True,
         validators=[validar_extension_imagen]
     )
+    # Certificado normalizado al subirlo (ver signals.ingerir_certificado).
+    # La huella (sha256 del JPEG) evita guardar dos veces el mismo archivo.
+    certificadohuella = models.CharField(max_length=64, blank=True, editable=False)
+    certificadotamano = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    certificadoancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    certificadoalto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Todas las lecturas públicas filtran por perfil + visibles
+            models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='rec_perfil_visible_idx'),
+            # Solo filas con certificado (seleccionar_certificados)
+            models.Index(
+                fields=['perfil'],
+                condition=CON_CERTIFICADO,
+                name='rec_con_certificado_idx'
+            ),
+            models.Index(
+                fields=['certificadohuella'],
+                condition=models.Q(certificadohuella__gt=''),
+                name='rec_cert_huella_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.descripcionreconocimiento
 
     def clean(self):
+        super().clean()
         if self.fechareconocimiento > now().date():
             raise ValidationError("La fecha del reconocimiento no puede estar en el futuro")
 
 
-class CursoRealizado(models.Model):
+class CursoRealizado(ConCertificado, models.Model):
     perfil = models.ForeignKey(DatosPersonales, on_delete=models.CASCADE)
     nombrecurso = models.CharField(max_length=100)
     fechainicio = models.DateField()
@@ -147,11 +269,35 @@ class CursoRealizado(models.Model):
         null=True,
         validators=[validar_extension_imagen]
     )
+    # Certificado normalizado al subirlo (ver signals.ingerir_certificado).
+    # La huella (sha256 del JPEG) evita guardar dos veces el mismo archivo.
+    certificadohuella = models.CharField(max_length=64, blank=True, editable=False)
+    certificadotamano = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    certificadoancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    certificadoalto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Todas las lecturas públicas filtran por perfil + visibles
+            models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='cur_perfil_visible_idx'),
+            # Solo filas con certificado (seleccionar_certificados)
+            models.Index(
+                fields=['perfil'],
+                condition=CON_CERTIFICADO,
+                name='cur_con_certificado_idx'
+            ),
+            models.Index(
+                fields=['certificadohuella'],
+                condition=models.Q(certificadohuella__gt=''),
+                name='cur_cert_huella_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.nombrecurso
 
     def clean(self):
+        super().clean()
         if self.fechafin < self.fechainicio:
             raise ValidationError("La fecha fin no puede ser menor que la fecha inicio")
 
@@ -163,6 +309,12 @@ class ProductoAcademico(models.Model):
     descripcion = models.CharField(max_length=200)
     activarparaqueseveaenfront = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Todas las lecturas públicas filtran por perfil + visibles
+            models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='pacad_perfil_visible_idx'),
+        ]
+
     def __str__(self):
         return self.nombrerecurso
 
@@ -174,6 +326,12 @@ class ProductoLaboral(models.Model):
     descripcion = models.CharField(max_length=100)
     activarparaqueseveaenfront = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Todas las lecturas públicas filtran por perfil + visibles
+            models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='plab_perfil_visible_idx'),
+        ]
+
     def __str__(self):
         return self.nombreproducto
 
@@ -206,6 +364,30 @@ class VentaGarage(models.Model):
     
     fechapublicacion = models.DateField(default=now)
     imagen = models.ImageField(upload_to='venta_garage/', blank=True, null=True)
+    # Versiones reducidas de imagen (ver cv/imagenes.py)
+    imagenderivados = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['perfil', 'activarparaqueseveaenfront'], name='venta_perfil_visible_idx'),
+            # Catálogo de venta_garage: solo visibles, ya ordenado por el
+            # cursor (fechapublicacion, id) y con los filtros del listado
+            models.Index(
+                fields=['perfil', '-fechapublicacion', '-id'],
+                condition=models.Q(activarparaqueseveaenfront=True),
+                name='venta_listado_idx'
+            ),
+            models.Index(
+                fields=['perfil', 'estadoproducto', '-fechapublicacion', '-id'],
+                condition=models.Q(activarparaqueseveaenfront=True),
+                name='venta_estado_idx'
+            ),
+            models.Index(
+                fields=['perfil', 'valordelbien'],
+                condition=models.Q(activarparaqueseveaenfront=True),
+                name='venta_precio_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.nombreproducto
@@ -216,4 +398,116 @@ class VentaGarage(models.Model):
 
         fecha_limite_pasado = now().date() - timedelta(days=365)
         if self.fechapublicacion < fecha_limite_pasado:
-            raise ValidationError("La fecha es demasiado antigua. No se permiten publicaciones de hace más de 1 año.")
\ No newline at end of file
+            raise ValidationError("La fecha es demasiado antigua. No se permiten publicaciones de hace más de 1 año.")
+
+class TrabajoGeneracion(models.Model):
+    """
+    Cola de trabajos en base de datos para generar artefactos pesados
+    (el PDF del CV y el ZIP con todos los certificados) fuera del ciclo
+    de la petición. Los procesa el comando `manage.py procesar_trabajos`.
+    """
+    TIPO_PDF = 'pdf'
+    # El ZIP queda en cv.certificados.cache_paquetes, no en `resultado`
+    TIPO_CERTIFICADOS = 'certificados'
+
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    LISTO = 'listo'
+    ERROR = 'error'
+    # El perfil cambió antes de procesarlo: ya hay (o habrá) uno de la versión nueva
+    OBSOLETO = 'obsoleto'
+
+    perfil = models.ForeignKey(DatosPersonales, on_delete=models.CASCADE)
+    tipo = models.CharField(
+        max_length=12,
+        choices=[
+            (TIPO_PDF, 'PDF de la hoja de vida'),
+            (TIPO_CERTIFICADOS, 'ZIP con todos los certificados')
+        ],
+        default=TIPO_PDF
+    )
+    version = models.BigIntegerField()
+    estado = models.CharField(
+        max_length=10,
+        choices=[
+            (PENDIENTE, 'Pendiente'),
+            (PROCESANDO, 'Procesando'),
+            (LISTO, 'Listo'),
+            (ERROR, 'Error'),
+            (OBSOLETO, 'Obsoleto')
+        ],
+        default=PENDIENTE
+    )
+    resultado = models.BinaryField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+    fechaactualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Peticiones idénticas para la misma versión comparten un solo trabajo
+            models.UniqueConstraint(
+                fields=['perfil', 'tipo', 'version'],
+                name='trabajo_unico_por_version'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['estado', 'fechacreacion']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.estado})"
+
+
+class SnapshotPerfil(models.Model):
+    """
+    Copia desnormalizada del CV visible de un perfil, serializada en un
+    solo JSON. Las páginas públicas y el PDF se renderizan desde aquí con
+    una lectura por clave primaria. Se reconstruye desde las señales
+    (ver cv/snapshot.py); nunca se edita a mano.
+    """
+    perfil = models.OneToOneField(
+        DatosPersonales,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='snapshot'
+    )
+    datos = models.JSONField()
+    fechaactualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot de {self.perfil_id}"
+
+
+class PerfilEjecucion(models.Model):
+    """
+    Perfil de rendimiento de un request, capturado a pedido de un usuario
+    staff (ver cv/perfilado.py). El archivo vive en CV_PERFILADO_DIR; aquí
+    solo queda el índice para listarlo y descargarlo desde el admin.
+    """
+    CPROFILE = 'cprofile'
+    MUESTREO = 'muestreo'
+
+    ruta = models.CharField(max_length=500)
+    vista = models.CharField(max_length=100, blank=True)
+    metodo = models.CharField(max_length=10)
+    tipo = models.CharField(
+        max_length=10,
+        choices=[
+            (CPROFILE, 'Árbol de llamadas (cProfile)'),
+            (MUESTREO, 'Pilas por muestreo (flame graph)')
+        ]
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    duracionms = models.FloatField()
+    archivo = models.CharField(max_length=255)
+    tamano = models.PositiveIntegerField(default=0)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fechacreacion']
+
+    def __str__(self):
+        return f"{self.metodo} {self.ruta} ({self.duracionms:.0f} ms)"
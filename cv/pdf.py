@@ -0,0 +1,206 @@
+"""
+Generación y cache del PDF de la hoja de vida.
+
+El PDF se guarda en la cache de Django bajo una clave que incluye el perfil
+y su versión de contenido, así que las descargas repetidas no vuelven a
+pasar por la plantilla ni por el renderizador.
+
+El renderizador se elige con CV_PDF_RENDERIZADOR (ver RENDERIZADORES):
+'html' convierte cv/cv_pdf.html con xhtml2pdf y 'reportlab' arma la misma
+hoja con platypus, sin parsear HTML ni CSS (cv/pdf_reportlab.py). Los dos
+reciben el contexto de get_contexto_perfil y devuelven los bytes del PDF.
+
+`resolver_enlace` es el link_callback de xhtml2pdf: convierte las URLs de
+static/media en rutas locales y baja una sola vez las imágenes remotas a
+una cache en disco, ya reducidas a la resolución con que se imprimen.
+"""
+import asyncio
+import contextvars
+import functools
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+from django.utils.module_loading import import_string
+from xhtml2pdf import pisa
+
+from .cache import CacheDisco, aobtener_version, obtener_version
+from .certificados import descargar
+from .imagenes import reducir_para_impresion
+from .metricas import medir
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+# La foto de cv_pdf.html mide 140px CSS (96 por pulgada); a 300 ppp son
+# unos 440 píxeles reales. Más que eso solo engorda el PDF.
+LADO_MAXIMO_IMPRESION = round(140 * 300 / 96)
+
+# Nombre en CV_PDF_RENDERIZADOR -> función contexto -> bytes
+RENDERIZADORES = {
+    'html': 'cv.pdf.renderizar_html',
+    'reportlab': 'cv.pdf_reportlab.renderizar_reportlab',
+}
+
+
+class ErrorGeneracionPDF(Exception):
+    """xhtml2pdf reportó errores al convertir la plantilla."""
+
+    def __init__(self, html):
+        super().__init__("Error generando el PDF")
+        self.html = html
+
+
+def nombre_renderizador():
+    return getattr(settings, 'CV_PDF_RENDERIZADOR', 'html')
+
+
+def _clave_pdf(perfil_id, version):
+    # Con el renderizador en la clave, cambiarlo no sirve PDFs del otro
+    return f"cv:pdf:{nombre_renderizador()}:{perfil_id}:{version}"
+
+
+def cache_imagenes_pdf():
+    return CacheDisco(
+        getattr(settings, 'CV_PDF_IMAGENES_CACHE_DIR', os.path.join(settings.BASE_DIR, '.cache', 'pdf')),
+        getattr(settings, 'CV_PDF_IMAGENES_CACHE_MAX_BYTES', 50 * 1024 * 1024),
+    )
+
+
+def _ruta_local(uri):
+    """Ruta en disco para una URL de static o media, o None si no es local."""
+    ruta_url = urlsplit(uri).path
+    static_url = '/' + settings.STATIC_URL.lstrip('/')
+    if ruta_url.startswith(static_url):
+        relativa = ruta_url[len(static_url):]
+        return finders.find(relativa) or _si_existe(os.path.join(settings.STATIC_ROOT, relativa))
+    media_url = getattr(settings, 'MEDIA_URL', None)
+    if media_url and ruta_url.startswith('/' + media_url.lstrip('/')):
+        try:
+            return _si_existe(default_storage.path(ruta_url[len('/' + media_url.lstrip('/')):]))
+        except NotImplementedError:
+            # Storage remoto (Cloudinary): no hay archivo local
+            return None
+    return None
+
+
+def _si_existe(ruta):
+    return ruta if ruta and os.path.isfile(ruta) else None
+
+
+def _imagen_reducida(cache_local, clave, obtener_contenido):
+    """Ruta de la imagen reducida en la cache, generándola si hace falta."""
+    ruta = cache_local.ruta(clave)
+    if ruta is None:
+        cache_local.guardar(clave, reducir_para_impresion(obtener_contenido(), LADO_MAXIMO_IMPRESION))
+        ruta = cache_local.ruta(clave)
+    return str(ruta)
+
+
+def resolver_enlace(uri, rel=None):
+    """
+    link_callback para pisa.CreatePDF. Devuelve una ruta local para todo
+    lo que se pueda resolver sin red; las imágenes remotas se bajan una vez
+    y quedan en cache. Si algo falla se devuelve '' y el PDF sale sin esa
+    imagen en lugar de que xhtml2pdf intente ir a la red.
+    """
+    es_imagen = urlsplit(uri).path.lower().endswith(EXTENSIONES_IMAGEN)
+    local = _ruta_local(uri)
+    if local and not es_imagen:
+        return local
+
+    cache_local = cache_imagenes_pdf()
+    clave = f"{LADO_MAXIMO_IMPRESION}:{uri}"
+    try:
+        if local:
+            # La fecha de modificación en la clave invalida si cambia el archivo
+            clave = f"{LADO_MAXIMO_IMPRESION}:{local}:{os.path.getmtime(local)}"
+            with open(local, 'rb') as archivo:
+                return _imagen_reducida(cache_local, clave, archivo.read)
+        if es_imagen and urlsplit(uri).scheme in ('http', 'https'):
+            timeout = getattr(settings, 'CV_CERTIFICADOS_TIMEOUT_ARCHIVO', 15)
+            return _imagen_reducida(cache_local, clave, lambda: descargar(uri, timeout))
+    except Exception:
+        logger.warning("No se pudo preparar la imagen %s para el PDF", uri, exc_info=True)
+        return ''
+    return uri
+
+
+def renderizar_html(context):
+    """Renderiza cv/cv_pdf.html y lo convierte a PDF con xhtml2pdf. Devuelve los bytes."""
+    html = get_template('cv/cv_pdf.html').render(context)
+    destino = io.BytesIO()
+    with medir('pdf'):
+        pisa_status = pisa.CreatePDF(html, dest=destino, link_callback=resolver_enlace)
+    if pisa_status.err:
+        raise ErrorGeneracionPDF(html)
+    return destino.getvalue()
+
+
+def renderizar_pdf(context, renderizador=None):
+    """Genera el PDF con `renderizador` (por defecto, el de CV_PDF_RENDERIZADOR)."""
+    nombre = renderizador or nombre_renderizador()
+    if nombre not in RENDERIZADORES:
+        raise ImproperlyConfigured(
+            f"CV_PDF_RENDERIZADOR debe ser uno de {', '.join(RENDERIZADORES)}; no {nombre!r}."
+        )
+    return import_string(RENDERIZADORES[nombre])(context)
+
+
+def obtener_pdf(perfil, construir_contexto):
+    """
+    Devuelve un dict con 'contenido' (bytes) y 'etag' del PDF del perfil.
+
+    Solo llama a construir_contexto(perfil) y renderiza si no hay una copia
+    cacheada para la versión actual del perfil.
+    """
+    clave = _clave_pdf(perfil.pk, obtener_version(perfil.pk))
+    artefacto = cache.get(clave)
+    if artefacto is None:
+        artefacto = _artefacto(renderizar_pdf(construir_contexto(perfil)))
+        cache.set(clave, artefacto, _timeout_pdf())
+    return artefacto
+
+
+async def aobtener_pdf(perfil, aconstruir_contexto):
+    """
+    Versión async de obtener_pdf. El render es bloqueante y usa CPU, así
+    que el render va a un pool de CV_PDF_HILOS hilos propio y el event
+    loop sigue atendiendo otros requests mientras tanto.
+    """
+    clave = _clave_pdf(perfil.pk, await aobtener_version(perfil.pk))
+    artefacto = await cache.aget(clave)
+    if artefacto is None:
+        contexto = await aconstruir_contexto(perfil)
+        contenido = await asyncio.get_running_loop().run_in_executor(
+            _pool_pdf(), contextvars.copy_context().run, renderizar_pdf, contexto
+        )
+        artefacto = _artefacto(contenido)
+        await cache.aset(clave, artefacto, _timeout_pdf())
+    return artefacto
+
+
+def _artefacto(contenido):
+    return {
+        'contenido': contenido,
+        'etag': '"%s"' % hashlib.md5(contenido).hexdigest(),
+    }
+
+
+def _timeout_pdf():
+    return getattr(settings, 'CV_PDF_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+
+
+@functools.cache
+def _pool_pdf():
+    return ThreadPoolExecutor(max_workers=getattr(settings, 'CV_PDF_HILOS', 2), thread_name_prefix='cv-pdf')
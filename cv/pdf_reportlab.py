@@ -0,0 +1,292 @@
+"""
+Renderizador nativo del PDF con ReportLab (platypus).
+
+Arma la misma hoja que cv/cv_pdf.html directamente desde el contexto del
+snapshot, sin pasar por la plantilla ni por el parser de HTML/CSS de
+xhtml2pdf. La primera página tiene la barra lateral oscura (foto,
+contacto, datos personales y reconocimientos) y la columna de contenido;
+las siguientes solo continúan la columna de contenido. A diferencia de
+xhtml2pdf, que achica la columna de contenido hasta que entra en una sola
+página, aquí el contenido sigue en páginas nuevas con los tamaños de la
+plantilla (ver CV_PDF_RENDERIZADOR en settings).
+
+Las medidas son las de la plantilla: 1px CSS = 0,75 pt. La foto se
+resuelve con el mismo `resolver_enlace` que usa xhtml2pdf, así que
+comparte la cache de imágenes reducidas.
+"""
+import io
+from xml.sax.saxutils import escape
+
+from django.template.defaultfilters import date as formato_fecha
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_JUSTIFY
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import (
+    BaseDocTemplate,
+    CondPageBreak,
+    Flowable,
+    Frame,
+    FrameBreak,
+    KeepInFrame,
+    KeepTogether,
+    NextPageTemplate,
+    PageTemplate,
+    Paragraph,
+    Spacer,
+)
+
+from .metricas import medir
+from .pdf import resolver_enlace
+
+OSCURO = colors.HexColor('#1f2a30')
+ROJO = colors.HexColor('#e74c3c')
+GRIS = colors.HexColor('#7f8c8d')
+
+
+def px(valor):
+    return valor * 0.75
+
+
+ANCHO, ALTO = A4
+ANCHO_LATERAL = ANCHO * 0.32
+LADO_FOTO = px(140)
+
+ESTILOS = {
+    'lateral_titulo': ParagraphStyle(
+        'lateral_titulo', fontName='Helvetica-Bold', fontSize=px(13), leading=px(17),
+        textColor=ROJO, spaceBefore=px(25), spaceAfter=px(10),
+    ),
+    'lateral_texto': ParagraphStyle(
+        'lateral_texto', fontName='Helvetica', fontSize=px(11), leading=px(14.3),
+        textColor=colors.HexColor('#ecf0f1'), spaceAfter=px(6),
+    ),
+    'lateral_nota': ParagraphStyle(
+        'lateral_nota', fontName='Helvetica-Oblique', fontSize=px(10), leading=px(13),
+        textColor=colors.HexColor('#bdc3c7'), spaceAfter=px(10),
+    ),
+    'nombre': ParagraphStyle(
+        'nombre', fontName='Helvetica-Bold', fontSize=px(38), leading=px(38), textColor=OSCURO, spaceAfter=px(5),
+    ),
+    'descripcion': ParagraphStyle(
+        'descripcion', fontName='Helvetica', fontSize=px(16), leading=px(21), textColor=GRIS, spaceAfter=px(30),
+    ),
+    'seccion': ParagraphStyle(
+        'seccion', fontName='Helvetica-Bold', fontSize=px(15), leading=px(19.5), textColor=OSCURO,
+        spaceBefore=px(20), spaceAfter=px(15),
+    ),
+    'fecha': ParagraphStyle(
+        'fecha', fontName='Helvetica-Bold', fontSize=px(11), leading=px(14.3), textColor=ROJO, spaceAfter=px(2),
+    ),
+    'titulo': ParagraphStyle(
+        'titulo', fontName='Helvetica-Bold', fontSize=px(14), leading=px(18.2),
+        textColor=colors.HexColor('#2c3e50'), spaceAfter=px(2),
+    ),
+    'empresa': ParagraphStyle(
+        'empresa', fontName='Helvetica-Bold', fontSize=px(12), leading=px(15.6),
+        textColor=colors.HexColor('#666666'), spaceAfter=px(5),
+    ),
+    'texto': ParagraphStyle(
+        'texto', fontName='Helvetica', fontSize=px(12), leading=px(16.8),
+        textColor=colors.HexColor('#444444'), alignment=TA_JUSTIFY,
+    ),
+}
+ESTILOS['fecha_gris'] = ParagraphStyle('fecha_gris', parent=ESTILOS['fecha'], textColor=colors.HexColor('#999999'))
+
+
+def _texto(valor):
+    return '' if valor is None else escape(str(valor))
+
+
+class FotoCircular(Flowable):
+    """La foto de perfil recortada en círculo, con el borde translúcido de la plantilla."""
+
+    def __init__(self, ruta, lado):
+        super().__init__()
+        self.ruta = ruta
+        self.lado = lado
+        self.width = self.height = lado
+
+    def wrap(self, ancho_disponible, alto_disponible):
+        self._desplazamiento = max(0, (ancho_disponible - self.lado) / 2)
+        return ancho_disponible, self.lado
+
+    def draw(self):
+        lienzo = self.canv
+        radio = self.lado / 2
+        x, y = self._desplazamiento + radio, radio
+        lienzo.saveState()
+        camino = lienzo.beginPath()
+        camino.circle(x, y, radio)
+        lienzo.clipPath(camino, stroke=0, fill=0)
+        # Llena el círculo (como object-fit: cover) en lugar de deformar la foto
+        imagen = ImageReader(self.ruta)
+        ancho, alto = imagen.getSize()
+        escala = self.lado / min(ancho, alto)
+        lienzo.drawImage(
+            imagen, x - ancho * escala / 2, y - alto * escala / 2, ancho * escala, alto * escala, mask='auto',
+        )
+        lienzo.restoreState()
+        lienzo.saveState()
+        lienzo.setStrokeColor(colors.Color(1, 1, 1, alpha=0.2))
+        lienzo.setLineWidth(px(4))
+        lienzo.circle(x, y, radio - px(2), stroke=1, fill=0)
+        lienzo.restoreState()
+
+
+class Titulo(Paragraph):
+    """Título de sección subrayado (el border-bottom de la plantilla)."""
+
+    def __init__(self, texto, estilo, color, grosor):
+        super().__init__(texto.upper(), estilo)
+        self.color_linea = color
+        self.grosor = grosor
+
+    def draw(self):
+        super().draw()
+        self.canv.saveState()
+        self.canv.setStrokeColor(self.color_linea)
+        self.canv.setLineWidth(self.grosor)
+        self.canv.line(0, -px(2), self.width, -px(2))
+        self.canv.restoreState()
+
+
+def _foto(perfil):
+    foto = perfil.get('fotoperfil')
+    if not foto:
+        return []
+    ruta = resolver_enlace(foto.url)
+    # '' (no se pudo preparar) o la URL sin tocar (no es una imagen): sin foto,
+    # igual que xhtml2pdf
+    if not ruta or ruta == foto.url:
+        return []
+    return [FotoCircular(ruta, LADO_FOTO), Spacer(1, px(30))]
+
+
+def _lateral(perfil, reconocimientos):
+    titulo = ESTILOS['lateral_titulo']
+    texto = ESTILOS['lateral_texto']
+    linea = colors.Color(1, 1, 1, alpha=0.3)
+
+    partes = _foto(perfil)
+    partes.append(Titulo("Contacto", titulo, linea, px(1)))
+    for etiqueta, campo in (('Tel.', 'telefonofijo'), ('Web', 'sitioweb')):
+        if perfil.get(campo):
+            partes.append(Paragraph(f"{etiqueta}: {_texto(perfil[campo])}", texto))
+    partes.append(Paragraph(f"C.I.: {_texto(perfil.get('numerocedula'))}", texto))
+    partes.append(Paragraph(_texto(perfil.get('direcciondomiciliaria')), texto))
+
+    partes.append(Titulo("Datos Personales", titulo, linea, px(1)))
+    partes.append(Paragraph(f"<b>Nacionalidad:</b><br/>{_texto(perfil.get('nacionalidad'))}", texto))
+    partes.append(Paragraph(f"<b>Estado Civil:</b><br/>{_texto(perfil.get('estadocivil'))}", texto))
+
+    partes.append(Titulo("Reconocimientos", titulo, linea, px(1)))
+    for r in reconocimientos:
+        partes.append(Paragraph(f'<font color="white"><b>{_texto(r.tiporeconocimiento)}</b></font>', texto))
+        partes.append(Paragraph(_texto(r.descripcionreconocimiento), ESTILOS['lateral_nota']))
+    return partes
+
+
+def _item(*lineas):
+    """Un item-box: no se corta entre páginas."""
+    return KeepTogether([Paragraph(texto, ESTILOS[estilo]) for estilo, texto in lineas] + [Spacer(1, px(20))])
+
+
+def _seccion(nombre):
+    # Que el título no quede solo al pie de la página
+    return [CondPageBreak(px(80)), Titulo(nombre, ESTILOS['seccion'], ROJO, px(2))]
+
+
+def _contenido(context):
+    perfil = context['perfil'] or {}
+    partes = [
+        Paragraph(_texto((perfil.get('nombres') or '').upper()), ESTILOS['nombre']),
+        Paragraph(_texto((perfil.get('apellidos') or '').upper()), ESTILOS['nombre']),
+        Paragraph(_texto(perfil.get('descripcionperfil')), ESTILOS['descripcion']),
+    ]
+
+    partes += _seccion("Experiencia Laboral")
+    for e in context['experiencias']:
+        fechas = f"{formato_fecha(e.get('fechainiciogestion'), 'Y')} - {formato_fecha(e.get('fechafingestion'), 'Y')}"
+        partes.append(_item(
+            ('fecha', _texto(fechas)),
+            ('titulo', _texto(e.cargodesempenado)),
+            ('empresa', _texto(e.nombrempresa)),
+            ('texto', _texto(e.descripcionfunciones)),
+        ))
+    if not context['experiencias']:
+        partes.append(Paragraph("Sin experiencia registrada.", ESTILOS['texto']))
+
+    partes += _seccion("Cursos Realizados")
+    for c in context['cursos']:
+        horas = f" - {_texto(c.totalhoras)} Horas" if c.get('totalhoras') else ''
+        partes.append(_item(
+            ('titulo', _texto(c.nombrecurso)),
+            ('empresa', horas),
+            ('texto', _texto(c.descripcioncurso)),
+        ))
+
+    if context['productos_academicos']:
+        partes += _seccion("Productos Académicos")
+        for p in context['productos_academicos']:
+            partes.append(_item(
+                ('fecha_gris', "ACADÉMICO"),
+                ('titulo', _texto(p.nombrerecurso)),
+                ('texto', _texto(p.descripcion)),
+            ))
+
+    if context['productos_laborales']:
+        partes += _seccion("Productos Laborales")
+        for p in context['productos_laborales']:
+            partes.append(_item(
+                ('fecha_gris', _texto(formato_fecha(p.get('fechaproducto'), 'M Y'))),
+                ('titulo', _texto(p.nombreproducto)),
+                ('texto', _texto(p.descripcion)),
+            ))
+    return partes
+
+
+def _pintar_barra(lienzo, documento):
+    lienzo.saveState()
+    lienzo.setFillColor(OSCURO)
+    lienzo.rect(0, 0, ANCHO_LATERAL, ALTO, stroke=0, fill=1)
+    lienzo.restoreState()
+
+
+def renderizar_reportlab(context):
+    """Arma el PDF del CV con platypus a partir del contexto del snapshot. Devuelve los bytes."""
+    perfil = context['perfil'] or {}
+    destino = io.BytesIO()
+    documento = BaseDocTemplate(
+        destino, pagesize=A4, leftMargin=0, rightMargin=0, topMargin=0, bottomMargin=0,
+        title=f"CV PDF - {perfil.get('nombres') or ''}",
+    )
+    lateral = Frame(
+        0, 0, ANCHO_LATERAL, ALTO, leftPadding=px(20), rightPadding=px(20),
+        topPadding=px(30), bottomPadding=px(30), id='lateral',
+    )
+    contenido = Frame(
+        ANCHO_LATERAL, 0, ANCHO - ANCHO_LATERAL, ALTO, leftPadding=px(35), rightPadding=px(35),
+        topPadding=px(40), bottomPadding=px(40), id='contenido',
+    )
+    continuacion = Frame(
+        ANCHO_LATERAL, 0, ANCHO - ANCHO_LATERAL, ALTO, leftPadding=px(35), rightPadding=px(35),
+        topPadding=px(40), bottomPadding=px(40), id='continuacion',
+    )
+    documento.addPageTemplates([
+        PageTemplate('primera', frames=[lateral, contenido], onPage=_pintar_barra),
+        PageTemplate('siguientes', frames=[continuacion], onPage=_pintar_barra),
+    ])
+
+    historia = [
+        NextPageTemplate('siguientes'),
+        # La barra lateral entra entera en la primera página: si sobra texto
+        # se achica en lugar de desbordar sobre la columna de contenido
+        KeepInFrame(0, 0, _lateral(perfil, context['reconocimientos']), mode='shrink'),
+        FrameBreak(),
+    ] + _contenido(context)
+
+    with medir('pdf'):
+        documento.build(historia)
+    return destino.getvalue()
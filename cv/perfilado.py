@@ -0,0 +1,299 @@
+"""
+Perfilado a pedido de requests individuales.
+
+Un usuario staff lo activa con la cabecera `X-CV-Perfilar` o el parámetro
+`?perfilar=`; el valor elige el perfilador:
+
+- `cprofile` (o `1`): perfilador determinista; se guarda el archivo de
+  pstats (abrible con snakeviz o `python -m pstats`) y, al lado, un
+  informe en texto con el árbol de llamadas (`<archivo>.txt`).
+- `muestreo`: un hilo toma la pila del hilo del request cada
+  CV_PERFILADO_INTERVALO_MS y guarda las pilas colapsadas
+  ("a;b;c cuenta"), que leen flamegraph.pl y speedscope.
+
+En las respuestas en streaming (ZIP de certificados) el perfil cubre
+también la generación del cuerpo. Los archivos van a CV_PERFILADO_DIR y se
+registran en PerfilEjecucion; solo se conservan los últimos
+CV_PERFILADO_MAX_ARCHIVOS y ninguno de más de CV_PERFILADO_MAX_DIAS.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PerfilEjecucion
+
+CABECERA = 'X-CV-Perfilar'
+PARAMETRO = 'perfilar'
+ALIAS = {'1': PerfilEjecucion.CPROFILE}
+
+
+def directorio_perfiles():
+    return Path(getattr(settings, 'CV_PERFILADO_DIR', os.path.join(settings.BASE_DIR, '.cache', 'perfiles')))
+
+
+def ruta_archivo(perfil):
+    return directorio_perfiles() / perfil.archivo
+
+
+class PerfiladorCProfile:
+    extension = 'prof'
+
+    def __init__(self):
+        self._perfil = cProfile.Profile()
+
+    def activar(self):
+        self._perfil.enable()
+
+    def pausar(self):
+        self._perfil.disable()
+
+    def resultado(self):
+        # Archivo de pstats (lo mismo que dump_stats) e informe ordenado por tiempo acumulado
+        self._perfil.create_stats()
+        texto = io.StringIO()
+        estadisticas = pstats.Stats(self._perfil, stream=texto)
+        estadisticas.sort_stats('cumulative').print_stats(60)
+        estadisticas.print_callees(30)
+        return marshal.dumps(self._perfil.stats), texto.getvalue().encode()
+
+
+class PerfiladorMuestreo:
+    """
+    Muestrea solo los hilos desde los que se llamó a activar() (el del
+    request y el que recorre el streaming): los demás hilos del worker
+    atienden otros requests. No ve el trabajo que el request manda a otros
+    hilos (descargas en paralelo, sync_to_async, el pool de PDF); con
+    vistas async el hilo muestreado es el del event loop, que muestra qué
+    lo bloquea pero también incluye a los demás requests del mismo loop.
+    """
+    extension = 'txt'
+
+    def __init__(self):
+        self.intervalo = getattr(settings, 'CV_PERFILADO_INTERVALO_MS', 5) / 1000
+        self.pilas = Counter()
+        self._hilos = set()
+        self._activo = threading.Event()
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name='cv-perfilado', daemon=True)
+        self._hilo.start()
+
+    def _muestrear(self):
+        nombres = {}
+        while True:
+            # Bloqueado mientras está en pausa (entre partes del streaming)
+            self._activo.wait()
+            if self._fin.is_set():
+                return
+            time.sleep(self.intervalo)
+            for ident, marco in sys._current_frames().items():
+                if ident not in self._hilos:
+                    continue
+                if ident not in nombres:
+                    nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+                pila = []
+                while marco is not None:
+                    codigo = marco.f_code
+                    pila.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    marco = marco.f_back
+                pila.append(nombres.get(ident, str(ident)))
+                self.pilas[';'.join(reversed(pila))] += 1
+
+    def activar(self):
+        self._hilos.add(threading.get_ident())
+        self._activo.set()
+
+    def pausar(self):
+        self._activo.clear()
+
+    def resultado(self):
+        self._fin.set()
+        self._activo.set()
+        self._hilo.join()
+        colapsadas = '\n'.join(f"{pila} {cuenta}" for pila, cuenta in self.pilas.most_common())
+        return colapsadas.encode(), b''
+
+
+PERFILADORES = {
+    PerfilEjecucion.CPROFILE: PerfiladorCProfile,
+    PerfilEjecucion.MUESTREO: PerfiladorMuestreo,
+}
+
+
+def _valor_pedido(request):
+    valor = request.headers.get(CABECERA) or request.GET.get(PARAMETRO)
+    if not valor:
+        return None
+    valor = ALIAS.get(valor, valor)
+    return valor if valor in PERFILADORES else None
+
+
+def tipo_pedido(request):
+    """Tipo de perfilador pedido por el request, o None si no corresponde perfilar."""
+    tipo = _valor_pedido(request)
+    user = getattr(request, 'user', None)
+    if tipo is None or user is None or not user.is_staff:
+        return None
+    return tipo
+
+
+async def atipo_pedido(request):
+    tipo = _valor_pedido(request)
+    if tipo is None or not hasattr(request, 'auser') or not (await request.auser()).is_staff:
+        return None
+    return tipo
+
+
+def guardar(request, tipo, perfilador, duracion):
+    principal, extra = perfilador.resultado()
+    directorio = directorio_perfiles()
+    directorio.mkdir(parents=True, exist_ok=True)
+    nombre = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.{perfilador.extension}"
+    (directorio / nombre).write_bytes(principal)
+    if extra:
+        (directorio / f"{nombre}.txt").write_bytes(extra)
+
+    perfil = PerfilEjecucion.objects.create(
+        ruta=request.get_full_path()[:500],
+        vista=getattr(request.resolver_match, 'url_name', None) or '',
+        metodo=request.method,
+        tipo=tipo,
+        usuario=request.user if request.user.is_authenticated else None,
+        duracionms=duracion * 1000,
+        archivo=nombre,
+        tamano=len(principal) + len(extra),
+    )
+    aplicar_retencion()
+    return perfil
+
+
+def borrar_archivos(perfil):
+    for ruta in (ruta_archivo(perfil), Path(f"{ruta_archivo(perfil)}.txt")):
+        try:
+            ruta.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def aplicar_retencion():
+    """Borra los perfiles viejos o que exceden el máximo (los archivos los borra la señal)."""
+    maximo = getattr(settings, 'CV_PERFILADO_MAX_ARCHIVOS', 50)
+    dias = getattr(settings, 'CV_PERFILADO_MAX_DIAS', 7)
+    conservados = PerfilEjecucion.objects.order_by('-fechacreacion', '-pk').values_list('pk', flat=True)[:maximo]
+    viejos = PerfilEjecucion.objects.exclude(pk__in=list(conservados)) | PerfilEjecucion.objects.filter(
+        fechacreacion__lt=timezone.now() - timedelta(days=dias)
+    )
+    for perfil in viejos:
+        perfil.delete()
+
+
+class PerfiladoMiddleware:
+    """
+    Va después de AuthenticationMiddleware: necesita request.user. Con
+    vistas async los dos perfiladores ven el hilo del event loop, que
+    también corre otros requests (ver PerfiladorMuestreo).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tipo = tipo_pedido(request)
+        if tipo is None:
+            return self.get_response(request)
+
+        perfilador = PERFILADORES[tipo]()
+        inicio = time.perf_counter()
+        perfilador.activar()
+        try:
+            response = self.get_response(request)
+        finally:
+            perfilador.pausar()
+
+        if response.streaming:
+            response.streaming_content = self._perfilar_streaming(
+                response.streaming_content, request, tipo, perfilador, inicio
+            )
+            return response
+
+        perfil = guardar(request, tipo, perfilador, time.perf_counter() - inicio)
+        response['X-CV-Perfil'] = str(perfil.pk)
+        return response
+
+    async def __acall__(self, request):
+        tipo = await atipo_pedido(request)
+        if tipo is None:
+            return await self.get_response(request)
+
+        perfilador = PERFILADORES[tipo]()
+        inicio = time.perf_counter()
+        perfilador.activar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            perfilador.pausar()
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._aperfilar_streaming(
+                    response.streaming_content, request, tipo, perfilador, inicio
+                )
+            else:
+                response.streaming_content = self._perfilar_streaming(
+                    response.streaming_content, request, tipo, perfilador, inicio
+                )
+            return response
+
+        perfil = await sync_to_async(guardar)(request, tipo, perfilador, time.perf_counter() - inicio)
+        response['X-CV-Perfil'] = str(perfil.pk)
+        return response
+
+    @staticmethod
+    def _perfilar_streaming(contenido, request, tipo, perfilador, inicio):
+        iterador = iter(contenido)
+        try:
+            while True:
+                perfilador.activar()
+                try:
+                    parte = next(iterador)
+                except StopIteration:
+                    return
+                finally:
+                    perfilador.pausar()
+                yield parte
+        finally:
+            guardar(request, tipo, perfilador, time.perf_counter() - inicio)
+
+    @staticmethod
+    async def _aperfilar_streaming(contenido, request, tipo, perfilador, inicio):
+        iterador = aiter(contenido)
+        try:
+            while True:
+                perfilador.activar()
+                try:
+                    parte = await anext(iterador)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    perfilador.pausar()
+                yield parte
+        finally:
+            await sync_to_async(guardar)(request, tipo, perfilador, time.perf_counter() - inicio)
@@ -0,0 +1,95 @@
+"""
+Resolución del perfil a mostrar.
+
+Las rutas raíz muestran "el" perfil activo; las rutas /cv/<slug>/ muestran
+cualquier perfil por su slug o por su número de cédula (ambos con índice
+único). Los dos casos se guardan en la cache de Django y los invalidan las
+señales de DatosPersonales (ver cv/signals.py). La restricción
+'unico_perfil_activo' garantiza que haya como mucho un perfil activo, así
+que el resultado es determinista.
+"""
+from django.core.cache import cache
+from django.http import Http404
+from django.urls import reverse
+
+from .models import DatosPersonales
+
+CLAVE_PERFIL_ACTIVO = 'cv:perfil_activo'
+
+# Un identificador inexistente se recuerda un rato para no consultar la
+# base en cada intento; crear el perfil borra la clave de todas formas.
+TIMEOUT_PERFIL_INEXISTENTE = 60 * 60
+
+
+def obtener_perfil_activo():
+    """Devuelve el DatosPersonales activo o None si no hay ninguno."""
+    # Guardamos una tupla para poder cachear también "no hay perfil activo"
+    cacheado = cache.get(CLAVE_PERFIL_ACTIVO)
+    if cacheado is None:
+        cacheado = (DatosPersonales.objects.filter(perfilactivo=True).first(),)
+        cache.set(CLAVE_PERFIL_ACTIVO, cacheado, timeout=None)
+    return cacheado[0]
+
+
+def olvidar_perfil_activo():
+    cache.delete(CLAVE_PERFIL_ACTIVO)
+
+
+async def aobtener_perfil_activo():
+    """Versión async de obtener_perfil_activo (misma clave de cache)."""
+    cacheado = await cache.aget(CLAVE_PERFIL_ACTIVO)
+    if cacheado is None:
+        cacheado = (await DatosPersonales.objects.filter(perfilactivo=True).afirst(),)
+        await cache.aset(CLAVE_PERFIL_ACTIVO, cacheado, timeout=None)
+    return cacheado[0]
+
+
+def _busqueda(identificador):
+    """(clave de cache, filtro) para un slug o una cédula."""
+    campo = 'numerocedula' if identificador.isdigit() else 'slug'
+    return f"cv:perfil:{campo}:{identificador}", {campo: identificador}
+
+
+def obtener_perfil(identificador):
+    """
+    Perfil de las rutas /cv/<slug>/ o el activo si `identificador` es None.
+    Lanza Http404 si no existe.
+    """
+    if identificador is None:
+        return obtener_perfil_activo()
+    clave, filtro = _busqueda(identificador)
+    cacheado = cache.get(clave)
+    if cacheado is None:
+        cacheado = (DatosPersonales.objects.filter(**filtro).first(),)
+        cache.set(clave, cacheado, timeout=None if cacheado[0] else TIMEOUT_PERFIL_INEXISTENTE)
+    if cacheado[0] is None:
+        raise Http404("No existe ese perfil")
+    return cacheado[0]
+
+
+async def aobtener_perfil(identificador):
+    """Versión async de obtener_perfil."""
+    if identificador is None:
+        return await aobtener_perfil_activo()
+    clave, filtro = _busqueda(identificador)
+    cacheado = await cache.aget(clave)
+    if cacheado is None:
+        cacheado = (await DatosPersonales.objects.filter(**filtro).afirst(),)
+        await cache.aset(clave, cacheado, timeout=None if cacheado[0] else TIMEOUT_PERFIL_INEXISTENTE)
+    if cacheado[0] is None:
+        raise Http404("No existe ese perfil")
+    return cacheado[0]
+
+
+def olvidar_perfil(slug, numerocedula):
+    cache.delete_many([_busqueda(valor)[0] for valor in (slug, numerocedula) if valor])
+
+
+def url_cv(nombre, slug=None, args=()):
+    """
+    URL de una vista pública: la ruta raíz (perfil activo) o, si hay slug,
+    su equivalente bajo /cv/<slug>/ (nombre con sufijo _perfil).
+    """
+    if slug is None:
+        return reverse(nombre, args=args)
+    return reverse(f"{nombre}_perfil", args=(slug, *args))
@@ -0,0 +1,204 @@
+import logging
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .imagenes import ImagenInvalida, actualizar_derivados, normalizar_certificado
+from .metricas import instalar_medicion_sql
+from .perfiles import olvidar_perfil, olvidar_perfil_activo
+from .perfilado import borrar_archivos
+from .snapshot import programar_reconstrucciones, SECCIONES
+from .trabajos import encolar_certificados_lote
+from .certificados import cache_certificados, certificado_por_huella, clave_certificado
+from .models import (
+    DatosPersonales,
+    ExperienciaLaboral,
+    CursoRealizado,
+    Reconocimiento,
+    ProductoAcademico,
+    ProductoLaboral,
+    VentaGarage,
+    PerfilEjecucion
+)
+
+logger = logging.getLogger(__name__)
+
+MODELOS_CV = (
+    DatosPersonales,
+    ExperienciaLaboral,
+    CursoRealizado,
+    Reconocimiento,
+    ProductoAcademico,
+    ProductoLaboral,
+    VentaGarage,
+)
+
+# Modelo -> contador de sección que usan los fragmentos de home.html
+SECCION_POR_MODELO = {modelo: nombre for nombre, modelo in SECCIONES.items()}
+SECCION_POR_MODELO[DatosPersonales] = 'perfil'
+
+
+def perfil_id_de(instance):
+    """Devuelve el id del perfil al que pertenece cualquier fila del CV."""
+    if isinstance(instance, DatosPersonales):
+        return instance.pk
+    return instance.perfil_id
+
+
+def invalidar_contenido(sender, instance, **kwargs):
+    """
+    Cualquier cambio en el CV regenera el snapshot de su perfil al
+    confirmar la transacción, y con él invalida lo cacheado (ver
+    snapshot.programar_reconstruccion).
+    """
+    invalidar_perfiles(sender, [perfil_id_de(instance)])
+
+
+def invalidar_perfiles(sender, perfil_ids):
+    """
+    Lo mismo que invalidar_contenido para cambios hechos con update() o
+    bulk_create, que no disparan señales (acciones masivas del admin).
+    Todos los perfiles se reconstruyen y encolan juntos, en una pasada.
+    """
+    perfil_ids = list(perfil_ids)
+    programar_reconstrucciones(perfil_ids, SECCION_POR_MODELO[sender])
+    if sender in MODELOS_CON_CERTIFICADO:
+        programar_paquetes(perfil_ids)
+
+
+def programar_paquetes(perfil_ids):
+    """
+    Encola el ZIP con todos los certificados de cada perfil al confirmar la
+    transacción: para entonces la versión ya es la final, así que varios
+    cambios juntos comparten un solo trabajo.
+    """
+    transaction.on_commit(lambda: encolar_certificados_lote(perfil_ids))
+
+
+def invalidar_perfil_activo(sender, instance, **kwargs):
+    olvidar_perfil_activo()
+    # Rutas /cv/<slug>/: también borra un "no existe" cacheado del slug nuevo
+    olvidar_perfil(instance.slug, instance.numerocedula)
+
+
+def slug_reemplazado(sender, instance, **kwargs):
+    """Si cambia el slug o la cédula, el identificador anterior deja de resolver."""
+    if not instance.pk:
+        return
+    anteriores = sender.objects.filter(pk=instance.pk).values_list('slug', 'numerocedula').first()
+    if anteriores:
+        olvidar_perfil(*anteriores)
+
+
+post_save.connect(invalidar_perfil_activo, sender=DatosPersonales, dispatch_uid="cv_perfil_activo_save")
+post_delete.connect(invalidar_perfil_activo, sender=DatosPersonales, dispatch_uid="cv_perfil_activo_delete")
+pre_save.connect(slug_reemplazado, sender=DatosPersonales, dispatch_uid="cv_perfil_slug_save")
+
+for modelo in MODELOS_CV:
+    post_save.connect(invalidar_contenido, sender=modelo, dispatch_uid=f"cv_version_save_{modelo.__name__}")
+    post_delete.connect(invalidar_contenido, sender=modelo, dispatch_uid=f"cv_version_delete_{modelo.__name__}")
+
+
+# --- Cache local de certificados ---
+
+MODELOS_CON_CERTIFICADO = (ExperienciaLaboral, CursoRealizado, Reconocimiento)
+
+
+def _olvidar_certificado(nombre):
+    if nombre:
+        cache_certificados().borrar(clave_certificado(nombre))
+
+
+def certificado_reemplazado(sender, instance, **kwargs):
+    """Si cambia el archivo, descartamos el JPG cacheado del anterior."""
+    if not instance.pk:
+        return
+    anterior = sender.objects.filter(pk=instance.pk).values_list('certificado', flat=True).first()
+    if anterior and anterior != instance.certificado.name:
+        _olvidar_certificado(anterior)
+
+
+def certificado_borrado(sender, instance, **kwargs):
+    _olvidar_certificado(instance.certificado.name)
+
+
+def ingerir_certificado(sender, instance, raw=False, **kwargs):
+    """
+    Un certificado recién subido se guarda ya normalizado (JPEG de tamaño
+    acotado, ver imagenes.normalizar_certificado) y con su huella. Si
+    alguna fila ya tiene el mismo archivo se reutiliza: no se vuelve a
+    subir y comparte la cache local de certificados.
+
+    La validación es de ConCertificado.clean(); aquí un archivo que no es
+    una imagen (un save() sin full_clean()) se guarda tal cual, sin huella.
+    """
+    campo = instance.certificado
+    if raw or (campo and campo._committed):
+        return
+    instance.certificadohuella = ''
+    instance.certificadotamano = instance.certificadoancho = instance.certificadoalto = None
+    if not campo:
+        return
+
+    try:
+        normalizado = normalizar_certificado(campo)
+    except ImagenInvalida:
+        logger.warning("Certificado %s guardado sin normalizar: no es una imagen válida", campo.name)
+        return
+    instance.certificadohuella = normalizado.huella
+    instance.certificadotamano = len(normalizado.contenido)
+    instance.certificadoancho = normalizado.ancho
+    instance.certificadoalto = normalizado.alto
+    # Un nombre (ya guardado) o un archivo nuevo que sube FileField.pre_save
+    instance.certificado = certificado_por_huella(normalizado.huella) or ContentFile(
+        normalizado.contenido, name=f"{normalizado.huella[:32]}.jpg"
+    )
+
+
+for modelo in MODELOS_CON_CERTIFICADO:
+    pre_save.connect(certificado_reemplazado, sender=modelo, dispatch_uid=f"cv_certificado_save_{modelo.__name__}")
+    pre_save.connect(ingerir_certificado, sender=modelo, dispatch_uid=f"cv_certificado_ingesta_{modelo.__name__}")
+    post_delete.connect(certificado_borrado, sender=modelo, dispatch_uid=f"cv_certificado_delete_{modelo.__name__}")
+
+
+# --- Derivados responsivos de imágenes ---
+
+IMAGENES_CON_DERIVADOS = (
+    (DatosPersonales, 'fotoperfil', 'fotoperfilderivados'),
+    (VentaGarage, 'imagen', 'imagenderivados'),
+)
+
+
+def _generador_de_derivados(campo_imagen, campo_derivados):
+    def generar(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        if actualizar_derivados(instance, campo_imagen, campo_derivados) is not None:
+            # Se guardaron con update(): invalidamos a mano
+            invalidar_contenido(sender, instance)
+    return generar
+
+
+for modelo, campo_imagen, campo_derivados in IMAGENES_CON_DERIVADOS:
+    post_save.connect(
+        _generador_de_derivados(campo_imagen, campo_derivados),
+        sender=modelo,
+        weak=False,
+        dispatch_uid=f"cv_derivados_{modelo.__name__}"
+    )
+
+
+# --- Perfiles de rendimiento (cv/perfilado.py) ---
+
+def perfil_ejecucion_borrado(sender, instance, **kwargs):
+    borrar_archivos(instance)
+
+
+post_delete.connect(perfil_ejecucion_borrado, sender=PerfilEjecucion, dispatch_uid="cv_perfil_ejecucion_delete")
+
+
+# --- Métricas de SQL por request (cv/metricas.py) ---
+
+connection_created.connect(instalar_medicion_sql, dispatch_uid="cv_metricas_sql")
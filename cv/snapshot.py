@@ -0,0 +1,228 @@
+"""
+Snapshot desnormalizado del CV (modelo SnapshotPerfil).
+
+`serializar_perfil` arma un JSON con el perfil y todas sus secciones
+visibles; `contexto_snapshot` lo vuelve a convertir en el mismo contexto
+que usan las plantillas (fechas como date, archivos con .url, etc.), así
+que home.html y cv_pdf.html funcionan igual que con los querysets.
+"""
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+
+from .cache import incrementar_version, incrementar_version_seccion
+from .models import (
+    DatosPersonales,
+    ExperienciaLaboral,
+    CursoRealizado,
+    Reconocimiento,
+    ProductoAcademico,
+    ProductoLaboral,
+    VentaGarage,
+    SnapshotPerfil
+)
+
+# Nombre en el contexto de la plantilla -> modelo (solo filas visibles)
+SECCIONES = {
+    'experiencias': ExperienciaLaboral,
+    'cursos': CursoRealizado,
+    'reconocimientos': Reconocimiento,
+    'productos_academicos': ProductoAcademico,
+    'productos_laborales': ProductoLaboral,
+    'ventas': VentaGarage,
+}
+
+
+class Fila(dict):
+    """Fila deserializada: se puede usar como dict o con atributos."""
+
+    def __getattr__(self, nombre):
+        try:
+            return self[nombre]
+        except KeyError:
+            raise AttributeError(nombre)
+
+
+class ArchivoSnapshot:
+    """Sustituto de FieldFile con lo que usan las plantillas."""
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = url
+
+    def __bool__(self):
+        return bool(self.name)
+
+    def __str__(self):
+        return self.name
+
+
+def _serializar_fila(objeto):
+    fila = {'pk': objeto.pk}
+    for campo in objeto._meta.concrete_fields:
+        valor = getattr(objeto, campo.attname)
+        if isinstance(campo, models.FileField):
+            archivo = getattr(objeto, campo.name)
+            valor = {'name': archivo.name, 'url': archivo.url} if archivo else None
+        elif isinstance(valor, (date, datetime)):
+            valor = valor.isoformat()
+        elif isinstance(valor, Decimal):
+            valor = str(valor)
+        fila[campo.attname] = valor
+    return fila
+
+
+def _deserializar_fila(modelo, datos):
+    fila = Fila(datos)
+    for campo in modelo._meta.concrete_fields:
+        valor = fila.get(campo.attname)
+        if valor is None:
+            continue
+        if isinstance(campo, models.FileField):
+            valor = ArchivoSnapshot(valor['name'], valor['url'])
+        elif isinstance(campo, models.DateTimeField):
+            valor = datetime.fromisoformat(valor)
+        elif isinstance(campo, models.DateField):
+            valor = date.fromisoformat(valor)
+        elif isinstance(campo, models.DecimalField):
+            valor = Decimal(valor)
+        fila[campo.attname] = valor
+    return fila
+
+
+def serializar_perfil(perfil):
+    """Serializa el perfil y sus secciones visibles a un dict JSON."""
+    return serializar_perfiles([perfil])[perfil.pk]
+
+
+def serializar_perfiles(perfiles):
+    """
+    serializar_perfil de varios perfiles a la vez, {perfil_id: datos}: una
+    consulta por sección para todo el lote, no una por perfil.
+    """
+    datos = {
+        perfil.pk: {'perfil': _serializar_fila(perfil), **{nombre: [] for nombre in SECCIONES}}
+        for perfil in perfiles
+    }
+    for nombre, modelo in SECCIONES.items():
+        filas = modelo.objects.filter(perfil_id__in=datos, activarparaqueseveaenfront=True)
+        if modelo is VentaGarage:
+            filas = filas.order_by('perfil_id', '-fechapublicacion', '-id')
+        else:
+            filas = filas.order_by('perfil_id', 'pk')
+        for objeto in filas:
+            datos[objeto.perfil_id][nombre].append(_serializar_fila(objeto))
+    return datos
+
+
+def reconstruir_snapshot(perfil_id):
+    """Regenera el snapshot de un perfil (o lo borra si el perfil ya no existe)."""
+    with transaction.atomic():
+        perfil = DatosPersonales.objects.filter(pk=perfil_id).first()
+        if perfil is None:
+            SnapshotPerfil.objects.filter(pk=perfil_id).delete()
+            return None
+        snapshot, _ = SnapshotPerfil.objects.update_or_create(
+            perfil=perfil, defaults={'datos': serializar_perfil(perfil)}
+        )
+        return snapshot
+
+
+def reconstruir_snapshots(perfil_ids):
+    """
+    reconstruir_snapshot de varios perfiles en una pasada: se leen juntos
+    (ver serializar_perfiles) y se escriben con un solo upsert.
+    """
+    perfil_ids = set(perfil_ids)
+    with transaction.atomic():
+        perfiles = list(DatosPersonales.objects.filter(pk__in=perfil_ids))
+        borrados = perfil_ids - {perfil.pk for perfil in perfiles}
+        if borrados:
+            SnapshotPerfil.objects.filter(pk__in=borrados).delete()
+        datos = serializar_perfiles(perfiles)
+        SnapshotPerfil.objects.bulk_create(
+            [SnapshotPerfil(perfil=perfil, datos=datos[perfil.pk]) for perfil in perfiles],
+            update_conflicts=True, unique_fields=['perfil'], update_fields=['datos', 'fechaactualizacion'],
+        )
+
+
+_pendientes = threading.local()
+
+
+def programar_reconstruccion(perfil_id, seccion=None):
+    """
+    Reconstruye el snapshot cuando se confirme la transacción actual y
+    recién entonces incrementa la versión de contenido del perfil y la de
+    cada `seccion` cambiada (fragmentos de home.html). Si las versiones
+    cambiaran antes, un request en medio (que todavía lee las
+    filas y el snapshot viejos) guardaría un PDF o un fragmento
+    desactualizado bajo la clave nueva. Varios cambios del mismo perfil en
+    una transacción (por ejemplo un borrado en cascada) provocan una sola
+    reconstrucción: la primera llamada que se ejecuta reconstruye y las
+    demás no hacen nada.
+    """
+    programar_reconstrucciones([perfil_id], seccion)
+
+
+def programar_reconstrucciones(perfil_ids, seccion=None):
+    """programar_reconstruccion de varios perfiles, reconstruidos juntos con reconstruir_snapshots."""
+    pendientes = getattr(_pendientes, 'secciones', None)
+    if pendientes is None:
+        pendientes = _pendientes.secciones = {}
+    perfil_ids = list(perfil_ids)
+    for perfil_id in perfil_ids:
+        secciones = pendientes.setdefault(perfil_id, set())
+        if seccion:
+            secciones.add(seccion)
+
+    def reconstruir():
+        lote = {perfil_id: pendientes.pop(perfil_id) for perfil_id in perfil_ids if perfil_id in pendientes}
+        if not lote:
+            return
+        reconstruir_snapshots(lote)
+        for perfil_id, secciones in lote.items():
+            incrementar_version(perfil_id)
+            for nombre in secciones:
+                incrementar_version_seccion(perfil_id, nombre)
+
+    transaction.on_commit(reconstruir)
+
+
+def contexto_snapshot(perfil_id):
+    """
+    Contexto de plantilla para home.html / cv_pdf.html leído desde el
+    snapshot con una sola consulta por clave primaria.
+    """
+    if perfil_id is None:
+        return dict({'perfil': None}, **{nombre: [] for nombre in SECCIONES})
+
+    snapshot = SnapshotPerfil.objects.filter(pk=perfil_id).first()
+    if snapshot is None:
+        # Primer acceso (o snapshot borrado): lo generamos ahora
+        snapshot = reconstruir_snapshot(perfil_id)
+        if snapshot is None:
+            return contexto_snapshot(None)
+    return _contexto_desde_datos(snapshot.datos)
+
+
+async def acontexto_snapshot(perfil_id):
+    """Versión async de contexto_snapshot."""
+    if perfil_id is None:
+        return contexto_snapshot(None)
+
+    snapshot = await SnapshotPerfil.objects.filter(pk=perfil_id).afirst()
+    if snapshot is None:
+        snapshot = await sync_to_async(reconstruir_snapshot)(perfil_id)
+        if snapshot is None:
+            return contexto_snapshot(None)
+    return _contexto_desde_datos(snapshot.datos)
+
+
+def _contexto_desde_datos(datos):
+    contexto = {'perfil': _deserializar_fila(DatosPersonales, datos['perfil'])}
+    for nombre, modelo in SECCIONES.items():
+        contexto[nombre] = [_deserializar_fila(modelo, fila) for fila in datos.get(nombre, [])]
+    return contexto
@@ -0,0 +1,39 @@
+from django import template
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+def _srcset(entradas):
+    return ", ".join(f"{url} {ancho}w" for ancho, _, url in entradas)
+
+
+@register.simple_tag
+def imagen_responsive(archivo, derivados, sizes, alt='', clase=''):
+    """
+    <picture> con srcset WebP/JPEG de los derivados de cv/imagenes.py y
+    carga diferida. Si todavía no hay derivados usa la imagen original.
+
+        {% imagen_responsive p.imagen p.imagenderivados "280px" alt=p.nombreproducto clase="producto-img" %}
+    """
+    if not archivo:
+        return ""
+
+    derivados = derivados or {}
+    if derivados.get('origen') != archivo.name or not derivados.get('jpeg'):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async">',
+            archivo.url, alt, clase
+        )
+
+    jpeg = derivados['jpeg']
+    # El src de respaldo es el tamaño intermedio
+    respaldo = jpeg[min(1, len(jpeg) - 1)][2]
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(derivados.get('webp', [])), sizes,
+        respaldo, _srcset(jpeg), sizes, alt, clase
+    )
@@ -0,0 +1,16 @@
+from django import template
+
+from ..perfiles import url_cv as _url_cv
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def url_cv(context, nombre):
+    """
+    Como {% url %} para las vistas públicas, pero respeta el perfil que se
+    está mostrando: en /cv/<slug>/ enlaza a las rutas de ese mismo slug.
+
+        <a href="{% url_cv 'cv_pdf' %}">
+    """
+    return _url_cv(nombre, context.get('perfil_slug'))
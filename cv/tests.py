@@ -1,3 +1,1429 @@
-from django.test import TestCase
+import asyncio
+import functools
+import importlib.util
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import httpx
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models.fields.files import FieldFile
+from django.http import FileResponse, StreamingHttpResponse
+from django.template import Context, Template
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from django.utils.timezone import now
+from PIL import Image
+from pypdf import PdfReader
+
+from . import certificados, vistas_async
+from .cache import CacheDisco
+from .imagenes import generar_derivados
+from .metricas import HISTOGRAMAS, Histograma, PlantillaMedida
+from .models import (
+    CON_CERTIFICADO,
+    DatosPersonales,
+    ExperienciaLaboral,
+    CursoRealizado,
+    PerfilEjecucion,
+    ProductoAcademico,
+    ProductoLaboral,
+    SnapshotPerfil,
+    TrabajoGeneracion,
+    VentaGarage
+)
+from .pdf import LADO_MAXIMO_IMPRESION, resolver_enlace
+from .perfilado import PerfiladorMuestreo
+from .perfiles import obtener_perfil_activo
+from .snapshot import contexto_snapshot, reconstruir_snapshot
+from .trabajos import encolar_certificados, procesar_siguiente
+from .views import get_contexto_perfil
+
+
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def crear_perfil(**kwargs):
+    datos = dict(
+        descripcionperfil='Desarrollador',
+        apellidos='Pérez',
+        nombres='Juan',
+        nacionalidad='Ecuatoriana',
+        lugarnacimiento='Manta',
+        fechanacimiento=date(1995, 5, 10),
+        numerocedula='1300000001',
+        sexo='H',
+        estadocivil='Soltero',
+        licenciaconducir='Tipo B',
+        telefonoconvencional='052000000',
+        telefonofijo='0990000000',
+        direcciontrabajo='Centro',
+        direcciondomiciliaria='Barrio Norte',
+    )
+    datos.update(kwargs)
+    return DatosPersonales.objects.create(**datos)
+
+
+def crear_experiencia(perfil, n, **kwargs):
+    datos = dict(
+        perfil=perfil,
+        cargodesempenado=f'Cargo {n}',
+        nombrempresa='Empresa',
+        lugarempresa='Manta',
+        emailempresa='rrhh@empresa.com',
+        sitiowebempresa='https://empresa.com',
+        nombrecontactoempresarial='Contacto',
+        telefonocontactoempresarial='0990000000',
+        fechainiciogestion=date(2020, 1, 1),
+        fechafingestion=date(2021, 1, 1),
+        descripcionfunciones='Funciones',
+        certificado=f'certificados/experiencia/exp_{n}.jpg',
+    )
+    datos.update(kwargs)
+    return ExperienciaLaboral.objects.create(**datos)
+
+
+def crear_curso(perfil, n, **kwargs):
+    datos = dict(
+        perfil=perfil,
+        nombrecurso=f'Curso {n}',
+        fechainicio=date(2020, 1, 1),
+        fechafin=date(2020, 2, 1),
+        totalhoras=40,
+        descripcioncurso='Curso',
+        entidadpatrocinadora='Entidad',
+        nombrecontactoauspicia='Contacto',
+        telefonocontactoauspicia='0990000000',
+        emailempresapatrocinadora='info@entidad.com',
+        certificado=f'certificados/cursos/cur_{n}.jpg',
+    )
+    datos.update(kwargs)
+    return CursoRealizado.objects.create(**datos)
+
+
+async def adescargar_falso(cliente, url, timeout):
+    return url.encode()
+
+
+# Sin red: cada certificado "descargado" es su propia URL en bytes
+SIN_RED = (
+    ('cv.certificados.url_certificado', lambda objeto: objeto.certificado.name),
+    ('cv.certificados.descargar', lambda url, timeout: url.encode()),
+    ('cv.certificados.adescargar', adescargar_falso),
+)
+
+
+def urls_con_vistas_async():
+    """Copia de cv.urls armada con CV_VISTAS_ASYNC (cv.urls elige las vistas al importarse)."""
+    spec = importlib.util.find_spec('cv.urls')
+    modulo = importlib.util.module_from_spec(spec)
+    with override_settings(CV_VISTAS_ASYNC=True):
+        spec.loader.exec_module(modulo)
+    return modulo
+
+
+URLS_ASYNC = urls_con_vistas_async()
+
+
+def texto_pdf(contenido):
+    return ''.join(pagina.extract_text() for pagina in PdfReader(io.BytesIO(contenido)).pages)
+
+
+class EntornoCVMixin:
+    """
+    Entorno común de los tests: cache en memoria vacía y todo lo que la app
+    escribe en disco (media, caches de certificados, ZIPs, imágenes del PDF
+    y perfiles) en un directorio temporal propio de cada test. `parches` son
+    pares (objetivo, reemplazo) que se aplican con mock.patch.
+    """
+    parches = ()
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.temporal = directorio.name
+        self.ajustar(
+            CACHES=CACHE_LOCAL,
+            MEDIA_ROOT=os.path.join(self.temporal, 'media'),
+            CV_CERTIFICADOS_CACHE_DIR=os.path.join(self.temporal, 'certificados'),
+            CV_CERTIFICADOS_PAQUETES_DIR=os.path.join(self.temporal, 'paquetes'),
+            CV_PDF_IMAGENES_CACHE_DIR=os.path.join(self.temporal, 'pdf'),
+            CV_PERFILADO_DIR=os.path.join(self.temporal, 'perfiles'),
+        )
+        cache.clear()
+        for objetivo, reemplazo in self.parches:
+            self.parchear(objetivo, reemplazo)
+
+    def ajustar(self, **ajustes):
+        """override_settings hasta el final del test."""
+        cambio = override_settings(**ajustes)
+        cambio.enable()
+        self.addCleanup(cambio.disable)
+
+    def parchear(self, objetivo, reemplazo):
+        parche = mock.patch(objetivo, reemplazo)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+
+class SnapshotTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = crear_perfil()
+            self.experiencia = crear_experiencia(self.perfil, 1)
+            crear_curso(self.perfil, 1, activarparaqueseveaenfront=False)
+            VentaGarage.objects.create(
+                perfil=self.perfil, nombreproducto='Silla', estadoproducto='Bueno',
+                descripcion='Silla', valordelbien=Decimal('12.50'), fechapublicacion=date(2024, 1, 2),
+            )
+
+    def test_contexto_con_los_tipos_de_los_modelos(self):
+        with self.assertNumQueries(1):
+            contexto = contexto_snapshot(self.perfil.pk)
+
+        self.assertEqual(contexto['perfil'].fechanacimiento, date(1995, 5, 10))
+        experiencia, = contexto['experiencias']
+        self.assertEqual(experiencia.fechainiciogestion, date(2020, 1, 1))
+        self.assertEqual(experiencia.certificado.url, self.experiencia.certificado.url)
+        self.assertEqual(contexto['ventas'][0].valordelbien, Decimal('12.50'))
+        # Solo las filas visibles
+        self.assertEqual(contexto['cursos'], [])
+
+    def test_se_reconstruye_al_confirmar_la_transaccion(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experiencia.cargodesempenado = 'Gerente'
+            self.experiencia.save()
+            # Todavía no se confirmó: el snapshot sigue siendo el anterior
+            self.assertEqual(contexto_snapshot(self.perfil.pk)['experiencias'][0].cargodesempenado, 'Cargo 1')
+        self.assertEqual(contexto_snapshot(self.perfil.pk)['experiencias'][0].cargodesempenado, 'Gerente')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.delete()
+        self.assertFalse(SnapshotPerfil.objects.exists())
+
+
+# Con pocas filas PostgreSQL prefiere recorrer la tabla: el plan solo es estable en SQLite
+@skipUnless(connection.vendor == 'sqlite', "planes de SQLite")
+class IndicesTests(TestCase):
+
+    def test_consultas_de_lectura_usan_sus_indices(self):
+        visibles = {'perfil_id': 1, 'activarparaqueseveaenfront': True}
+        for queryset, indice in (
+            (CursoRealizado.objects.filter(**visibles), 'cur_perfil_visible_idx'),
+            (ExperienciaLaboral.objects.filter(CON_CERTIFICADO, perfil_id=1), 'exp_con_certificado_idx'),
+            (VentaGarage.objects.filter(**visibles).order_by('-fechapublicacion', '-id'), 'venta_listado_idx'),
+            (
+                VentaGarage.objects.filter(estadoproducto='Bueno', **visibles).order_by('-fechapublicacion', '-id'),
+                'venta_estado_idx'
+            ),
+        ):
+            plan = queryset.explain()
+            self.assertIn(f'USING INDEX {indice}', plan)
+            # El índice ya da el orden del catálogo: sin ordenar aparte
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class PerfilActivoTests(EntornoCVMixin, TestCase):
+
+    def test_se_cachea_y_se_invalida_al_guardar(self):
+        self.assertIsNone(obtener_perfil_activo())
+        perfil = crear_perfil()
+        self.assertEqual(obtener_perfil_activo(), perfil)
+        with self.assertNumQueries(0):
+            obtener_perfil_activo()
+
+        perfil.perfilactivo = False
+        perfil.save()
+        otro = crear_perfil(numerocedula='1300000002')
+        self.assertEqual(obtener_perfil_activo(), otro)
+
+    def test_solo_un_perfil_activo(self):
+        crear_perfil()
+        segundo = DatosPersonales(
+            descripcionperfil='Otro', apellidos='Loor', nombres='Ana', nacionalidad='Ecuatoriana',
+            lugarnacimiento='Manta', fechanacimiento=date(1990, 1, 1), numerocedula='1300000002',
+            sexo='M', estadocivil='Soltera', licenciaconducir='Tipo B', telefonoconvencional='052000000',
+            telefonofijo='0990000000', direcciontrabajo='Centro', direcciondomiciliaria='Barrio',
+        )
+        with self.assertRaisesMessage(ValidationError, 'Ya existe otro perfil activo'):
+            segundo.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            segundo.save()
+
+
+class SeleccionarCertificadosTests(EntornoCVMixin, TestCase):
+    parches = SIN_RED
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    def descargar_zip(self, seleccion):
+        response = self.client.post('/seleccionar_certificados/', {'certificados': seleccion})
+        return b''.join(response.streaming_content)
+
+    def test_consultas_constantes_sin_importar_la_seleccion(self):
+        experiencias = [crear_experiencia(self.perfil, n) for n in range(10)]
+        cursos = [crear_curso(self.perfil, n) for n in range(10)]
+
+        def seleccion(cantidad):
+            return (
+                [f'exp_{e.pk}' for e in experiencias[:cantidad]]
+                + [f'cur_{c.pk}' for c in cursos[:cantidad]]
+            )
+
+        # Perfil activo (ya cacheado) + un in_bulk por modelo seleccionado
+        self.client.get('/seleccionar_certificados/')
+        with self.assertNumQueries(2):
+            self.descargar_zip(seleccion(1))
+        with self.assertNumQueries(2):
+            self.descargar_zip(seleccion(10))
+
+    def test_zip_en_streaming_sin_comprimir(self):
+        experiencias = [crear_experiencia(self.perfil, n) for n in range(3)]
+
+        response = self.client.post('/seleccionar_certificados/', {
+            'certificados': [f'exp_{e.pk}' for e in experiencias]
+        })
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertNotIn('Content-Length', response)
+        partes = list(response.streaming_content)
+        # Una parte por certificado y el directorio central al final
+        self.assertEqual(len(partes), 4)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(partes))) as archivo:
+            entradas = archivo.infolist()
+            self.assertEqual([e.filename for e in entradas], [f'certificado_exp_{e.pk}.jpg' for e in experiencias])
+            for entrada in entradas:
+                self.assertEqual(entrada.compress_type, zipfile.ZIP_STORED)
+                self.assertEqual(entrada.compress_size, entrada.file_size)
+
+    def test_ignora_certificados_de_otro_perfil(self):
+        propio = crear_experiencia(self.perfil, 1)
+        otro_perfil = crear_perfil(numerocedula='1300000002', perfilactivo=False)
+        ajeno = crear_experiencia(otro_perfil, 2)
+
+        contenido = self.descargar_zip([f'exp_{ajeno.pk}', f'exp_{propio.pk}', 'exp_x'])
+
+        self.assertIn(propio.certificado.name.encode(), contenido)
+        self.assertNotIn(ajeno.certificado.name.encode(), contenido)
+
+    def test_paquete_de_todos_se_arma_al_cambiar_un_certificado(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            experiencia = crear_experiencia(self.perfil, 1)
+            curso = crear_curso(self.perfil, 1)
+        trabajo = procesar_siguiente(get_contexto_perfil)
+        self.assertEqual(trabajo.tipo, TrabajoGeneracion.TIPO_CERTIFICADOS)
+        self.assertEqual(trabajo.estado, TrabajoGeneracion.LISTO)
+
+        # Cualquier orden de la misma selección sale del paquete, sin descargar
+        with mock.patch('cv.certificados.descargar') as descargar:
+            response = self.client.post('/seleccionar_certificados/', {
+                'certificados': [f'cur_{curso.pk}', f'exp_{experiencia.pk}']
+            })
+            contenido = b''.join(response.streaming_content)
+        self.assertIsInstance(response, FileResponse)
+        descargar.assert_not_called()
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+            self.assertEqual(len(archivo.namelist()), 2)
+
+        # Otro archivo en un certificado: clave distinta, se vuelve a armar
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.certificado = 'certificados/cursos/otro.jpg'
+            curso.save()
+        response = self.client.post('/seleccionar_certificados/', {
+            'certificados': [f'cur_{curso.pk}', f'exp_{experiencia.pk}']
+        })
+        self.assertNotIsInstance(response, FileResponse)
+        self.assertIn(b'otro.jpg', b''.join(response.streaming_content))
+
+
+class RespuestaFalsa:
+    """
+    Respuesta de requests.get(stream=True): entrega `contenido` de una vez
+    o, sin contenido, un pedazo cada `pausa` segundos sin terminar nunca.
+    """
+    status_code = 200
+
+    def __init__(self, contenido=None, pausa=0):
+        self.contenido = contenido
+        self.pausa = pausa
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def iter_content(self, chunk_size):
+        if self.contenido is not None:
+            yield self.contenido
+            return
+        while True:
+            time.sleep(self.pausa)
+            yield b'x' * 10
+
+
+class DescargaCertificadosTests(EntornoCVMixin, TestCase):
+    parches = (('cv.certificados.url_certificado', lambda objeto: f'https://ejemplo.com/{objeto.certificado.name}'),)
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        self.pendientes = [
+            (f'certificado_exp_{n}.jpg', crear_experiencia(self.perfil, n)) for n in range(1, 5)
+        ]
+        # Las descargas colgadas siguen en su hilo: se liberan al terminar
+        self.liberar = threading.Event()
+        self.addCleanup(self.liberar.set)
+
+    def test_limite_por_archivo(self):
+        with mock.patch('cv.certificados.requests.get', return_value=RespuestaFalsa(pausa=0.02)) as get:
+            inicio = time.monotonic()
+            with self.assertRaises(TimeoutError):
+                certificados.descargar('https://ejemplo.com/cert.jpg', 0.1)
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertEqual(get.call_args.kwargs['timeout'], 0.1)
+
+        # En el lote, el que se pasa del límite queda como fallido y el resto sigue
+        def get_falso(url, **kwargs):
+            return RespuestaFalsa(pausa=0.02) if url.endswith('exp_2.jpg') else RespuestaFalsa(url.encode())
+
+        with self.settings(CV_CERTIFICADOS_TIMEOUT_ARCHIVO=0.1), \
+                mock.patch('cv.certificados.requests.get', get_falso):
+            resultados = list(certificados.iterar_certificados(self.pendientes))
+        self.assertEqual([r.ok for r in resultados], [True, False, True, True])
+        self.assertIn('Más de 0.1s', resultados[1].error)
+
+    async def test_limite_por_archivo_async(self):
+        async def responder(request):
+            if request.url.path.endswith('exp_2.jpg'):
+                await asyncio.sleep(5)
+            return httpx.Response(200, content=request.url.path.encode())
+
+        cliente = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(responder))
+        with self.settings(CV_CERTIFICADOS_TIMEOUT_ARCHIVO=0.1), mock.patch('cv.certificados.httpx.AsyncClient', cliente):
+            resultados = [r async for r in certificados.aiterar_certificados(self.pendientes)]
+        self.assertEqual([r.ok for r in resultados], [True, False, True, True])
+        self.assertEqual(resultados[1].error, 'Más de 0.1s descargando')
+
+    def test_limite_total(self):
+        def descargar_falso(url, timeout):
+            if url.endswith('exp_3.jpg'):
+                # Sin escribir en la cache: el directorio temporal ya se está borrando
+                self.liberar.wait(5)
+                raise IOError('cancelada')
+            return url.encode()
+
+        with self.settings(CV_CERTIFICADOS_TIMEOUT_TOTAL=0.2), \
+                mock.patch('cv.certificados.descargar', descargar_falso):
+            inicio = time.monotonic()
+            resultados = list(certificados.iterar_certificados(self.pendientes))
+        self.assertLess(time.monotonic() - inicio, 2)
+        self.assertEqual([r.nombre for r in resultados], [nombre for nombre, _ in self.pendientes])
+        self.assertEqual(resultados[2].error, 'tiempo total agotado')
+        self.assertTrue(resultados[3].ok)
+
+    def test_orden_y_resumen_con_fallidos(self):
+        def descargar_falso(url, timeout):
+            # Los primeros tardan más: terminan en otro orden que el pedido
+            n = int(url[-5])
+            time.sleep((5 - n) * 0.02)
+            if n == 2:
+                raise IOError('HTTP 404')
+            return url.encode()
+
+        with mock.patch('cv.certificados.descargar', descargar_falso):
+            contenido = b''.join(certificados.zip_en_streaming(certificados.iterar_certificados(self.pendientes)))
+
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+            self.assertEqual(archivo.namelist(), [
+                'certificado_exp_1.jpg', 'certificado_exp_3.jpg', 'certificado_exp_4.jpg',
+                'certificados_no_incluidos.txt',
+            ])
+            self.assertEqual(archivo.read('certificado_exp_3.jpg'), b'https://ejemplo.com/certificados/experiencia/exp_3.jpg')
+            resumen = archivo.read('certificados_no_incluidos.txt').decode()
+        self.assertEqual(resumen, (
+            "No se pudieron incluir los siguientes certificados:\n\n"
+            "- certificado_exp_2.jpg: HTTP 404\n"
+        ))
+
+
+class CacheCertificadosTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        self.cache_local = certificados.cache_certificados()
+
+    def cachear(self, objeto):
+        clave = certificados.clave_certificado(objeto.certificado.name)
+        self.cache_local.guardar(clave, b'jpg')
+        return clave
+
+    def test_reemplazar_el_archivo_descarta_el_jpg(self):
+        for crear in (crear_experiencia, crear_curso):
+            with self.subTest(modelo=crear.__name__):
+                objeto, otro = crear(self.perfil, 1), crear(self.perfil, 2)
+                clave, clave_otro = self.cachear(objeto), self.cachear(otro)
+
+                # Guardar sin cambiar el archivo no lo toca
+                objeto.save()
+                self.assertEqual(self.cache_local.obtener(clave), b'jpg')
+
+                objeto.certificado = f'{os.path.dirname(objeto.certificado.name)}/nuevo.jpg'
+                objeto.save()
+                self.assertIsNone(self.cache_local.obtener(clave))
+                self.assertEqual(self.cache_local.obtener(clave_otro), b'jpg')
+
+    def test_borrar_la_fila_descarta_el_jpg(self):
+        for crear in (crear_experiencia, crear_curso):
+            with self.subTest(modelo=crear.__name__):
+                objeto, otro = crear(self.perfil, 3), crear(self.perfil, 4)
+                clave, clave_otro = self.cachear(objeto), self.cachear(otro)
+
+                objeto.delete()
+                self.assertIsNone(self.cache_local.obtener(clave))
+                self.assertEqual(self.cache_local.obtener(clave_otro), b'jpg')
+
+
+@override_settings(CV_CERTIFICADOS_LADO_MAXIMO=1000)
+class IngestaCertificadosTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+        salida = io.BytesIO()
+        Image.new('RGBA', (3000, 1500), (200, 30, 30, 128)).save(salida, 'PNG')
+        self.png = salida.getvalue()
+
+    def test_normaliza_y_deduplica(self):
+        experiencia = crear_experiencia(self.perfil, 1, certificado=SimpleUploadedFile('titulo.png', self.png))
+        self.assertTrue(experiencia.certificado.name.endswith('.jpg'))
+        self.assertEqual((experiencia.certificadoancho, experiencia.certificadoalto), (1000, 500))
+        self.assertEqual(experiencia.certificadotamano, experiencia.certificado.size)
+        with Image.open(experiencia.certificado.path) as imagen:
+            self.assertEqual(imagen.format, 'JPEG')
+
+        curso = crear_curso(self.perfil, 1, certificado=SimpleUploadedFile('copia.png', self.png))
+        self.assertEqual(curso.certificado.name, experiencia.certificado.name)
+        self.assertEqual(curso.certificadohuella, experiencia.certificadohuella)
+        self.assertEqual(sum(len(archivos) for _, _, archivos in os.walk(os.path.join(self.temporal, 'media'))), 1)
+
+    def test_rechaza_lo_que_no_es_imagen(self):
+        experiencia = ExperienciaLaboral(
+            perfil=self.perfil, certificado=SimpleUploadedFile('falso.jpg', b'no soy una imagen')
+        )
+        with self.assertRaises(ValidationError) as contexto:
+            experiencia.clean()
+        self.assertIn('certificado', contexto.exception.message_dict)
+
+    def test_el_save_sin_validar_no_falla(self):
+        # Sin full_clean() (código, importaciones) se guarda tal cual
+        with self.assertLogs('cv.signals', 'WARNING'):
+            experiencia = crear_experiencia(
+                self.perfil, 1, certificado=SimpleUploadedFile('falso.jpg', b'no soy una imagen')
+            )
+        experiencia.refresh_from_db()
+        self.assertEqual(experiencia.certificadohuella, '')
+        self.assertIsNone(experiencia.certificadotamano)
+        self.assertEqual(experiencia.certificado.read(), b'no soy una imagen')
+
+    def test_el_admin_muestra_el_error_en_el_formulario(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='x'))
+        experiencia = crear_experiencia(self.perfil, 1, certificado='')
+        datos = {
+            campo.name: campo.value_from_object(experiencia)
+            for campo in ExperienciaLaboral._meta.fields if campo.editable and campo.name not in ('id', 'certificado')
+        }
+        datos['perfil'] = self.perfil.pk
+        datos['certificado'] = SimpleUploadedFile('falso.jpg', b'no soy una imagen')
+        response = self.client.post(f'/admin/cv/experiencialaboral/{experiencia.pk}/change/', datos)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('certificado', response.context['adminform'].form.errors)
+
+
+class ImagenesResponsivasTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.storage = FileSystemStorage(location=os.path.join(self.temporal, 'media'), base_url='/media/')
+
+    def subir(self, ancho, alto):
+        contenido = io.BytesIO()
+        Image.new('RGB', (ancho, alto), (30, 120, 200)).save(contenido, 'JPEG')
+        nombre = self.storage.save('venta_garage/silla.jpg', ContentFile(contenido.getvalue()))
+        campo = FieldFile(None, VentaGarage._meta.get_field('imagen'), nombre)
+        campo.storage = self.storage
+        return campo
+
+    def etiqueta(self, campo, derivados):
+        plantilla = Template(
+            '{% load cv_imagenes %}'
+            '{% imagen_responsive campo derivados "280px" alt="Silla" clase="producto-img" %}'
+        )
+        return plantilla.render(Context({'campo': campo, 'derivados': derivados}))
+
+    def test_generar_derivados(self):
+        campo = self.subir(700, 350)
+
+        derivados = generar_derivados(campo)
+
+        self.assertEqual(derivados['origen'], campo.name)
+        # Sin agrandar: el último tamaño es la original
+        for nombre_formato, extension in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            self.assertEqual([ancho for ancho, _, _ in derivados[nombre_formato]], [160, 320, 640, 700])
+            for ancho, nombre, url in derivados[nombre_formato]:
+                self.assertTrue(nombre.startswith('derivados/venta_garage/silla/'))
+                self.assertEqual(url, f'/media/{nombre}')
+                with Image.open(self.storage.path(nombre)) as imagen:
+                    self.assertEqual(imagen.format, extension)
+                    self.assertEqual(imagen.size, (ancho, ancho // 2))
+
+        pequena = generar_derivados(self.subir(100, 80))
+        self.assertEqual([ancho for ancho, _, _ in pequena['jpeg']], [100])
+
+    def test_etiqueta_con_derivados(self):
+        campo = self.subir(700, 350)
+        derivados = generar_derivados(campo)
+
+        html = self.etiqueta(campo, derivados)
+
+        webp = ', '.join(f'{url} {ancho}w' for ancho, _, url in derivados['webp'])
+        jpeg = ', '.join(f'{url} {ancho}w' for ancho, _, url in derivados['jpeg'])
+        self.assertInHTML(
+            f'<picture><source type="image/webp" srcset="{webp}" sizes="280px">'
+            f'<img src="{derivados["jpeg"][1][2]}" srcset="{jpeg}" sizes="280px" alt="Silla" class="producto-img"'
+            ' loading="lazy" decoding="async"></picture>',
+            html,
+        )
+
+    def test_etiqueta_sin_derivados(self):
+        campo = self.subir(700, 350)
+        original = f'<img src="/media/{campo.name}" alt="Silla" class="producto-img" loading="lazy" decoding="async">'
+
+        # Todavía sin derivados, o los de una imagen anterior
+        self.assertHTMLEqual(self.etiqueta(campo, {}), original)
+        self.assertHTMLEqual(self.etiqueta(campo, {'origen': 'venta_garage/vieja.jpg', 'jpeg': [[160, 'x', 'y']]}), original)
+        self.assertEqual(self.etiqueta(None, {}), '')
+
+
+class ExportStaticTests(EntornoCVMixin, TestCase):
+    parches = SIN_RED
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        self.destino = os.path.join(self.temporal, 'sitio')
+
+    def exportar(self, sin_certificados=True):
+        salida = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('export_static', destino=self.destino, sin_certificados=sin_certificados, stdout=salida)
+        return salida.getvalue()
+
+    def leer(self, archivo):
+        with open(os.path.join(self.destino, archivo), 'rb') as entrada:
+            return entrada.read()
+
+    def test_exportacion_incremental(self):
+        primera = self.exportar()
+        self.assertIn('exportado', primera)
+        for archivo in ('index.html', 'hoja-de-vida/index.html', 'venta-garage/index.html', 'cv/pdf/CV.pdf'):
+            self.assertTrue(os.path.exists(os.path.join(self.destino, archivo)), archivo)
+        # El manifiesto no se publica
+        self.assertFalse(any(nombre.startswith('.export') for nombre in os.listdir(self.destino)))
+        self.assertTrue(os.path.exists(self.destino + '.export.json'))
+
+        self.assertNotIn('exportado', self.exportar())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_experiencia(self.perfil, 1)
+        self.assertIn('exportado    /hoja-de-vida/', self.exportar())
+
+    def test_los_enlaces_apuntan_a_los_archivos_exportados(self):
+        self.exportar()
+        home = self.leer('hoja-de-vida/index.html').decode()
+        self.assertIn('href="/cv/pdf/CV.pdf"', home)
+        self.assertNotIn('href="/cv/pdf/"', home)
+        # Sin ZIP no hay a dónde enlazar la selección de certificados
+        self.assertNotIn('/seleccionar_certificados/', home)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_experiencia(self.perfil, 1)
+        self.exportar(sin_certificados=False)
+        home = self.leer('hoja-de-vida/index.html').decode()
+        self.assertIn('href="/certificados/todos.zip"', home)
+        with zipfile.ZipFile(io.BytesIO(self.leer('certificados/todos.zip'))) as archivo:
+            self.assertEqual(len(archivo.namelist()), 1)
+
+    def test_cambiar_de_renderizador_regenera_el_pdf(self):
+        self.exportar()
+        with self.settings(CV_PDF_RENDERIZADOR='reportlab'):
+            salida = self.exportar()
+        self.assertIn('exportado    /cv/pdf/', salida)
+        self.assertIn('sin cambios  /hoja-de-vida/', salida)
+
+
+class ImportExportTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        for n in range(3):
+            crear_experiencia(self.perfil, n)
+        crear_curso(self.perfil, 1, activarparaqueseveaenfront=False)
+        self.archivo = os.path.join(self.temporal, 'cv.jsonl')
+        call_command('cv_export', self.perfil.slug, salida=self.archivo)
+
+    def importar(self, **opciones):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cv_import', self.archivo, lote=2, stdout=io.StringIO(), **opciones)
+
+    def test_ida_y_vuelta(self):
+        with self.assertRaisesMessage(CommandError, '--reemplazar'):
+            self.importar()
+
+        self.importar(reemplazar=True)
+        self.assertEqual(DatosPersonales.objects.count(), 1)
+        self.assertEqual(ExperienciaLaboral.objects.filter(perfil=self.perfil).count(), 3)
+        self.assertFalse(CursoRealizado.objects.get(perfil=self.perfil).activarparaqueseveaenfront)
+        self.assertContains(self.client.get('/hoja-de-vida/'), 'Cargo 2')
+
+    def test_exportar_a_la_salida_estandar(self):
+        salida = io.StringIO()
+        call_command('cv_export', self.perfil.slug, stdout=salida)
+        with open(self.archivo, encoding='utf-8') as archivo:
+            self.assertEqual(salida.getvalue(), archivo.read())
+        self.assertEqual(len(salida.getvalue().splitlines()), 5)
+
+    def test_una_fila_invalida_no_guarda_nada(self):
+        with open(self.archivo) as archivo:
+            lineas = archivo.readlines()
+        lineas[0] = lineas[0].replace('1300000001', '1300000009')
+        lineas[-1] = lineas[-1].replace('"fechafin": "2020-02-01"', '"fechafin": "2019-01-01"')
+        with open(self.archivo, 'w') as archivo:
+            archivo.writelines(lineas)
+
+        with self.assertRaisesMessage(CommandError, f'línea {len(lineas)}: La fecha fin no puede ser menor'):
+            self.importar()
+        self.assertEqual(DatosPersonales.objects.count(), 1)
+        self.assertEqual(ExperienciaLaboral.objects.count(), 3)
+
+
+class FragmentosHomeTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    def test_solo_se_regenera_la_seccion_editada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            experiencia = crear_experiencia(self.perfil, 1, cargodesempenado='Analista')
+            curso = crear_curso(self.perfil, 1, nombrecurso='Django básico')
+        self.assertContains(self.client.get('/hoja-de-vida/'), 'Analista')
+
+        # Cambio sin señales: el snapshot se actualiza pero el contador de
+        # experiencias no, así que su fragmento sigue saliendo de la cache.
+        ExperienciaLaboral.objects.filter(pk=experiencia.pk).update(cargodesempenado='Gerente')
+        reconstruir_snapshot(self.perfil.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            curso.nombrecurso = 'Django avanzado'
+            curso.save()
+
+        response = self.client.get('/hoja-de-vida/')
+        self.assertContains(response, 'Django avanzado')
+        self.assertContains(response, 'Analista')
+        self.assertNotContains(response, 'Gerente')
+
+    def test_un_request_antes_de_confirmar_no_fija_el_fragmento_viejo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            experiencia = crear_experiencia(self.perfil, 1, cargodesempenado='Analista')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            experiencia.cargodesempenado = 'Gerente'
+            experiencia.save()
+            self.assertContains(self.client.get('/hoja-de-vida/'), 'Analista')
+        self.assertContains(self.client.get('/hoja-de-vida/'), 'Gerente')
+
+
+class PaginaCondicionalTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = crear_perfil()
+        self.fechar(now().replace(year=2020))
+
+    def fechar(self, fecha):
+        SnapshotPerfil.objects.filter(pk=self.perfil.pk).update(fechaactualizacion=fecha)
+
+    def test_304_con_if_none_match(self):
+        etag = self.client.get('/hoja-de-vida/')['ETag']
+        response = self.client.get('/hoja-de-vida/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_304_con_if_modified_since(self):
+        ultima = self.client.get('/hoja-de-vida/')['Last-Modified']
+        response = self.client.get('/hoja-de-vida/', HTTP_IF_MODIFIED_SINCE=ultima)
+        self.assertEqual(response.status_code, 304)
+
+    def test_un_cambio_en_el_mismo_segundo_no_da_304_por_fecha(self):
+        ahora = now()
+        self.fechar(ahora)
+        response = self.client.get('/hoja-de-vida/')
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get('/hoja-de-vida/', HTTP_IF_MODIFIED_SINCE=http_date(ahora.timestamp()))
+        self.assertEqual(response.status_code, 200)
+
+    def test_la_version_de_despliegue_cambia_el_etag(self):
+        etag = self.client.get('/hoja-de-vida/')['ETag']
+        with self.settings(CV_VERSION_DESPLIEGUE='abc123'):
+            response = self.client.get('/hoja-de-vida/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    async def test_sync_y_async_dan_los_mismos_validadores(self):
+        sincrona = await self.async_client.get('/hoja-de-vida/')
+        asincrona = await vistas_async.home(AsyncRequestFactory().get('/hoja-de-vida/'))
+        self.assertEqual(asincrona.status_code, 200)
+        self.assertEqual(asincrona['ETag'], sincrona['ETag'])
+        self.assertEqual(asincrona['Last-Modified'], sincrona['Last-Modified'])
+
+        for cabecera, valor in (
+            ('If-None-Match', sincrona['ETag']),
+            ('If-Modified-Since', sincrona['Last-Modified']),
+        ):
+            request = AsyncRequestFactory().get('/hoja-de-vida/', headers={cabecera: valor})
+            self.assertEqual((await vistas_async.home(request)).status_code, 304)
+
+
+@override_settings(CV_VENTA_GARAGE_POR_PAGINA=2)
+class VentaGarageTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        # (nombre, estado, precio, día de publicación); el 3 y el 4 el mismo día
+        for nombre, estado, precio, dia in (
+            ('uno', 'Bueno', '5.00', 1),
+            ('dos', 'Regular', '15.00', 2),
+            ('tres', 'Bueno', '25.00', 3),
+            ('cuatro', 'Bueno', '35.00', 3),
+            ('cinco', 'Regular', '45.00', 5),
+        ):
+            VentaGarage.objects.create(
+                perfil=self.perfil, nombreproducto=nombre, estadoproducto=estado, descripcion='Usado',
+                valordelbien=Decimal(precio), fechapublicacion=date(2024, 1, dia),
+            )
+        VentaGarage.objects.create(
+            perfil=self.perfil, nombreproducto='oculto', estadoproducto='Bueno', descripcion='Usado',
+            valordelbien=Decimal('20.00'), activarparaqueseveaenfront=False,
+        )
+
+    def nombres(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [p.nombreproducto for p in response.context['productos']]
+
+    def recorrer(self, url):
+        """Sigue el scroll infinito hasta el final y devuelve los nombres en orden."""
+        nombres = []
+        while url:
+            response = self.client.get(url)
+            nombres += self.nombres(response)
+            url = response.json()['siguiente']
+        return nombres
+
+    def test_filtra_por_estado_y_precio(self):
+        response = self.client.get('/venta-garage/', {'estado': 'Bueno', 'precio_min': '10', 'precio_max': '30'})
+        self.assertEqual(self.nombres(response), ['tres'])
+
+    def test_ignora_filtros_invalidos(self):
+        primera = ['cinco', 'cuatro']
+        for parametros in (
+            {'estado': 'Malo'},
+            {'precio_min': 'abc'},
+            {'precio_min': 'NaN', 'precio_max': 'sNaN'},
+            {'precio_min': '-Infinity', 'precio_max': 'Infinity'},
+        ):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.nombres(self.client.get('/venta-garage/', parametros)), primera)
+
+    def test_ignora_un_cursor_mal_formado(self):
+        for despues in ('basura', '2024-01-03', '2024-01-03_x', '2024-13-01_1', '_3'):
+            with self.subTest(despues=despues):
+                response = self.client.get('/venta-garage/', {'despues': despues})
+                self.assertEqual(self.nombres(response), ['cinco', 'cuatro'])
+
+    def test_pagina_por_cursor_sin_repetir_ni_saltear(self):
+        self.assertEqual(
+            self.recorrer('/venta-garage/pagina/'), ['cinco', 'cuatro', 'tres', 'dos', 'uno']
+        )
+        # Los filtros viajan en el cursor
+        self.assertEqual(self.recorrer('/venta-garage/pagina/?estado=Bueno'), ['cuatro', 'tres', 'uno'])
+
+    def test_fragmento_json(self):
+        datos = self.client.get('/venta-garage/pagina/', {'estado': 'Regular'}).json()
+        self.assertIn('cinco', datos['html'])
+        self.assertIn('dos', datos['html'])
+        self.assertIsNone(datos['siguiente'])
+
+        datos = self.client.get('/venta-garage/pagina/').json()
+        self.assertNotIn('tres', datos['html'])
+        self.assertTrue(datos['siguiente'].startswith('/venta-garage/pagina/?despues=2024-01-03_'))
+
+
+class CacheDiscoTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = CacheDisco(os.path.join(self.temporal, 'disco'), max_bytes=250)
+
+    def envejecer(self, ruta):
+        os.utime(ruta, (1, 1))
+
+    def test_recorta_solo_al_pasar_el_limite(self):
+        with mock.patch.object(CacheDisco, 'recortar', autospec=True, side_effect=CacheDisco.recortar) as recortar:
+            # La primera escritura recorre el directorio para estimar el total
+            self.cache.guardar('a', b'a' * 100)
+            self.assertEqual(recortar.call_count, 1)
+            self.envejecer(self.cache.ruta('a'))
+            self.cache.guardar('b', b'b' * 100)
+            self.assertEqual(recortar.call_count, 1)
+
+            self.cache.guardar('c', b'c' * 100)
+            self.assertEqual(recortar.call_count, 2)
+        # Se fue el menos usado
+        self.assertIsNone(self.cache.obtener('a'))
+        self.assertEqual(self.cache.obtener('b'), b'b' * 100)
+        self.assertEqual(self.cache.obtener('c'), b'c' * 100)
+
+    def test_borra_los_temporales_huerfanos(self):
+        self.cache.guardar('a', b'a')
+        huerfanos = []
+        for directorio in (self.cache.directorio, self.cache._claves, self.cache.ruta('a').parent):
+            ruta = directorio / '.tmpviejo'
+            ruta.write_bytes(b'x')
+            self.envejecer(ruta)
+            huerfanos.append(ruta)
+        with self.cache.temporal() as en_curso:
+            en_curso.write(b'x')
+
+        self.cache.recortar()
+        for ruta in huerfanos:
+            self.assertFalse(ruta.exists())
+        self.assertTrue(os.path.exists(en_curso.name))
+        self.assertEqual(self.cache.obtener('a'), b'a')
+
+
+class CachePDFTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = crear_perfil()
+            self.experiencia = crear_experiencia(self.perfil, 1, cargodesempenado='Analista')
+
+    def test_el_pdf_refleja_la_edicion_confirmada(self):
+        self.assertIn('Analista', texto_pdf(self.client.get('/cv/pdf/').content))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experiencia.cargodesempenado = 'Gerente'
+            self.experiencia.save()
+            # Un request antes de confirmar todavía ve el snapshot viejo: lo
+            # que genere no puede quedar guardado bajo la versión nueva
+            self.assertIn('Analista', texto_pdf(self.client.get('/cv/pdf/').content))
+
+        texto = texto_pdf(self.client.get('/cv/pdf/').content)
+        self.assertIn('Gerente', texto)
+        self.assertNotIn('Analista', texto)
+
+
+class ResolverEnlaceTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        contenido = io.BytesIO()
+        Image.new('RGB', (2000, 1000), (30, 120, 200)).save(contenido, 'JPEG')
+        self.jpeg = contenido.getvalue()
+
+    def assertReducida(self, ruta):
+        self.assertTrue(ruta.startswith(os.path.join(self.temporal, 'pdf')))
+        with Image.open(ruta) as imagen:
+            self.assertEqual(imagen.size, (LADO_MAXIMO_IMPRESION, LADO_MAXIMO_IMPRESION // 2))
+
+    def test_static_y_media_son_archivos_locales(self):
+        with mock.patch('cv.pdf.descargar') as descargar:
+            self.assertEqual(resolver_enlace('/static/admin/css/base.css'), finders.find('admin/css/base.css'))
+
+            nombre = default_storage.save('documentos/guia.pdf', ContentFile(b'%PDF-1.4'))
+            self.assertEqual(resolver_enlace(f'/media/{nombre}'), default_storage.path(nombre))
+
+            # Las imágenes locales también se reducen, sin tocar la original
+            nombre = default_storage.save('fotos/perfil.jpg', ContentFile(self.jpeg))
+            self.assertReducida(resolver_enlace(f'http://testserver/media/{nombre}'))
+            with Image.open(default_storage.path(nombre)) as original:
+                self.assertEqual(original.size, (2000, 1000))
+        descargar.assert_not_called()
+
+    def test_imagen_remota_se_baja_una_vez(self):
+        uri = 'https://res.cloudinary.com/demo/image/upload/perfil.jpg'
+        with mock.patch('cv.pdf.descargar', return_value=self.jpeg) as descargar:
+            ruta = resolver_enlace(uri)
+            self.assertEqual(resolver_enlace(uri), ruta)
+        descargar.assert_called_once_with(uri, 15)
+        self.assertReducida(ruta)
+
+    def test_descarga_fallida(self):
+        uri = 'https://res.cloudinary.com/demo/image/upload/perfil.jpg'
+        with mock.patch('cv.pdf.descargar', side_effect=IOError('HTTP 404')), \
+                self.assertLogs('cv.pdf', 'WARNING'):
+            self.assertEqual(resolver_enlace(uri), '')
+        # Sin cachear el fallo: el siguiente intento vuelve a bajarla
+        with mock.patch('cv.pdf.descargar', return_value=self.jpeg):
+            self.assertReducida(resolver_enlace(uri))
+
+
+class TrabajosPDFTests(EntornoCVMixin, TestCase):
+    parches = SIN_RED
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = crear_perfil()
+            self.experiencia = crear_experiencia(self.perfil, 1, cargodesempenado='Analista')
+        # Solo interesan los trabajos del PDF
+        TrabajoGeneracion.objects.all().delete()
+
+    def pedir(self):
+        response = self.client.get('/cv/pdf/?async=1')
+        self.assertEqual(response.status_code, 202)
+        return TrabajoGeneracion.objects.get(pk=response.json()['trabajo'])
+
+    def test_un_trabajo_de_una_version_vieja_no_se_genera(self):
+        viejo = self.pedir()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experiencia.cargodesempenado = 'Gerente'
+            self.experiencia.save()
+        nuevo = self.pedir()
+
+        self.assertEqual(procesar_siguiente(get_contexto_perfil).pk, viejo.pk)
+        viejo.refresh_from_db()
+        self.assertEqual(viejo.estado, TrabajoGeneracion.OBSOLETO)
+        self.assertIsNone(viejo.resultado)
+        self.assertIn('error', self.client.get(f'/cv/pdf/trabajos/{viejo.pk}/').json())
+
+        while procesar_siguiente(get_contexto_perfil):
+            pass
+        nuevo.refresh_from_db()
+        self.assertEqual(nuevo.estado, TrabajoGeneracion.LISTO)
+        self.assertIn('Gerente', texto_pdf(bytes(nuevo.resultado)))
+
+    def test_encolar_reutiliza_el_trabajo_de_la_misma_version(self):
+        trabajo = self.pedir()
+        self.assertEqual(self.pedir().pk, trabajo.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experiencia.cargodesempenado = 'Gerente'
+            self.experiencia.save()
+        self.assertNotEqual(self.pedir().pk, trabajo.pk)
+        self.assertEqual(TrabajoGeneracion.objects.filter(tipo=TrabajoGeneracion.TIPO_PDF).count(), 2)
+
+    def test_un_trabajo_reclamado_no_se_vuelve_a_tomar(self):
+        trabajo = self.pedir()
+        # Otro worker ya lo marcó como PROCESANDO
+        TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(estado=TrabajoGeneracion.PROCESANDO)
+        self.assertIsNone(procesar_siguiente(get_contexto_perfil))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoGeneracion.PROCESANDO)
+
+    def test_estado_y_descarga_del_trabajo(self):
+        trabajo = self.pedir()
+        url_estado = f'/cv/pdf/trabajos/{trabajo.pk}/'
+        url_descarga = f'/cv/pdf/trabajos/{trabajo.pk}/descargar/'
+
+        datos = self.client.get(url_estado).json()
+        self.assertEqual(datos['estado'], TrabajoGeneracion.PENDIENTE)
+        self.assertNotIn('url_descarga', datos)
+        self.assertEqual(self.client.get(url_descarga).status_code, 404)
+
+        procesar_siguiente(get_contexto_perfil)
+        datos = self.client.get(url_estado).json()
+        self.assertEqual(datos['estado'], TrabajoGeneracion.LISTO)
+        self.assertEqual(datos['url_descarga'], url_descarga)
+
+        response = self.client.get(url_descarga)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('Analista', texto_pdf(response.content))
+        response = self.client.get(url_descarga, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.client.get('/cv/pdf/trabajos/999999/').status_code, 404)
+
+    async def test_un_trabajo_de_certificados_no_se_descarga_como_pdf(self):
+        trabajo = await sync_to_async(encolar_certificados)(self.perfil.pk)
+        await TrabajoGeneracion.objects.filter(pk=trabajo.pk).aupdate(estado=TrabajoGeneracion.LISTO)
+
+        datos = (await self.async_client.get(f'/cv/pdf/trabajos/{trabajo.pk}/')).json()
+        self.assertEqual(datos['estado'], TrabajoGeneracion.LISTO)
+        self.assertNotIn('url_descarga', datos)
+
+        url = f'/cv/pdf/trabajos/{trabajo.pk}/descargar/'
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+        with self.settings(ROOT_URLCONF=URLS_ASYNC):
+            self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+    def test_sin_perfil_activo_responde_404(self):
+        self.perfil.perfilactivo = False
+        self.perfil.save()
+        self.assertEqual(self.client.get('/cv/pdf/?async=1').status_code, 404)
+        self.assertEqual(self.client.get('/cv/pdf/').status_code, 404)
+        self.assertFalse(TrabajoGeneracion.objects.exists())
+
+
+class RenderizadoresPDFTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = crear_perfil(nombres='Ana & María')
+            crear_experiencia(self.perfil, 1, cargodesempenado='Analista <senior>')
+
+    def test_reportlab_arma_el_mismo_cv(self):
+        with override_settings(CV_PDF_RENDERIZADOR='html'):
+            html = self.client.get('/cv/pdf/')
+        with override_settings(CV_PDF_RENDERIZADOR='reportlab'):
+            response = self.client.get('/cv/pdf/')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        # El renderizador va en la clave de la cache: no se sirve el PDF del otro
+        self.assertNotEqual(response.content, html.content)
+
+        texto = texto_pdf(response.content)
+        for esperado in ('ANA & MARÍA', 'Analista <senior>', 'EXPERIENCIA LABORAL', '2020 - 2021'):
+            self.assertIn(esperado, texto)
+
+    def test_los_dos_renderizadores_arman_las_mismas_secciones(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(2, 6):
+                crear_experiencia(self.perfil, n)
+            for n in range(1, 6):
+                crear_curso(self.perfil, n)
+                ProductoAcademico.objects.create(
+                    perfil=self.perfil, nombrerecurso=f'Recurso {n}', clasificador='Libro', descripcion='Libro',
+                )
+                ProductoLaboral.objects.create(
+                    perfil=self.perfil, nombreproducto=f'Producto {n}', fechaproducto=date(2022, 3, 1),
+                    descripcion='Producto',
+                )
+
+        secciones = ('experiencia laboral', 'cursos realizados', 'productos académicos', 'productos laborales')
+        items = [f'cargo {n}' for n in range(2, 6)] + [
+            f'{nombre} {n}' for nombre in ('curso', 'recurso', 'producto') for n in range(1, 6)
+        ]
+        for nombre in ('html', 'reportlab'):
+            with self.subTest(renderizador=nombre), override_settings(CV_PDF_RENDERIZADOR=nombre):
+                # xhtml2pdf no aplica text-transform: se compara sin mayúsculas
+                texto = texto_pdf(self.client.get('/cv/pdf/').content).casefold()
+                posiciones = [texto.find(seccion) for seccion in secciones]
+                self.assertNotIn(-1, posiciones)
+                self.assertEqual(posiciones, sorted(posiciones))
+                for item in items:
+                    self.assertIn(item, texto)
+
+    def test_renderizador_desconocido(self):
+        with override_settings(CV_PDF_RENDERIZADOR='latex'), self.assertRaises(ImproperlyConfigured):
+            self.client.get('/cv/pdf/')
+
+
+class AccionesAdminTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+
+    def test_ocultar_en_bloque_invalida_el_perfil(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            experiencias = [crear_experiencia(self.perfil, n, cargodesempenado=f'Cargo {n}') for n in (1, 2)]
+        self.assertContains(self.client.get('/hoja-de-vida/'), 'Cargo 2')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/cv/experiencialaboral/', {
+                'action': 'ocultar', '_selected_action': [experiencias[1].pk], 'index': 0,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ExperienciaLaboral.objects.filter(activarparaqueseveaenfront=True).count(), 1)
+        response = self.client.get('/hoja-de-vida/')
+        self.assertContains(response, 'Cargo 1')
+        self.assertNotContains(response, 'Cargo 2')
+
+
+    def test_publicar_varios_perfiles_en_una_pasada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            perfiles = [self.perfil] + [
+                crear_perfil(numerocedula=f'13000001{n:02d}', perfilactivo=False) for n in range(5)
+            ]
+            ids = [crear_experiencia(perfil, 1, activarparaqueseveaenfront=False).pk for perfil in perfiles]
+        TrabajoGeneracion.objects.all().delete()
+
+        def publicar(seleccion):
+            with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/admin/cv/experiencialaboral/', {
+                    'action': 'publicar', '_selected_action': seleccion, 'index': 0,
+                })
+            return len(consultas)
+
+        # Reconstruir y encolar no cuesta más consultas con más perfiles
+        self.assertEqual(publicar(ids[:2]), publicar(ids[2:]))
+
+        for perfil in perfiles:
+            experiencia, = contexto_snapshot(perfil.pk)['experiencias']
+            self.assertEqual(experiencia.cargodesempenado, 'Cargo 1')
+        self.assertEqual(
+            sorted(TrabajoGeneracion.objects.filter(
+                tipo=TrabajoGeneracion.TIPO_CERTIFICADOS, estado=TrabajoGeneracion.PENDIENTE
+            ).values_list('perfil_id', flat=True)),
+            sorted(perfil.pk for perfil in perfiles),
+        )
+
+
+class PerfilPorSlugTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        crear_perfil()
+        self.otro = crear_perfil(nombres='Ana María', apellidos='Loor', numerocedula='1300000002', perfilactivo=False)
+
+    def test_rutas_por_slug_y_cedula(self):
+        self.assertEqual(self.otro.slug, 'ana-maria-loor')
+        response = self.client.get('/cv/ana-maria-loor/')
+        self.assertContains(response, 'Ana María')
+        self.assertContains(response, 'href="/cv/ana-maria-loor/pdf/"')
+        self.assertContains(self.client.get('/cv/1300000002/'), 'Ana María')
+        self.assertContains(self.client.get('/hoja-de-vida/'), 'Juan')
+        self.assertEqual(self.client.get('/cv/no-existe/').status_code, 404)
+
+        # Cambiar el slug invalida el anterior aunque estuviera en cache
+        self.otro.slug = 'ana-loor'
+        self.otro.save()
+        self.assertEqual(self.client.get('/cv/ana-maria-loor/').status_code, 404)
+        self.assertContains(self.client.get('/cv/ana-loor/venta-garage/'), 'href="/cv/ana-loor/"')
+
+
+class MetricasTests(EntornoCVMixin, TestCase):
+    parches = SIN_RED
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    def cuenta(self, vista):
+        return HISTOGRAMAS['total']._series.get(vista, {}).get('cuenta', 0)
+
+    def test_server_timing_solo_para_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get('/hoja-de-vida/'))
+        with self.settings(CV_SERVER_TIMING=True):
+            self.assertIn('Server-Timing', self.client.get('/hoja-de-vida/'))
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True))
+        response = self.client.get('/hoja-de-vida/')
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+.*plantilla;dur=[\d.]+.*total;dur=')
+
+    async def test_server_timing_solo_para_staff_bajo_asgi(self):
+        self.assertNotIn('Server-Timing', await self.async_client.get('/hoja-de-vida/'))
+        staff = await User.objects.acreate(username='admin', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        self.assertIn('Server-Timing', await self.async_client.get('/hoja-de-vida/'))
+
+    def test_endpoint_prometheus(self):
+        self.client.get('/hoja-de-vida/')
+        self.assertEqual(self.client.get('/metricas/').status_code, 403)
+
+        staff = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/metricas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('cv_request_duration_seconds_count{vista="home"}', response.content.decode())
+
+    def test_cubetas_acumulativas(self):
+        histograma = Histograma('cv_prueba', "Prueba.", (1, 5))
+        for valor in (0.5, 1, 3, 10):
+            histograma.observar('home', valor)
+        self.assertEqual(histograma.exponer()[2:], [
+            'cv_prueba_bucket{vista="home",le="1"} 2',
+            'cv_prueba_bucket{vista="home",le="5"} 3',
+            'cv_prueba_bucket{vista="home",le="+Inf"} 4',
+            'cv_prueba_sum{vista="home"} 14.5',
+            'cv_prueba_count{vista="home"} 4',
+        ])
+
+    def test_el_zip_en_streaming_se_registra_al_terminar(self):
+        experiencia = crear_experiencia(self.perfil, 1)
+        antes = self.cuenta('seleccionar_certificados')
+        response = self.client.post('/seleccionar_certificados/', {'certificados': [f'exp_{experiencia.pk}']})
+        self.assertEqual(self.cuenta('seleccionar_certificados'), antes)
+        b''.join(response.streaming_content)
+        self.assertEqual(self.cuenta('seleccionar_certificados'), antes + 1)
+
+
+@override_settings(CV_PERFILADO_MAX_ARCHIVOS=1)
+class PerfiladoTests(EntornoCVMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        crear_perfil()
+
+    def test_solo_staff_y_con_retencion(self):
+        self.client.get('/hoja-de-vida/?perfilar=1')
+        self.assertFalse(PerfilEjecucion.objects.exists())
+
+        self.client.force_login(User.objects.create_user('admin', password='x', is_staff=True, is_superuser=True))
+        primero = self.client.get('/hoja-de-vida/?perfilar=1')['X-CV-Perfil']
+        segundo = self.client.get('/hoja-de-vida/', HTTP_X_CV_PERFILAR='muestreo')['X-CV-Perfil']
+
+        # Con un máximo de 1 solo queda el último, y el archivo del primero se borra
+        self.assertEqual(list(PerfilEjecucion.objects.values_list('pk', flat=True)), [int(segundo)])
+        self.assertEqual(
+            self.client.get(f'/admin/cv/perfilejecucion/{primero}/descargar/perfil/').status_code, 404
+        )
+        response = self.client.get(f'/admin/cv/perfilejecucion/{segundo}/descargar/perfil/')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CV_PERFILADO_INTERVALO_MS=1)
+    def test_el_muestreo_solo_ve_el_hilo_perfilado(self):
+        fin = threading.Event()
+
+        def otro_request():
+            while not fin.is_set():
+                sum(range(1000))
+
+        otro = threading.Thread(target=otro_request)
+        otro.start()
+        try:
+            perfilador = PerfiladorMuestreo()
+            perfilador.activar()
+            limite = time.perf_counter() + 0.1
+            while time.perf_counter() < limite:
+                sum(range(1000))
+            perfilador.pausar()
+            pilas = perfilador.resultado()[0].decode()
+        finally:
+            fin.set()
+            otro.join()
+
+        self.assertIn('test_el_muestreo_solo_ve_el_hilo_perfilado', pilas)
+        self.assertNotIn('otro_request', pilas)
+
+
+class VistasAsyncTests(EntornoCVMixin, TestCase):
+    parches = SIN_RED
+
+    def setUp(self):
+        super().setUp()
+        self.perfil = crear_perfil()
+
+    async def test_zip_de_certificados_async(self):
+        experiencia = await sync_to_async(crear_experiencia)(self.perfil, 1)
+        curso = await sync_to_async(crear_curso)(self.perfil, 1)
+        request = AsyncRequestFactory().post(
+            '/seleccionar_certificados/', {'certificados': [f'cur_{curso.pk}', f'exp_{experiencia.pk}']}
+        )
+
+        response = await vistas_async.seleccionar_certificados(request)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertTrue(response.is_async)
+        contenido = b''.join([parte async for parte in response.streaming_content])
+
+        with zipfile.ZipFile(io.BytesIO(contenido)) as archivo:
+            self.assertEqual(
+                archivo.namelist(),
+                [f'certificado_cur_{curso.pk}.jpg', f'certificado_exp_{experiencia.pk}.jpg']
+            )
+            self.assertEqual({e.compress_type for e in archivo.infolist()}, {zipfile.ZIP_STORED})
+            self.assertEqual(archivo.read(f'certificado_cur_{curso.pk}.jpg'), curso.certificado.name.encode())
+
+
+class ParidadVistasAsyncTests(EntornoCVMixin, TestCase):
+    """Las vistas de vistas_async.py, bajo AsyncClient, responden lo mismo que las de views.py."""
+    parches = SIN_RED
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = crear_perfil()
+            crear_experiencia(self.perfil, 1)
+            crear_curso(self.perfil, 1)
+        VentaGarage.objects.create(
+            perfil=self.perfil, nombreproducto='Bicicleta', estadoproducto='Bueno', descripcion='Usada',
+            valordelbien=Decimal('80.00'),
+        )
+
+    async def pedir_a_ambas(self, url):
+        # Primero la async, para que renderice ella los fragmentos {% cache %}
+        with self.settings(ROOT_URLCONF=URLS_ASYNC):
+            asincrona = await self.async_client.get(url)
+        sincrona = await self.async_client.get(url)
+        return sincrona, asincrona
+
+    @staticmethod
+    def sin_csrf(contenido):
+        return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b'', contenido)
+
+    async def test_misma_respuesta(self):
+        for url in (
+            '/', '/hoja-de-vida/', f'/cv/{self.perfil.numerocedula}/', '/venta-garage/?estado=Bueno',
+            '/venta-garage/pagina/', '/seleccionar_certificados/', '/cv/no-existe/', '/cv/pdf/trabajos/999999/',
+        ):
+            with self.subTest(url=url):
+                sincrona, asincrona = await self.pedir_a_ambas(url)
+                self.assertEqual(asincrona.status_code, sincrona.status_code)
+                self.assertEqual(asincrona.get('Content-Type'), sincrona.get('Content-Type'))
+                self.assertEqual(asincrona.get('ETag'), sincrona.get('ETag'))
+                self.assertEqual(self.sin_csrf(asincrona.content), self.sin_csrf(sincrona.content))
+
+    async def test_pdf_asincrono(self):
+        sincrona, asincrona = await self.pedir_a_ambas('/cv/pdf/')
+        self.assertEqual(asincrona.status_code, 200)
+        # Cada render lleva su fecha de creación: se compara el texto
+        self.assertEqual(texto_pdf(asincrona.content), texto_pdf(sincrona.content))
+
+        sincrona, asincrona = await self.pedir_a_ambas('/cv/pdf/?async=1')
+        self.assertEqual(asincrona.status_code, 202)
+        self.assertEqual(asincrona.json(), sincrona.json())
+
+    async def test_las_plantillas_se_renderizan_fuera_del_event_loop(self):
+        hilos = set()
+        original = PlantillaMedida.render
+
+        def render(plantilla, *args, **kwargs):
+            hilos.add(threading.get_ident())
+            return original(plantilla, *args, **kwargs)
+
+        with mock.patch.object(PlantillaMedida, 'render', render), self.settings(ROOT_URLCONF=URLS_ASYNC):
+            for url in ('/hoja-de-vida/', '/venta-garage/pagina/'):
+                self.assertEqual((await self.async_client.get(url)).status_code, 200)
+        self.assertTrue(hilos)
+        self.assertNotIn(threading.get_ident(), hilos)
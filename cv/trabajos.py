@@ -0,0 +1,165 @@
+"""
+Cola de generación de PDFs y paquetes de certificados respaldada por la
+tabla TrabajoGeneracion.
+
+La vista encola con `encolar_pdf`, las señales con `encolar_certificados`,
+y un proceso aparte (`manage.py procesar_trabajos`) llama a
+`procesar_siguiente` en bucle.
+"""
+import functools
+import logging
+import operator
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .cache import obtener_version
+from .certificados import construir_paquete, todos_los_pendientes
+from .models import DatosPersonales, TrabajoGeneracion
+from .pdf import obtener_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def encolar_pdf(perfil):
+    """
+    Devuelve el trabajo para la versión actual del perfil, creándolo si hace
+    falta. Si ya existe uno (pendiente, en proceso o listo) se reutiliza.
+    """
+    return _encolar(perfil.pk, TrabajoGeneracion.TIPO_PDF)
+
+
+def encolar_certificados(perfil_id):
+    """Encola el ZIP con todos los certificados (o None si el perfil ya no existe)."""
+    if not DatosPersonales.objects.filter(pk=perfil_id).exists():
+        return None
+    return _encolar(perfil_id, TrabajoGeneracion.TIPO_CERTIFICADOS)
+
+
+def encolar_certificados_lote(perfil_ids):
+    """
+    encolar_certificados de varios perfiles (acciones masivas del admin):
+    una consulta para saber cuáles siguen existiendo y un solo INSERT. Los
+    trabajos que ya había para esa versión se dejan como están.
+    """
+    versiones = {
+        perfil_id: obtener_version(perfil_id)
+        for perfil_id in DatosPersonales.objects.filter(pk__in=perfil_ids).values_list('pk', flat=True)
+    }
+    if not versiones:
+        return
+    TrabajoGeneracion.objects.bulk_create(
+        [
+            TrabajoGeneracion(perfil_id=perfil_id, tipo=TrabajoGeneracion.TIPO_CERTIFICADOS, version=version)
+            for perfil_id, version in versiones.items()
+        ],
+        ignore_conflicts=True,
+    )
+    # Como en _encolar: un fallo anterior no bloquea los reintentos
+    TrabajoGeneracion.objects.filter(
+        functools.reduce(operator.or_, (
+            Q(perfil_id=perfil_id, version=version) for perfil_id, version in versiones.items()
+        )),
+        tipo=TrabajoGeneracion.TIPO_CERTIFICADOS,
+        estado=TrabajoGeneracion.ERROR,
+    ).update(estado=TrabajoGeneracion.PENDIENTE, error='', fechaactualizacion=now())
+
+
+def _encolar(perfil_id, tipo):
+    version = obtener_version(perfil_id)
+    try:
+        with transaction.atomic():
+            trabajo, _ = TrabajoGeneracion.objects.get_or_create(
+                perfil_id=perfil_id, tipo=tipo, version=version
+            )
+    except IntegrityError:
+        # Otra petición lo creó al mismo tiempo
+        trabajo = TrabajoGeneracion.objects.get(perfil_id=perfil_id, tipo=tipo, version=version)
+
+    if trabajo.estado == TrabajoGeneracion.ERROR:
+        # Un fallo anterior no bloquea los reintentos
+        TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(
+            estado=TrabajoGeneracion.PENDIENTE, error='', fechaactualizacion=now()
+        )
+        trabajo.estado = TrabajoGeneracion.PENDIENTE
+    return trabajo
+
+
+def reencolar_atascados(minutos):
+    """Devuelve a la cola los trabajos que un worker dejó a medias."""
+    limite = now() - timedelta(minutes=minutos)
+    return TrabajoGeneracion.objects.filter(
+        estado=TrabajoGeneracion.PROCESANDO, fechaactualizacion__lt=limite
+    ).update(estado=TrabajoGeneracion.PENDIENTE)
+
+
+def _reclamar_siguiente():
+    """
+    Marca como PROCESANDO el trabajo pendiente más antiguo. El UPDATE
+    condicional garantiza que dos workers no tomen el mismo trabajo.
+    """
+    pendientes = TrabajoGeneracion.objects.filter(
+        estado=TrabajoGeneracion.PENDIENTE
+    ).order_by('fechacreacion').values_list('pk', flat=True)[:10]
+
+    for pk in pendientes:
+        reclamado = TrabajoGeneracion.objects.filter(
+            pk=pk, estado=TrabajoGeneracion.PENDIENTE
+        ).update(estado=TrabajoGeneracion.PROCESANDO, fechaactualizacion=now())
+        if reclamado:
+            return TrabajoGeneracion.objects.select_related('perfil').get(pk=pk)
+    return None
+
+
+def procesar_siguiente(construir_contexto):
+    """
+    Procesa un trabajo de la cola. Devuelve el trabajo procesado o None si
+    la cola estaba vacía.
+    """
+    trabajo = _reclamar_siguiente()
+    if trabajo is None:
+        return None
+
+    # Solo se puede generar el contenido actual: un trabajo de una versión
+    # anterior guardaría el de la nueva con la etiqueta vieja
+    if _obsoleto(trabajo):
+        return _marcar_obsoleto(trabajo)
+
+    try:
+        if trabajo.tipo == TrabajoGeneracion.TIPO_CERTIFICADOS:
+            # Si ningún certificado cambió de contenido ya está en la cache
+            construir_paquete(todos_los_pendientes(trabajo.perfil_id))
+        else:
+            trabajo.resultado = obtener_pdf(trabajo.perfil, construir_contexto)['contenido']
+    except Exception as e:
+        logger.exception("Error generando el trabajo %s", trabajo.pk)
+        trabajo.estado = TrabajoGeneracion.ERROR
+        trabajo.error = str(e)
+        trabajo.save(update_fields=['estado', 'error', 'fechaactualizacion'])
+        return trabajo
+
+    # Si cambió mientras se generaba no se sabe de qué versión es el resultado
+    if _obsoleto(trabajo):
+        return _marcar_obsoleto(trabajo)
+
+    trabajo.estado = TrabajoGeneracion.LISTO
+    trabajo.save(update_fields=['resultado', 'estado', 'fechaactualizacion'])
+
+    # Los resultados de versiones anteriores ya no se van a pedir
+    TrabajoGeneracion.objects.filter(
+        perfil=trabajo.perfil, tipo=trabajo.tipo, version__lt=trabajo.version
+    ).delete()
+    return trabajo
+
+
+def _obsoleto(trabajo):
+    return trabajo.version != obtener_version(trabajo.perfil_id)
+
+
+def _marcar_obsoleto(trabajo):
+    trabajo.estado = TrabajoGeneracion.OBSOLETO
+    trabajo.resultado = None
+    trabajo.save(update_fields=['estado', 'resultado', 'fechaactualizacion'])
+    return trabajo
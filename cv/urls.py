@@ -1,10 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from .views import home, descargar_cv_pdf, seleccionar_certificados, welcome, venta_garage
+from . import views, vistas_async
+
+# Bajo ASGI (config/asgi.py activa CV_VISTAS_ASYNC) las vistas públicas
+# son las de vistas_async.py; con gunicorn/WSGI, las síncronas.
+vistas = vistas_async if settings.CV_VISTAS_ASYNC else views
 
 urlpatterns = [
-    path('', welcome, name='welcome'), 
-    path('hoja-de-vida/', home, name='home'), 
-    path('cv/pdf/', descargar_cv_pdf, name='cv_pdf'),
-    path('seleccionar_certificados/', seleccionar_certificados, name='seleccionar_certificados'),
-    path('venta-garage/', venta_garage, name='venta_garage')
-]
\ No newline at end of file
+    path('', vistas.welcome, name='welcome'), 
+    path('hoja-de-vida/', vistas.home, name='home'), 
+    path('cv/pdf/', vistas.descargar_cv_pdf, name='cv_pdf'),
+    path('cv/pdf/trabajos/<int:trabajo_id>/', vistas.estado_trabajo_pdf, name='cv_pdf_trabajo'),
+    path('cv/pdf/trabajos/<int:trabajo_id>/descargar/', vistas.descargar_trabajo_pdf, name='cv_pdf_trabajo_descargar'),
+    path('seleccionar_certificados/', vistas.seleccionar_certificados, name='seleccionar_certificados'),
+    path('venta-garage/', vistas.venta_garage, name='venta_garage'),
+    path('venta-garage/pagina/', vistas.venta_garage_pagina, name='venta_garage_pagina'),
+    path('metricas/', views.metricas, name='metricas'),
+
+    # Cualquier perfil por slug o número de cédula (ver cv/perfiles.py); los
+    # nombres llevan el sufijo _perfil que usa {% url_cv %}
+    path('cv/<slug:slug>/', vistas.home, name='home_perfil'),
+    path('cv/<slug:slug>/portada/', vistas.welcome, name='welcome_perfil'),
+    path('cv/<slug:slug>/pdf/', vistas.descargar_cv_pdf, name='cv_pdf_perfil'),
+    path('cv/<slug:slug>/certificados/', vistas.seleccionar_certificados, name='seleccionar_certificados_perfil'),
+    path('cv/<slug:slug>/venta-garage/', vistas.venta_garage, name='venta_garage_perfil'),
+    path('cv/<slug:slug>/venta-garage/pagina/', vistas.venta_garage_pagina, name='venta_garage_pagina_perfil'),
+]
@@ -1,163 +1,332 @@
-import os
-import io
-import zipfile
-import requests 
-import cloudinary.utils 
-from django.shortcuts import render
-from django.http import HttpResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
+import hashlib
+import hmac
+import itertools
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlencode
+
 from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.timezone import now
+from django.views.decorators.http import condition
 
 from .models import (
-    DatosPersonales,
+    CON_CERTIFICADO,
     ExperienciaLaboral,
     CursoRealizado,
     Reconocimiento,
-    ProductoAcademico,
-    ProductoLaboral,
-    VentaGarage
+    VentaGarage,
+    TrabajoGeneracion,
+    SnapshotPerfil
 )
+from .cache import versiones_secciones
+from .trabajos import encolar_pdf
+from .certificados import abrir_paquete, clave_paquete, iterar_certificados, resolver_seleccion, zip_en_streaming
+from .metricas import exponer
+from .pdf import ErrorGeneracionPDF, obtener_pdf
+from .perfiles import obtener_perfil, url_cv
+from .snapshot import contexto_snapshot, SECCIONES
+
+# Secciones de home.html con su propio fragmento cacheado
+SECCIONES_HOME = ('perfil',) + tuple(SECCIONES)
+
+NOMBRE_ZIP = 'mis_certificados_imagenes.zip'
 
 def get_contexto_perfil(perfil):
-    """Función auxiliar para no repetir código entre home y pdf"""
-    return {
-        'perfil': perfil,
-        'experiencias': ExperienciaLaboral.objects.filter(
-            perfil=perfil, activarparaqueseveaenfront=True
-        ),
-        'cursos': CursoRealizado.objects.filter(
-            perfil=perfil, activarparaqueseveaenfront=True
-        ),
-        'reconocimientos': Reconocimiento.objects.filter(
-            perfil=perfil, activarparaqueseveaenfront=True
-        ),
-        'productos_academicos': ProductoAcademico.objects.filter(
-            perfil=perfil, activarparaqueseveaenfront=True
-        ),
-        'productos_laborales': ProductoLaboral.objects.filter(
-            perfil=perfil, activarparaqueseveaenfront=True
-        ),
-        'ventas': VentaGarage.objects.filter(
-            perfil=perfil, activarparaqueseveaenfront=True
-        ),
-    }
+    """
+    Función auxiliar para no repetir código entre home y pdf.
+    Todo sale del snapshot del perfil: una sola lectura por clave primaria.
+    """
+    return contexto_snapshot(perfil.pk if perfil else None)
+
+def _estado_perfil(request, slug=None):
+    """
+    (id, fecha de última modificación) del perfil pedido (el activo en las
+    rutas raíz, el del slug en /cv/<slug>/). El snapshot se
+    regenera con cualquier alta, edición o borrado del CV, así que su
+    fechaactualizacion es la última modificación del perfil completo.
+    Se memoriza en el request para etag y last_modified.
+    """
+    if not hasattr(request, '_cv_estado_perfil'):
+        perfil = obtener_perfil(slug)
+        fecha = None
+        if perfil is not None:
+            fecha = SnapshotPerfil.objects.filter(pk=perfil.pk).values_list(
+                'fechaactualizacion', flat=True
+            ).first()
+        request._cv_estado_perfil = (perfil.pk, fecha) if fecha else None
+    return request._cv_estado_perfil
 
-def welcome(request):
-    perfil = DatosPersonales.objects.filter(perfilactivo=1).first()
-    return render(request, 'cv/welcome.html', {'perfil': perfil})
+def etag_pagina(perfil_id, fecha):
+    """
+    ETag (sin comillas) de las páginas del perfil. Incluye
+    CV_VERSION_DESPLIEGUE para que un cambio de plantillas no deje a los
+    clientes con el HTML anterior.
+    """
+    despliegue = getattr(settings, 'CV_VERSION_DESPLIEGUE', '')
+    return f"cv-{despliegue}-{perfil_id}-{fecha.timestamp():.6f}"
 
-def home(request):
-    perfil = DatosPersonales.objects.filter(perfilactivo=1).first()
+def ultima_modificacion_pagina(fecha):
+    """
+    Fecha para Last-Modified, o None mientras no terminó el segundo en que
+    cambió el perfil: la cabecera va truncada al segundo y otro cambio en
+    ese mismo segundo daría un 304 equivocado a quien solo manda
+    If-Modified-Since. Mientras tanto valida solo el ETag.
+    """
+    if int(now().timestamp()) <= int(fecha.timestamp()):
+        return None
+    return fecha
+
+def _etag_perfil(request, slug=None, **kwargs):
+    estado = _estado_perfil(request, slug)
+    if estado is None:
+        return None
+    return etag_pagina(*estado)
+
+def _ultima_modificacion_perfil(request, slug=None, **kwargs):
+    estado = _estado_perfil(request, slug)
+    return ultima_modificacion_pagina(estado[1]) if estado else None
+
+# Las páginas públicas responden 304 sin tocar plantillas si el cliente
+# (o la CDN) ya tiene la versión actual.
+pagina_condicional = condition(etag_func=_etag_perfil, last_modified_func=_ultima_modificacion_perfil)
+
+@pagina_condicional
+def welcome(request, slug=None):
+    perfil = obtener_perfil(slug)
+    return render(request, 'cv/welcome.html', {'perfil': perfil, 'perfil_slug': slug})
+
+@pagina_condicional
+def home(request, slug=None):
+    perfil = obtener_perfil(slug)
     context = get_contexto_perfil(perfil)
+    # Las rutas /cv/<slug>/ enlazan a las del mismo perfil ({% url_cv %})
+    context['perfil_slug'] = slug
+    if perfil:
+        # Versiones para los {% cache %} por sección de la plantilla
+        context['versiones'] = versiones_secciones(perfil.pk, SECCIONES_HOME)
     return render(request, 'cv/home.html', context)
 
-def descargar_cv_pdf(request):
-    perfil = DatosPersonales.objects.filter(perfilactivo=1).first()
-    context = get_contexto_perfil(perfil)
+def _respuesta_pdf(request, perfil, contenido, etag):
+    response = HttpResponse(contenido, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="CV_{perfil.nombres}.pdf"'
+    response['Content-Length'] = len(contenido)
+    response['ETag'] = etag
 
-    template = get_template('cv/cv_pdf.html')
-    html = template.render(context)
+    # Si el cliente ya tiene esta versión respondemos 304 sin cuerpo
+    return get_conditional_response(request, etag=etag, response=response)
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="CV_{perfil.nombres}.pdf"'
+def _estado_trabajo(trabajo):
+    datos = {
+        'trabajo': trabajo.pk,
+        'estado': trabajo.estado,
+        'url_estado': reverse('cv_pdf_trabajo', args=[trabajo.pk]),
+    }
+    if trabajo.estado == TrabajoGeneracion.LISTO:
+        # El ZIP de certificados queda en cache_paquetes, no en `resultado`
+        if trabajo.tipo == TrabajoGeneracion.TIPO_PDF:
+            datos['url_descarga'] = reverse('cv_pdf_trabajo_descargar', args=[trabajo.pk])
+    elif trabajo.estado == TrabajoGeneracion.ERROR:
+        datos['error'] = trabajo.error
+    elif trabajo.estado == TrabajoGeneracion.OBSOLETO:
+        datos['error'] = "El CV cambió antes de generarse: vuelve a pedir el PDF."
+    return datos
 
-    # Nota: Si las imágenes del PDF no salen, necesitaremos una función link_callback aquí.
-    # Por ahora probamos así ya que arreglaste el template.
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    
-    if pisa_status.err:
-        return HttpResponse('Tuvimos errores <pre>' + html + '</pre>')
-    return response
+def descargar_cv_pdf(request, slug=None):
+    perfil = obtener_perfil(slug)
+    # Sin perfil activo no hay CV que generar ni que encolar
+    if perfil is None:
+        raise Http404
+
+    # Modo asíncrono (?async=1): encolamos y devolvemos el id del trabajo
+    if request.GET.get('async'):
+        trabajo = encolar_pdf(perfil)
+        return JsonResponse(_estado_trabajo(trabajo), status=202)
+
+    # El PDF se cachea por perfil y versión de contenido (ver cv/pdf.py)
+    try:
+        artefacto = obtener_pdf(perfil, get_contexto_perfil)
+    except ErrorGeneracionPDF as e:
+        return HttpResponse('Tuvimos errores <pre>' + e.html + '</pre>')
+
+    return _respuesta_pdf(request, perfil, artefacto['contenido'], artefacto['etag'])
+
+def estado_trabajo_pdf(request, trabajo_id):
+    trabajo = get_object_or_404(TrabajoGeneracion.objects.defer('resultado'), pk=trabajo_id)
+    return JsonResponse(_estado_trabajo(trabajo))
+
+def descargar_trabajo_pdf(request, trabajo_id):
+    trabajo = get_object_or_404(
+        TrabajoGeneracion.objects.select_related('perfil'),
+        pk=trabajo_id, tipo=TrabajoGeneracion.TIPO_PDF, estado=TrabajoGeneracion.LISTO
+    )
+    contenido = bytes(trabajo.resultado)
+    etag = '"%s"' % hashlib.md5(contenido).hexdigest()
+    return _respuesta_pdf(request, trabajo.perfil, contenido, etag)
 
 # --- REEMPLAZA SOLO LA FUNCIÓN seleccionar_certificados ---
 
-def seleccionar_certificados(request):
-    perfil = DatosPersonales.objects.filter(perfilactivo=1).first()
+def seleccionar_certificados(request, slug=None):
+    perfil = obtener_perfil(slug)
     
     # Listas
-    experiencias = ExperienciaLaboral.objects.filter(perfil=perfil, certificado__isnull=False).exclude(certificado='')
-    cursos = CursoRealizado.objects.filter(perfil=perfil, certificado__isnull=False).exclude(certificado='')
-    reconocimientos = Reconocimiento.objects.filter(perfil=perfil, certificado__isnull=False).exclude(certificado='')
+    experiencias = ExperienciaLaboral.objects.filter(CON_CERTIFICADO, perfil=perfil)
+    cursos = CursoRealizado.objects.filter(CON_CERTIFICADO, perfil=perfil)
+    reconocimientos = Reconocimiento.objects.filter(CON_CERTIFICADO, perfil=perfil)
 
     if request.method == "POST":
         seleccionados = request.POST.getlist("certificados")
-        
-        # Inyectamos credenciales por seguridad
-        cloudinary.config(
-            cloud_name=settings.CLOUDINARY_STORAGE['CLOUD_NAME'],
-            api_key=settings.CLOUDINARY_STORAGE['API_KEY'],
-            api_secret=settings.CLOUDINARY_STORAGE['API_SECRET']
+
+        # 1. Resolvemos la selección con una consulta por modelo
+        pendientes = resolver_seleccion(perfil, seleccionados)
+
+        # Si esta selección ya se armó antes (la de todos se arma al cambiar
+        # un certificado), se sirve el ZIP guardado
+        paquete = clave_paquete(pendientes)
+        archivo = abrir_paquete(paquete)
+        if archivo:
+            return FileResponse(archivo, as_attachment=True, filename=NOMBRE_ZIP, content_type='application/zip')
+
+        # 2. Descargamos en paralelo (ver cv/certificados.py). Esperamos al
+        # primer certificado correcto antes de empezar a responder, para poder
+        # avisar si no se pudo descargar ninguno.
+        resultados = iterar_certificados(pendientes)
+        iniciales = []
+        for resultado in resultados:
+            iniciales.append(resultado)
+            if resultado.ok:
+                break
+
+        if not any(r.ok for r in iniciales):
+            return HttpResponse("No se pudieron descargar los archivos. Intenta recargar la página.")
+
+        # 3. El ZIP se escribe y se envía entrada por entrada (y queda guardado)
+        response = StreamingHttpResponse(
+            zip_en_streaming(itertools.chain(iniciales, resultados), paquete=paquete),
+            content_type='application/zip'
         )
-        
-        zip_buffer = io.BytesIO()
-        
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            archivos_agregados = 0
-            headers_fake = {'User-Agent': 'Mozilla/5.0'}
-
-            for item in seleccionados:
-                try:
-                    tipo, id_obj = item.split('_') 
-                    objeto = None
-                    
-                    if tipo == 'exp':
-                        objeto = ExperienciaLaboral.objects.filter(pk=id_obj).first()
-                    elif tipo == 'cur':
-                        objeto = CursoRealizado.objects.filter(pk=id_obj).first()
-                    elif tipo == 'rec':
-                        objeto = Reconocimiento.objects.filter(pk=id_obj).first()
-                    
-                    if objeto and objeto.certificado:
-                        # 1. Limpiamos el nombre (quitamos la extensión .pdf o .png del ID)
-                        public_id_full = objeto.certificado.name
-                        public_id_clean = os.path.splitext(public_id_full)[0]
-
-                        # 2. Pedimos una IMAGEN JPG (format="jpg")
-                        # Esto convierte PDFs a imagen y normaliza todo.
-                        file_url, options = cloudinary.utils.cloudinary_url(
-                            public_id_clean,
-                            resource_type="image", 
-                            format="jpg",  # <--- FORZAMOS JPG
-                            sign_url=True,
-                            secure=True
-                        )
-
-                        # 3. Descargamos
-                        response = requests.get(file_url, headers=headers_fake)
-                        
-                        if response.status_code == 200:
-                            # Guardamos en el ZIP con extensión .jpg
-                            filename = f"certificado_{tipo}_{id_obj}.jpg"
-                            zip_file.writestr(filename, response.content)
-                            archivos_agregados += 1
-                        else:
-                            print(f"Error descargando imagen {file_url}: {response.status_code}")
-
-                except Exception as e:
-                    print(f"Error procesando {item}: {e}")
-
-        if archivos_agregados == 0:
-             return HttpResponse("No se pudieron descargar los archivos. Intenta recargar la página.")
-
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
-        response['Content-Disposition'] = 'attachment; filename="mis_certificados_imagenes.zip"'
+        response['Content-Disposition'] = f'attachment; filename="{NOMBRE_ZIP}"'
         return response
 
     return render(request, "cv/seleccionar_certificados.html", {
         "experiencias": experiencias,
         "cursos": cursos,
-        "reconocimientos": reconocimientos
+        "reconocimientos": reconocimientos,
+        "perfil_slug": slug,
     })
 
-def venta_garage(request):
-    perfil = DatosPersonales.objects.filter(perfilactivo=1).first()
+def _filtros_garage(request):
+    """Lee estado, rango de precio y cursor de la query string, ignorando valores inválidos."""
+    filtros = {'estado': None, 'precio_min': None, 'precio_max': None, 'cursor': None}
+
+    estado = request.GET.get('estado')
+    if estado in dict(VentaGarage._meta.get_field('estadoproducto').choices):
+        filtros['estado'] = estado
+
+    for nombre in ('precio_min', 'precio_max'):
+        try:
+            valor = Decimal(request.GET.get(nombre, ''))
+        except InvalidOperation:
+            continue
+        # Decimal acepta NaN e Infinity, que la base no sabe comparar
+        if valor.is_finite():
+            filtros[nombre] = valor
+
+    # Cursor "AAAA-MM-DD_id" de la última tarjeta ya mostrada
+    fecha, _, id_obj = request.GET.get('despues', '').partition('_')
+    try:
+        filtros['cursor'] = (date.fromisoformat(fecha), int(id_obj))
+    except ValueError:
+        pass
+    return filtros
+
+def _consulta_garage(perfil, filtros):
+    """
+    Queryset de una página del catálogo con paginación por cursor sobre
+    (fechapublicacion, id): cada página cuesta lo mismo sin importar lo
+    lejos que esté, gracias a los índices venta_*_idx. Trae una fila de más
+    para saber si hay página siguiente.
+    """
     productos = VentaGarage.objects.filter(
-        perfil=perfil, 
+        perfil=perfil,
         activarparaqueseveaenfront=True
-    ).order_by('-fechapublicacion')
-    
+    ).order_by('-fechapublicacion', '-id')
+
+    if filtros['estado']:
+        productos = productos.filter(estadoproducto=filtros['estado'])
+    if filtros['precio_min'] is not None:
+        productos = productos.filter(valordelbien__gte=filtros['precio_min'])
+    if filtros['precio_max'] is not None:
+        productos = productos.filter(valordelbien__lte=filtros['precio_max'])
+    if filtros['cursor']:
+        fecha, id_obj = filtros['cursor']
+        productos = productos.filter(
+            Q(fechapublicacion__lt=fecha) | Q(fechapublicacion=fecha, id__lt=id_obj)
+        )
+    return productos[:_por_pagina_garage() + 1]
+
+def _por_pagina_garage():
+    return getattr(settings, 'CV_VENTA_GARAGE_POR_PAGINA', 24)
+
+def _cortar_pagina_garage(productos, filtros):
+    """(productos de la página, query string de la siguiente o None)"""
+    por_pagina = _por_pagina_garage()
+    if len(productos) <= por_pagina:
+        return productos, None
+
+    productos = productos[:por_pagina]
+    ultimo = productos[-1]
+    parametros = {
+        nombre: valor for nombre, valor in filtros.items()
+        if nombre != 'cursor' and valor is not None
+    }
+    parametros['despues'] = f"{ultimo.fechapublicacion.isoformat()}_{ultimo.pk}"
+    return productos, urlencode(parametros)
+
+def _pagina_garage(perfil, filtros):
+    """Devuelve (productos, query string de la siguiente página o None)."""
+    return _cortar_pagina_garage(list(_consulta_garage(perfil, filtros)), filtros)
+
+@pagina_condicional
+def venta_garage(request, slug=None):
+    perfil = obtener_perfil(slug)
+    filtros = _filtros_garage(request)
+    productos, siguiente = _pagina_garage(perfil, filtros)
+
     return render(request, 'cv/venta_garage.html', {
         'perfil': perfil,
-        'productos': productos
-    })
\ No newline at end of file
+        'productos': productos,
+        'siguiente': siguiente,
+        'filtros': filtros,
+        'estados': VentaGarage._meta.get_field('estadoproducto').choices,
+        'perfil_slug': slug,
+    })
+
+def venta_garage_pagina(request, slug=None):
+    """Fragmento JSON para el scroll infinito de venta_garage."""
+    perfil = obtener_perfil(slug)
+    productos, siguiente = _pagina_garage(perfil, _filtros_garage(request))
+    html = render_to_string('cv/_productos_garage.html', {
+        'perfil': perfil,
+        'productos': productos,
+    }, request=request)
+    return JsonResponse({
+        'html': html,
+        'siguiente': f"{url_cv('venta_garage_pagina', slug)}?{siguiente}" if siguiente else None,
+    })
+
+def metricas(request):
+    """Histogramas de cv/metricas.py en formato de texto de Prometheus (solo staff)."""
+    token = settings.CV_METRICAS_TOKEN
+    con_token = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+    if not (request.user.is_staff or con_token):
+        raise PermissionDenied
+    return HttpResponse(exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
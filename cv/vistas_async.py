@@ -0,0 +1,221 @@
+"""
+Versiones async de las vistas públicas de cv/views.py, para servir con un
+servidor ASGI (config/asgi.py activa CV_VISTAS_ASYNC y cv/urls.py elige
+este módulo).
+
+Usan el ORM async de Django, httpx para los certificados (sin un hilo por
+descarga) y mandan el render del PDF a un pool de hilos, así un worker
+atiende muchos requests mientras esperan red o base de datos. Las
+plantillas, filtros y respuestas son los mismos que en views.py.
+"""
+import asyncio
+import functools
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import versiones_secciones
+from .certificados import abrir_paquete, aiterar_certificados, aresolver_seleccion, azip_en_streaming, clave_paquete
+from .models import (
+    CON_CERTIFICADO,
+    ExperienciaLaboral,
+    CursoRealizado,
+    Reconocimiento,
+    VentaGarage,
+    TrabajoGeneracion,
+    SnapshotPerfil
+)
+from .pdf import ErrorGeneracionPDF, aobtener_pdf
+from .perfiles import aobtener_perfil, url_cv
+from .snapshot import acontexto_snapshot
+from .trabajos import encolar_pdf
+from .views import (
+    NOMBRE_ZIP,
+    SECCIONES_HOME,
+    _consulta_garage,
+    _cortar_pagina_garage,
+    _estado_trabajo,
+    _filtros_garage,
+    _respuesta_pdf,
+    etag_pagina,
+    ultima_modificacion_pagina
+)
+
+
+# Las plantillas usan CPU y pueden leer la base o el disco (context
+# processors, {% cache %}): se renderizan en un hilo, fuera del event loop
+arender = sync_to_async(render)
+arender_to_string = sync_to_async(render_to_string)
+
+
+async def get_contexto_perfil(perfil):
+    return await acontexto_snapshot(perfil.pk if perfil else None)
+
+
+def pagina_condicional(vista):
+    """
+    Equivalente async de views.pagina_condicional: `condition` llama a sus
+    funciones de forma síncrona, y estas consultan la base.
+    """
+    @functools.wraps(vista)
+    async def envuelta(request, *args, slug=None, **kwargs):
+        perfil = await aobtener_perfil(slug)
+        fecha = None
+        if perfil is not None:
+            fecha = await SnapshotPerfil.objects.filter(pk=perfil.pk).values_list(
+                'fechaactualizacion', flat=True
+            ).afirst()
+        if not fecha or request.method not in ('GET', 'HEAD'):
+            return await vista(request, *args, slug=slug, **kwargs)
+
+        etag = quote_etag(etag_pagina(perfil.pk, fecha))
+        ultima = ultima_modificacion_pagina(fecha)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(ultima.timestamp()) if ultima else None
+        )
+        if response is None:
+            response = await vista(request, *args, slug=slug, **kwargs)
+            if response.status_code == 200:
+                response.headers.setdefault('ETag', etag)
+                if ultima:
+                    response.headers.setdefault('Last-Modified', http_date(ultima.timestamp()))
+        return response
+    return envuelta
+
+
+@pagina_condicional
+async def welcome(request, slug=None):
+    perfil = await aobtener_perfil(slug)
+    return await arender(request, 'cv/welcome.html', {'perfil': perfil, 'perfil_slug': slug})
+
+
+@pagina_condicional
+async def home(request, slug=None):
+    perfil = await aobtener_perfil(slug)
+    context = await get_contexto_perfil(perfil)
+    context['perfil_slug'] = slug
+    if perfil:
+        context['versiones'] = await sync_to_async(versiones_secciones)(perfil.pk, SECCIONES_HOME)
+    return await arender(request, 'cv/home.html', context)
+
+
+async def descargar_cv_pdf(request, slug=None):
+    perfil = await aobtener_perfil(slug)
+    if perfil is None:
+        raise Http404
+
+    if request.GET.get('async'):
+        trabajo = await sync_to_async(encolar_pdf)(perfil)
+        return JsonResponse(_estado_trabajo(trabajo), status=202)
+
+    try:
+        artefacto = await aobtener_pdf(perfil, get_contexto_perfil)
+    except ErrorGeneracionPDF as e:
+        return HttpResponse('Tuvimos errores <pre>' + e.html + '</pre>')
+
+    return _respuesta_pdf(request, perfil, artefacto['contenido'], artefacto['etag'])
+
+
+async def _trabajo_o_404(queryset, **filtros):
+    try:
+        return await queryset.aget(**filtros)
+    except TrabajoGeneracion.DoesNotExist:
+        raise Http404
+
+
+async def estado_trabajo_pdf(request, trabajo_id):
+    trabajo = await _trabajo_o_404(TrabajoGeneracion.objects.defer('resultado'), pk=trabajo_id)
+    return JsonResponse(_estado_trabajo(trabajo))
+
+
+async def descargar_trabajo_pdf(request, trabajo_id):
+    trabajo = await _trabajo_o_404(
+        TrabajoGeneracion.objects.select_related('perfil'),
+        pk=trabajo_id, tipo=TrabajoGeneracion.TIPO_PDF, estado=TrabajoGeneracion.LISTO
+    )
+    contenido = bytes(trabajo.resultado)
+    etag = '"%s"' % hashlib.md5(contenido).hexdigest()
+    return _respuesta_pdf(request, trabajo.perfil, contenido, etag)
+
+
+async def seleccionar_certificados(request, slug=None):
+    perfil = await aobtener_perfil(slug)
+
+    if request.method == "POST":
+        pendientes = await aresolver_seleccion(perfil, request.POST.getlist("certificados"))
+        paquete = clave_paquete(pendientes)
+        archivo = await asyncio.to_thread(abrir_paquete, paquete)
+        if archivo:
+            return FileResponse(archivo, as_attachment=True, filename=NOMBRE_ZIP, content_type='application/zip')
+
+        # Igual que la versión síncrona: esperamos al primer certificado
+        # correcto antes de responder para poder avisar si fallaron todos.
+        resultados = aiterar_certificados(pendientes)
+        iniciales = []
+        async for resultado in resultados:
+            iniciales.append(resultado)
+            if resultado.ok:
+                break
+
+        if not any(r.ok for r in iniciales):
+            return HttpResponse("No se pudieron descargar los archivos. Intenta recargar la página.")
+
+        async def todos():
+            for resultado in iniciales:
+                yield resultado
+            async for resultado in resultados:
+                yield resultado
+
+        response = StreamingHttpResponse(azip_en_streaming(todos(), paquete=paquete), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{NOMBRE_ZIP}"'
+        return response
+
+    # La plantilla no puede evaluar querysets dentro del event loop
+    listas = {}
+    for nombre, modelo in (
+        ('experiencias', ExperienciaLaboral),
+        ('cursos', CursoRealizado),
+        ('reconocimientos', Reconocimiento),
+    ):
+        listas[nombre] = [obj async for obj in modelo.objects.filter(CON_CERTIFICADO, perfil=perfil)]
+    listas['perfil_slug'] = slug
+    return await arender(request, "cv/seleccionar_certificados.html", listas)
+
+
+async def _pagina_garage(perfil, filtros):
+    productos = [p async for p in _consulta_garage(perfil, filtros)]
+    return _cortar_pagina_garage(productos, filtros)
+
+
+@pagina_condicional
+async def venta_garage(request, slug=None):
+    perfil = await aobtener_perfil(slug)
+    filtros = _filtros_garage(request)
+    productos, siguiente = await _pagina_garage(perfil, filtros)
+
+    return await arender(request, 'cv/venta_garage.html', {
+        'perfil': perfil,
+        'productos': productos,
+        'siguiente': siguiente,
+        'filtros': filtros,
+        'estados': VentaGarage._meta.get_field('estadoproducto').choices,
+        'perfil_slug': slug,
+    })
+
+
+async def venta_garage_pagina(request, slug=None):
+    perfil = await aobtener_perfil(slug)
+    productos, siguiente = await _pagina_garage(perfil, _filtros_garage(request))
+    html = await arender_to_string('cv/_productos_garage.html', {
+        'perfil': perfil,
+        'productos': productos,
+    }, request=request)
+    return JsonResponse({
+        'html': html,
+        'siguiente': f"{url_cv('venta_garage_pagina', slug)}?{siguiente}" if siguiente else None,
+    })